@@ -1,15 +1,21 @@
 """
 Authentication and security utilities
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from . import models, database
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import crud, models, database
+from .cache import TTLCache
+import asyncio
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -19,12 +25,42 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Event stream tickets go in a URL, where logs keep them, so they only open streams and expire quickly
+STREAM_TICKET_PURPOSE = "events"
+STREAM_TICKET_EXPIRE_SECONDS = int(os.getenv("STREAM_TICKET_EXPIRE_SECONDS", "60"))
+
+# Password hashing; hashes made with any other cost are rehashed on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt runs on a small dedicated pool so login bursts cannot starve other requests
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+password_stats = {
+    "pending": 0,
+    "completed": 0,
+    "rejected": 0,
+    "queue_seconds_total": 0.0,
+    "queue_seconds_max": 0.0
+}
+_password_stats_lock = threading.Lock()
 
 # Bearer token
 security = HTTPBearer()
 
+# Verified token claims and resolved admins, so most requests skip the JWT decode and the admin query
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+admin_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -33,6 +69,47 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+async def run_password_task(func, *args):
+    """Run a bcrypt operation on the password pool, recording how long it queued"""
+    with _password_stats_lock:
+        if password_stats["pending"] >= PASSWORD_HASH_MAX_PENDING:
+            password_stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent password checks, please retry",
+                headers={"Retry-After": "1"},
+            )
+        password_stats["pending"] += 1
+    
+    submitted_at = time.monotonic()
+    
+    def task():
+        queued = time.monotonic() - submitted_at
+        with _password_stats_lock:
+            password_stats["queue_seconds_total"] += queued
+            password_stats["queue_seconds_max"] = max(password_stats["queue_seconds_max"], queued)
+        return func(*args)
+    
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, task)
+    finally:
+        with _password_stats_lock:
+            password_stats["pending"] -= 1
+            password_stats["completed"] += 1
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password without blocking the event loop"""
+    return await run_password_task(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> tuple:
+    """Verify a password, returning (valid, new_hash) where new_hash is set when the cost changed"""
+    return await run_password_task(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def get_password_stats() -> dict:
+    """Get password pool counters"""
+    with _password_stats_lock:
+        return {**password_stats, "workers": PASSWORD_HASH_WORKERS, "rounds": BCRYPT_ROUNDS}
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -44,6 +121,13 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_stream_ticket(admin_uuid: str) -> str:
+    """Create a short-lived token that can only open the admin's event stream"""
+    return create_access_token(
+        {"sub": admin_uuid, "purpose": STREAM_TICKET_PURPOSE},
+        expires_delta=timedelta(seconds=STREAM_TICKET_EXPIRE_SECONDS)
+    )
+
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
     try:
@@ -56,40 +140,80 @@ def verify_token(token: str) -> dict:
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-async def get_current_admin(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(database.get_db)
-) -> models.Admin:
-    """Get the current authenticated admin"""
-    token = credentials.credentials
-    payload = verify_token(token)
+def verify_token_cached(token: str) -> dict:
+    """Verify a JWT token, reusing the claims of tokens verified recently"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_token(token)
+        # Never keep claims past the token's own expiry
+        expires_in = payload.get("exp", 0) - time.time() if "exp" in payload else None
+        token_cache.set(token, payload, ttl=expires_in)
+    return payload
+
+def invalidate_admin(admin_uuid: str):
+    """Drop a cached admin so the next request reloads it"""
+    admin_cache.invalidate(admin_uuid)
+
+def get_cache_stats() -> dict:
+    """Get hit/miss counters of the authentication caches"""
+    return {
+        "tokens": token_cache.stats(),
+        "admins": admin_cache.stats()
+    }
+
+@event.listens_for(models.Admin, "after_update")
+@event.listens_for(models.Admin, "after_delete")
+def _invalidate_changed_admin(mapper, connection, target):
+    """Keep the admin cache in step with admin changes"""
+    invalidate_admin(target.uuid)
+
+async def get_admin_for_token(token: str, db: AsyncSession, purpose: Optional[str] = None) -> models.Admin:
+    """Get the admin a token was issued to; access tokens have no purpose, stream tickets have theirs"""
+    payload = verify_token_cached(token)
     
     admin_uuid = payload.get("sub")
-    if admin_uuid is None:
+    if admin_uuid is None or payload.get("purpose") != purpose:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
     
-    admin = db.query(models.Admin).filter(models.Admin.uuid == admin_uuid).first()
+    admin = admin_cache.get(admin_uuid)
+    if admin is not None:
+        return admin
+    
+    admin = await crud.get_admin_by_uuid_async(db, admin_uuid)
     if admin is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Admin not found",
         )
     
+    # Detach the admin so it can be shared by later requests
+    db.expunge(admin)
+    admin_cache.set(admin_uuid, admin)
     return admin
 
-def authenticate_admin(db: Session, name: str, password: str) -> Optional[models.Admin]:
-    """Authenticate an admin using name and password only"""
-    admin = db.query(models.Admin).filter(
-        models.Admin.name == name
-    ).first()
+async def get_current_admin(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(database.get_async_db)
+) -> models.Admin:
+    """Get the current authenticated admin"""
+    return await get_admin_for_token(credentials.credentials, db)
+
+async def authenticate_admin_async(db: AsyncSession, name: str, password: str) -> Optional[models.Admin]:
+    """Authenticate an admin off the event loop, rehashing the password if the cost changed"""
+    admin = await crud.get_admin_by_name_async(db, name)
     
     if not admin:
         return None
     
-    if not verify_password(password, admin.password):
+    valid, new_hash = await verify_and_update_password_async(password, admin.password)
+    if not valid:
         return None
     
-    return admin
\ No newline at end of file
+    if new_hash:
+        admin.password = new_hash
+        await db.commit()
+    
+    return admin
@@ -0,0 +1,164 @@
+"""
+Bounded in-process caches
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+import os
+import threading
+import time
+
+_MISSING = object()
+
+class _Flight:
+    """A computation in progress that concurrent callers wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.cacheable = True
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a time-to-live"""
+    
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a live entry, counting the lookup as a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store an entry, evicting the least recently used one when full"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Get an entry, computing it on a miss; concurrent misses share one computation"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        
+        # A write that invalidated the key mid-computation makes the result stale
+        if flight.cacheable:
+            self.set(key, flight.value, ttl)
+        return flight.value
+    
+    def invalidate(self, key: Hashable):
+        """Drop a single entry"""
+        self.invalidate_many([key])
+    
+    def invalidate_many(self, keys: Iterable[Hashable]):
+        """Drop several entries, including ones still being computed"""
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                if key in self._flights:
+                    self._flights[key].cacheable = False
+    
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]):
+        """Drop every entry whose key matches a predicate"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+            for key, flight in self._flights.items():
+                if predicate(key):
+                    flight.cacheable = False
+    
+    def clear(self):
+        """Drop every entry"""
+        self.invalidate_where(lambda key: True)
+    
+    def stats(self) -> dict:
+        """Get hit/miss counters and current size"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced
+            }
+
+# Per-admin results of the dashboard and calculation endpoints, dropped by the crud write paths
+RESULTS_CACHE_SIZE = int(os.getenv("RESULTS_CACHE_SIZE", "4096"))
+RESULTS_CACHE_TTL_SECONDS = float(os.getenv("RESULTS_CACHE_TTL_SECONDS", "60"))
+results_cache = TTLCache(maxsize=RESULTS_CACHE_SIZE, ttl=RESULTS_CACHE_TTL_SECONDS)
+
+def dashboard_key(admin_id: int) -> tuple:
+    return (admin_id, "dashboard")
+
+def users_pending_key(admin_id: int) -> tuple:
+    return (admin_id, "users_pending")
+
+def clients_pending_key(admin_id: int) -> tuple:
+    return (admin_id, "clients_pending")
+
+def user_calculation_key(admin_id: int, user_id: int) -> tuple:
+    return (admin_id, "user_calculation", user_id)
+
+def client_calculation_key(admin_id: int, client_id: int) -> tuple:
+    return (admin_id, "client_calculation", client_id)
+
+def invalidate_user_results(admin_id: int, user_ids: Iterable[int] = ()):
+    """Drop the cached results that depend on an admin's users"""
+    results_cache.invalidate_many([
+        dashboard_key(admin_id),
+        users_pending_key(admin_id),
+        *(user_calculation_key(admin_id, user_id) for user_id in user_ids)
+    ])
+
+def invalidate_client_results(admin_id: int, client_ids: Iterable[int] = ()):
+    """Drop the cached results that depend on an admin's clients"""
+    results_cache.invalidate_many([
+        dashboard_key(admin_id),
+        clients_pending_key(admin_id),
+        *(client_calculation_key(admin_id, client_id) for client_id in client_ids)
+    ])
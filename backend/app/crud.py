@@ -2,12 +2,19 @@
 CRUD operations and business logic
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, case, and_, or_, select, insert, update, bindparam
 from typing import List, Optional
-from . import models, schemas
-from datetime import datetime
+from . import models, schemas, cache, events, money, rollups
+from .serialization import schema_columns, validate_rows
+from datetime import date, datetime, time, timedelta
+import base64
 import math
 
+# Debit pricing: tax on the rough amount plus a flat levi per bag
+TAX_RATE = 0.01
+LEVI_PER_BAG = 5
+
 def calculate_user_record_debit(record_data: dict) -> dict:
     """Calculate debit transaction values for user record"""
     bags = record_data.get('bags', 0)
@@ -19,19 +26,16 @@ def calculate_user_record_debit(record_data: dict) -> dict:
     net_weight = kg - (bags * cut_weight)
     
     # Calculate rough amount: net_weight × amount_per_kg
-    rough_amount = net_weight * amount_per_kg
+    rough_amount = money.round_amount(net_weight * amount_per_kg)
     
     # Calculate tax: 1% of rough_amount
-    tax = rough_amount * 0.01
+    tax = money.round_amount(rough_amount * TAX_RATE)
     
     # Calculate levi: 5 × bags
-    levi = 5 * bags
-    
-    # Calculate net amount: rough_amount + tax + levi
-    net_amount = rough_amount + tax + levi
+    levi = money.round_amount(LEVI_PER_BAG * bags)
     
-    # Round net amount as per rules (you can adjust rounding logic)
-    net_amount = round(net_amount, 2)
+    # Calculate net amount: rough_amount + tax + levi, exact since each part is in whole paise
+    net_amount = money.sum_amounts([rough_amount, tax, levi])
     
     return {
         'net_weight': net_weight,
@@ -43,12 +47,18 @@ def calculate_user_record_debit(record_data: dict) -> dict:
 
 def get_user_sum_deficit(db: Session, user_id: int) -> dict:
     """Calculate sum/deficit for a user"""
-    records = db.query(models.UserRecord).filter(models.UserRecord.user_id == user_id).all()
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        return calculate_user_balance(None)
     
-    total_debit = sum(r.net_amount for r in records if r.transaction_type == models.TransactionType.DEBIT and r.net_amount)
-    total_credit = sum(r.credit_amount for r in records if r.transaction_type == models.TransactionType.CREDIT and r.credit_amount)
+    return calculate_user_balance(user)
+
+def calculate_user_balance(user: Optional[models.User]) -> dict:
+    """Calculate sum/deficit from the running totals stored on a user row"""
+    total_debit = (user.debit_total or 0) if user else 0
+    total_credit = (user.credit_total or 0) if user else 0
     
-    sum_deficit = total_debit - total_credit
+    sum_deficit = money.sum_amounts([total_debit, -total_credit])
     status = "Deficit" if sum_deficit > 0 else "Surplus"
     
     return {
@@ -58,40 +68,78 @@ def get_user_sum_deficit(db: Session, user_id: int) -> dict:
         'status': status
     }
 
+def reconcile_user_totals(db: Session, user_id: Optional[int] = None):
+    """Rebuild user running totals from user_records"""
+    debit_sum = db.query(
+        func.coalesce(func.sum(models.UserRecord.net_amount), 0)
+    ).filter(
+        models.UserRecord.user_id == models.User.id,
+        models.UserRecord.transaction_type == models.TransactionType.DEBIT
+    ).scalar_subquery()
+    credit_sum = db.query(
+        func.coalesce(func.sum(models.UserRecord.credit_amount), 0)
+    ).filter(
+        models.UserRecord.user_id == models.User.id,
+        models.UserRecord.transaction_type == models.TransactionType.CREDIT
+    ).scalar_subquery()
+    
+    users = models.User.__table__
+    # Setting updated_date to itself keeps its onupdate from stamping every user as edited
+    stmt = update(users).values(debit_total=debit_sum, credit_total=credit_sum, updated_date=users.c.updated_date)
+    if user_id is not None:
+        stmt = stmt.where(users.c.id == user_id)
+    db.execute(stmt)
+    db.commit()
+
 def get_all_users_pending_amount(db: Session, admin_id: int) -> dict:
     """Calculate total pending amount for all users of an admin"""
-    users = db.query(models.User).filter(models.User.admin_id == admin_id).all()
+    sum_deficit = models.User.debit_total - models.User.credit_total
     
-    total_pending = 0
-    details = []
+    # Only count deficits as pending
+    rows = db.query(
+        models.User.id,
+        models.User.first_name,
+        models.User.last_name,
+        sum_deficit
+    ).filter(
+        models.User.admin_id == admin_id,
+        sum_deficit > 0
+    ).order_by(models.User.id).all()
     
-    for user in users:
-        calc = get_user_sum_deficit(db, user.id)
-        if calc['sum_deficit'] > 0:  # Only count deficits as pending
-            total_pending += calc['sum_deficit']
-            details.append({
-                'user_id': user.id,
-                'user_name': f"{user.first_name} {user.last_name}",
-                'pending_amount': calc['sum_deficit']
-            })
+    details = [
+        {
+            'user_id': user_id,
+            'user_name': f"{first_name} {last_name}",
+            'pending_amount': pending
+        }
+        for user_id, first_name, last_name, pending in rows
+    ]
     
     return {
-        'total_pending': total_pending,
+        'total_pending': money.sum_amounts(detail['pending_amount'] for detail in details),
         'details': details
     }
 
-def update_client_totals(db: Session, client_id: int):
-    """Update client totals after adding a record"""
-    client = db.query(models.Client).filter(models.Client.id == client_id).first()
-    if not client:
-        return
-    
-    records = db.query(models.ClientRecord).filter(models.ClientRecord.client_id == client_id).all()
-    
-    client.debit_total = sum(r.debit_amount for r in records if r.debit_amount)
-    client.credit_total = sum(r.credit_amount for r in records if r.credit_amount)
-    client.profit_loss_total = sum(r.profit_loss for r in records if r.profit_loss)
+def reconcile_client_totals(db: Session, client_id: Optional[int] = None):
+    """Rebuild client running totals from client_records"""
+    def record_sum(column):
+        return db.query(
+            func.coalesce(func.sum(column), 0)
+        ).filter(
+            models.ClientRecord.client_id == models.Client.id
+        ).scalar_subquery()
     
+    clients = models.Client.__table__
+    # Setting updated_date to itself keeps its onupdate from stamping every client as edited
+    stmt = update(clients).values(
+        debit_total=record_sum(models.ClientRecord.debit_amount),
+        credit_total=record_sum(models.ClientRecord.credit_amount),
+        profit_loss_total=record_sum(models.ClientRecord.profit_loss),
+        updated_date=clients.c.updated_date
+    )
+    if client_id is not None:
+        stmt = stmt.where(clients.c.id == client_id)
+    db.execute(stmt)
     db.commit()
 
 def get_client_pending_amount(db: Session, client_id: int) -> dict:
@@ -100,8 +148,12 @@ def get_client_pending_amount(db: Session, client_id: int) -> dict:
     if not client:
         return {}
     
+    return calculate_client_pending(client)
+
+def calculate_client_pending(client: models.Client) -> dict:
+    """Calculate pending amount from the totals already stored on a client row"""
     # Pending = (total_debit - total_credit) ± profit_loss_total
-    pending = (client.debit_total - client.credit_total) + client.profit_loss_total
+    pending = money.sum_amounts([client.debit_total, -client.credit_total, client.profit_loss_total])
     status = "Profit" if client.profit_loss_total > 0 else "Loss" if client.profit_loss_total < 0 else "Neutral"
     
     return {
@@ -116,50 +168,271 @@ def get_client_pending_amount(db: Session, client_id: int) -> dict:
 
 def get_all_clients_pending_amount(db: Session, admin_id: int) -> dict:
     """Calculate total pending amount for all clients of an admin"""
-    clients = db.query(models.Client).filter(models.Client.admin_id == admin_id).all()
+    clients = get_clients_by_admin(db, admin_id, columns=[
+        models.Client.id,
+        models.Client.name,
+        models.Client.debit_total,
+        models.Client.credit_total,
+        models.Client.profit_loss_total
+    ])
     
-    total_pending = 0
     details = []
     
     for client in clients:
-        calc = get_client_pending_amount(db, client.id)
-        if calc:
-            total_pending += calc['pending_amount']
-            details.append({
-                'client_id': client.id,
-                'client_name': client.name,
-                'pending_amount': calc['pending_amount'],
-                'status': calc['status']
-            })
+        calc = calculate_client_pending(client)
+        details.append({
+            'client_id': client.id,
+            'client_name': client.name,
+            'pending_amount': calc['pending_amount'],
+            'status': calc['status']
+        })
     
     return {
-        'total_pending': total_pending,
+        'total_pending': money.sum_amounts(detail['pending_amount'] for detail in details),
         'details': details
     }
 
-# Admin CRUD
-def create_admin(db: Session, admin_data: schemas.AdminRegister) -> models.Admin:
-    """Create a new admin"""
-    from .auth import get_password_hash
+def get_dashboard_totals(db: Session, admin_id: int) -> dict:
+    """Calculate dashboard counts and pending totals with aggregate queries"""
+    sum_deficit = models.User.debit_total - models.User.credit_total
+    total_users, active_users, users_pending = db.query(
+        func.count(models.User.id),
+        func.coalesce(func.sum(case((models.User.is_active == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((sum_deficit > 0, sum_deficit), else_=0)), 0)
+    ).filter(models.User.admin_id == admin_id).one()
     
-    # Check if admin name already exists
-    existing = db.query(models.Admin).filter(models.Admin.name == admin_data.name).first()
-    if existing:
+    total_clients, clients_pending = db.query(
+        func.count(models.Client.id),
+        func.coalesce(func.sum(
+            models.Client.debit_total - models.Client.credit_total + models.Client.profit_loss_total
+        ), 0)
+    ).filter(models.Client.admin_id == admin_id).one()
+    
+    return {
+        'total_users': total_users,
+        'active_users': active_users,
+        'total_clients': total_clients,
+        'users_pending_amount': users_pending,
+        'clients_pending_amount': clients_pending
+    }
+
+def get_dashboard_summary(db: Session, admin_id: int) -> dict:
+    """Get dashboard totals with the most recently added users and clients"""
+    recent_users = db.query(models.User).filter(
+        models.User.admin_id == admin_id
+    ).order_by(models.User.created_date.desc()).limit(5).all()
+    recent_clients = db.query(models.Client).filter(
+        models.Client.admin_id == admin_id
+    ).order_by(models.Client.created_date.desc()).limit(5).all()
+    
+    return {
+        **get_dashboard_totals(db, admin_id),
+        'recent_users': recent_users,
+        'recent_clients': recent_clients
+    }
+
+# Pagination and filtering
+def encode_cursor(created_date: datetime, row_id: int) -> str:
+    """Encode a keyset cursor for the row after which the next page starts"""
+    raw = f"{created_date.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple:
+    """Decode a keyset cursor into (created_date, id)"""
+    try:
+        created_date, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_date), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+def filter_date_range(query, column, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Restrict a query to rows created on or between two dates"""
+    if date_from is not None:
+        query = query.filter(column >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        query = query.filter(column < datetime.combine(date_to + timedelta(days=1), time.min))
+    return query
+
+def paginate(query, model, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """Order a query by (created_date, id) and seek past the cursor"""
+    if cursor:
+        created_date, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            model.created_date > created_date,
+            and_(model.created_date == created_date, model.id > row_id)
+        ))
+    query = query.order_by(model.created_date, model.id)
+    if limit:
+        query = query.limit(limit)
+    return query
+
+def get_next_cursor(rows: list, limit: Optional[int] = None) -> Optional[str]:
+    """Get the cursor for the page after a full page of rows"""
+    if not limit or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1].created_date, rows[-1].id)
+
+def read_all(db: Session, stmt, columns: Optional[list] = None) -> list:
+    """Run a read-only select as model objects, or as plain rows when it selects columns"""
+    if columns:
+        # Rows read on the connection skip the identity map and attribute instrumentation
+        return db.connection().execute(stmt).all()
+    return db.execute(stmt).scalars().all()
+
+def fill_missing_columns(table, rows: List[dict]) -> List[dict]:
+    """Give every row of a multi-row insert the same columns
+    
+    A Core executemany compiles one statement from the first row's keys, so a
+    credit row following a debit one would lack the debit columns. Missing
+    columns get their default, or NULL.
+    """
+    names = set().union(*rows)
+    if all(len(row) == len(names) for row in rows):
+        return rows
+    
+    fill = {}
+    for name in names:
+        default = table.c[name].default
+        fill[name] = None if default is None else default.arg(None) if default.is_callable else default.arg
+    return [{**fill, **row} for row in rows]
+
+def set_balances_after(rows: List[dict], owner_key: str, balances: dict, change) -> List[dict]:
+    """Copy new record values with the balance their owner reaches after each one
+    
+    balances holds each owner's balance after all of the rows; walking back
+    from it, every earlier row's balance is the later one less the later
+    row's change.
+    """
+    remaining = {owner: money.to_paise(balance or 0) for owner, balance in balances.items()}
+    with_balances = [None] * len(rows)
+    for index in range(len(rows) - 1, -1, -1):
+        row = rows[index]
+        owner = row[owner_key]
+        with_balances[index] = {**row, 'balance_after': money.from_paise(remaining[owner])}
+        remaining[owner] -= money.to_paise(change(row))
+    return with_balances
+
+def get_balance_before(db: Session, model, owner_column, owner_id: int, before: datetime) -> float:
+    """Get an owner's balance just before a moment, from the last record before it
+    
+    One seek down the (owner, created_date) index, however many records the owner has.
+    """
+    balance = db.connection().execute(
+        select(model.balance_after)
+        .where(owner_column == owner_id, model.created_date < before)
+        .order_by(model.created_date.desc(), model.id.desc())
+        .limit(1)
+    ).scalar()
+    return balance or 0.0
+
+def find_backdated_owners(db: Session, model, owner_column, owner_key: str, rows: List[dict]) -> set:
+    """Get the owners some of whose new rows do not come after all of their records in date order
+    
+    Rows without a created_date are stamped now and so come last; only rows
+    carrying their own dates, as seeded or imported ones may, are checked.
+    """
+    if not any(row.get('created_date') is not None for row in rows):
+        return set()
+    
+    backdated = set()
+    earliest = {}
+    latest = {}
+    for row in rows:
+        owner = row[owner_key]
+        created = row.get('created_date') or datetime.max
+        if created < latest.get(owner, created):
+            backdated.add(owner)
+        earliest[owner] = min(earliest.get(owner, created), created)
+        latest[owner] = max(latest.get(owner, created), created)
+    
+    newest = db.execute(
+        select(owner_column, func.max(model.created_date))
+        .where(owner_column.in_(list(earliest)))
+        .group_by(owner_column)
+    ).all()
+    backdated.update(owner for owner, created in newest if created is not None and earliest[owner] < created)
+    return backdated
+
+def rebuild_backdated_balances(db: Session, model, owner_column, change, owners: set, inserted: list) -> list:
+    """Recompute the balances of owners given records dated before their others, and re-read the new records"""
+    rebuild_balances(db, model, owner_column, change, list(owners))
+    records = model.__table__
+    return db.connection().execute(
+        select(*records.c).where(records.c.id.in_([row.id for row in inserted])).order_by(records.c.id)
+    ).all()
+
+def rebuild_balances(db: Session, model, owner_column, change, owner_ids: Optional[list] = None):
+    """Recompute balance_after of an owner's records as a running sum, without committing"""
+    records = model.__table__
+    running = select(
+        model.id,
+        func.sum(change).over(partition_by=owner_column, order_by=(model.created_date, model.id)).label("balance")
+    )
+    if owner_ids is not None:
+        running = running.where(owner_column.in_(owner_ids))
+    running = running.subquery()
+    db.execute(update(records).where(records.c.id == running.c.id).values(balance_after=running.c.balance))
+
+# Admin CRUD
+async def create_admin_async(db: AsyncSession, admin_data: schemas.AdminRegister, password_hash: str) -> models.Admin:
+    """Create a new admin from an already hashed password"""
+    result = await db.execute(select(models.Admin).where(models.Admin.name == admin_data.name))
+    if result.scalars().first():
         raise ValueError("Admin with this name already exists")
     
     db_admin = models.Admin(
         name=admin_data.name,
-        password=get_password_hash(admin_data.password)
+        password=password_hash
     )
     db.add(db_admin)
-    db.commit()
-    db.refresh(db_admin)
+    await db.commit()
+    await db.refresh(db_admin)
     return db_admin
 
+async def get_admin_by_name_async(db: AsyncSession, name: str) -> Optional[models.Admin]:
+    """Get admin by name without blocking the event loop"""
+    result = await db.execute(select(models.Admin).where(models.Admin.name == name))
+    return result.scalars().first()
+
 def get_admin_by_uuid(db: Session, admin_uuid: str) -> Optional[models.Admin]:
     """Get admin by UUID"""
     return db.query(models.Admin).filter(models.Admin.uuid == admin_uuid).first()
 
+async def get_admin_by_uuid_async(db: AsyncSession, admin_uuid: str) -> Optional[models.Admin]:
+    """Get admin by UUID without blocking the event loop"""
+    result = await db.execute(select(models.Admin).where(models.Admin.uuid == admin_uuid))
+    return result.scalars().first()
+
+def get_data_version(db: Session, admin_id: int) -> int:
+    """Get the current version of an admin's data"""
+    return db.execute(
+        select(models.Admin.data_version).where(models.Admin.id == admin_id)
+    ).scalar() or 0
+
+async def get_data_version_async(db: AsyncSession, admin_id: int) -> int:
+    """Get the current version of an admin's data without blocking the event loop"""
+    result = await db.execute(
+        select(models.Admin.data_version).where(models.Admin.id == admin_id)
+    )
+    return result.scalar() or 0
+
+def bump_data_version(db: Session, admin_id: Optional[int] = None, step: int = 1) -> Optional[int]:
+    """Advance the data version of an admin, or of every admin, in the current transaction"""
+    admins = models.Admin.__table__
+    stmt = update(admins).values(data_version=admins.c.data_version + step)
+    if admin_id is None:
+        db.execute(stmt)
+        return None
+    return db.execute(stmt.where(admins.c.id == admin_id).returning(admins.c.data_version)).scalar()
+
+def publish_change(db: Session, admin_id: int, version: int, event_type: str, data: Optional[dict] = None, totals: Optional[dict] = None):
+    """Push a committed change, with the admin's new dashboard totals, to its live event streams and their history"""
+    if not events.broker.wants_events(admin_id):
+        return
+    if totals is None:
+        totals = get_dashboard_totals(db, admin_id)
+    events.broker.publish(admin_id, version, event_type, {**(data or {}), 'totals': totals})
+
 # User CRUD
 def create_user(db: Session, admin_id: int, user_data: schemas.UserCreate) -> models.User:
     """Create a new user"""
@@ -171,13 +444,67 @@ def create_user(db: Session, admin_id: int, user_data: schemas.UserCreate) -> mo
         location=user_data.location
     )
     db.add(db_user)
+    version = bump_data_version(db, admin_id)
     db.commit()
+    cache.invalidate_user_results(admin_id)
     db.refresh(db_user)
+    publish_change(db, admin_id, version, "user_created", {
+        'user': schemas.UserResponse.model_validate(db_user).model_dump(mode="json")
+    })
     return db_user
 
-def get_users_by_admin(db: Session, admin_id: int) -> List[models.User]:
-    """Get all users for an admin"""
-    return db.query(models.User).filter(models.User.admin_id == admin_id).all()
+def bulk_create_users(db: Session, admin_id: int, users: List[schemas.UserCreate]) -> int:
+    """Insert a batch of users in one transaction"""
+    if not users:
+        return 0
+    
+    db.execute(insert(models.User), [
+        {'admin_id': admin_id, **user_data.model_dump()}
+        for user_data in users
+    ])
+    version = bump_data_version(db, admin_id)
+    db.commit()
+    cache.invalidate_user_results(admin_id)
+    publish_change(db, admin_id, version, "refresh")
+    return len(users)
+
+def get_users_by_admin(
+    db: Session,
+    admin_id: int,
+    is_active: Optional[bool] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    columns: Optional[list] = None
+) -> list:
+    """Get users for an admin, optionally filtered and paginated
+    
+    With columns, plain rows of just those columns are returned instead of User objects.
+    """
+    stmt = select(*(columns or [models.User])).where(models.User.admin_id == admin_id)
+    if is_active is not None:
+        stmt = stmt.where(models.User.is_active == is_active)
+    stmt = filter_date_range(stmt, models.User.created_date, date_from, date_to)
+    return read_all(db, paginate(stmt, models.User, cursor, limit), columns)
+
+def get_users_page(db: Session, admin_id: int) -> dict:
+    """Get all users for an admin with their balances and the pending total"""
+    users = get_users_by_admin(db, admin_id, columns=schema_columns(models.User, schemas.UserResponse))
+    entries = [
+        {'user': user, 'calc': calculate_user_balance(user)}
+        for user in users
+    ]
+    
+    return {
+        'total_pending': money.sum_amounts(entry['calc']['sum_deficit'] for entry in entries if entry['calc']['sum_deficit'] > 0),
+        'users': entries
+    }
+
+def get_user_ids_by_admin(db: Session, admin_id: int) -> set:
+    """Get the ids of all users of an admin"""
+    rows = db.query(models.User.id).filter(models.User.admin_id == admin_id).all()
+    return {user_id for (user_id,) in rows}
 
 def get_user_by_id(db: Session, user_id: int, admin_id: int) -> Optional[models.User]:
     """Get user by ID for specific admin"""
@@ -199,16 +526,32 @@ def update_user_status(db: Session, user_id: int, admin_id: int, is_active: bool
     if user:
         user.is_active = is_active
         user.updated_date = datetime.utcnow()
+        version = bump_data_version(db, admin_id)
         db.commit()
+        cache.invalidate_user_results(admin_id, [user_id])
         db.refresh(user)
+        publish_change(db, admin_id, version, "user_updated", {
+            'user': schemas.UserResponse.model_validate(user).model_dump(mode="json")
+        })
     return user
 
-def add_user_record(db: Session, user_id: int, record_data: schemas.UserRecordCreate) -> models.UserRecord:
-    """Add a transaction record for a user"""
-    db_record = models.UserRecord(
-        user_id=user_id,
-        transaction_type=models.TransactionType[record_data.transaction_type.value.upper()]
-    )
+def get_user_record_error(record_data: schemas.UserRecordCreate) -> Optional[str]:
+    """Check that a user record has the fields its transaction type requires"""
+    if record_data.transaction_type == schemas.TransactionTypeEnum.DEBIT:
+        if not all([record_data.bags, record_data.product_type, record_data.kg, 
+                    record_data.cut_weight is not None, record_data.amount_per_kg]):
+            return "All debit fields are required for debit transaction"
+    elif record_data.transaction_type == schemas.TransactionTypeEnum.CREDIT:
+        if not record_data.credit_amount:
+            return "Credit amount is required for credit transaction"
+    return None
+
+def build_user_record_values(user_id: int, record_data: schemas.UserRecordCreate) -> dict:
+    """Build the column values of a user record, calculating debit fields"""
+    values = {
+        'user_id': user_id,
+        'transaction_type': models.TransactionType[record_data.transaction_type.value.upper()]
+    }
     
     if record_data.transaction_type == schemas.TransactionTypeEnum.DEBIT:
         # Calculate debit values
@@ -219,29 +562,198 @@ def add_user_record(db: Session, user_id: int, record_data: schemas.UserRecordCr
             'amount_per_kg': record_data.amount_per_kg
         })
         
-        db_record.bags = record_data.bags
-        db_record.product_type = record_data.product_type
-        db_record.kg = record_data.kg
-        db_record.cut_weight = record_data.cut_weight
-        db_record.amount_per_kg = record_data.amount_per_kg
-        db_record.net_weight = calc_values['net_weight']
-        db_record.rough_amount = calc_values['rough_amount']
-        db_record.tax = calc_values['tax']
-        db_record.levi = calc_values['levi']
-        db_record.net_amount = calc_values['net_amount']
+        values.update({
+            'bags': record_data.bags,
+            'product_type': record_data.product_type,
+            'kg': record_data.kg,
+            'cut_weight': record_data.cut_weight,
+            'amount_per_kg': record_data.amount_per_kg,
+            **calc_values
+        })
     else:
         # Credit transaction
-        db_record.credit_amount = record_data.credit_amount
-        db_record.round_off = record_data.round_off or 0
+        values.update({
+            'credit_amount': money.round_amount(record_data.credit_amount),
+            'round_off': money.round_amount(record_data.round_off or 0)
+        })
+    
+    return values
+
+def apply_user_totals(db: Session, rows: List[dict]):
+    """Add the amounts of new user records to their users' running totals"""
+    deltas = {}
+    for row in rows:
+        debit, credit = deltas.get(row['user_id'], (0, 0))
+        if row['transaction_type'] == models.TransactionType.DEBIT:
+            debit += row.get('net_amount') or 0
+        else:
+            credit += row.get('credit_amount') or 0
+        deltas[row['user_id']] = (debit, credit)
+    
+    users = models.User.__table__
+    db.execute(
+        update(users).where(users.c.id == bindparam('b_id')).values(
+            debit_total=users.c.debit_total + bindparam('b_debit'),
+            credit_total=users.c.credit_total + bindparam('b_credit'),
+            # A new record is not an edit of the user
+            updated_date=users.c.updated_date
+        ),
+        [
+            {'b_id': user_id, 'b_debit': debit, 'b_credit': credit}
+            for user_id, (debit, credit) in deltas.items()
+        ]
+    )
+
+def user_record_change(row: dict) -> float:
+    """Get how much a new user record moves its user's balance"""
+    if row['transaction_type'] == models.TransactionType.DEBIT:
+        return row.get('net_amount') or 0
+    return -(row.get('credit_amount') or 0)
+
+# The same change in SQL, for rebuilding balances from stored records
+USER_RECORD_CHANGE = case(
+    (models.UserRecord.transaction_type == models.TransactionType.DEBIT, func.coalesce(models.UserRecord.net_amount, 0)),
+    else_=-func.coalesce(models.UserRecord.credit_amount, 0)
+)
+
+def rebuild_user_balances(db: Session, user_ids: Optional[list] = None):
+    """Recompute the balance stored on each user record, without committing"""
+    rebuild_balances(db, models.UserRecord, models.UserRecord.user_id, USER_RECORD_CHANGE, user_ids)
+
+def insert_user_records(db: Session, rows: List[dict]) -> list:
+    """Insert user record values and add them to their users' running totals, without committing
     
-    db.add(db_record)
+    Each record stores its user's balance once it is applied and is added into
+    the daily rollups. The new records are read back with RETURNING, as rows in
+    the order of the values.
+    """
+    # Moving the totals first locks the users' rows, so each record's balance
+    # can be counted back from the new totals without another write in between
+    apply_user_totals(db, rows)
+    backdated = find_backdated_owners(db, models.UserRecord, models.UserRecord.user_id, 'user_id', rows)
+    users = models.User.__table__
+    owners = db.execute(
+        select(users.c.id, users.c.admin_id, users.c.debit_total - users.c.credit_total)
+        .where(users.c.id.in_({row['user_id'] for row in rows}))
+    ).all()
+    rows = set_balances_after(rows, 'user_id', {user_id: balance for user_id, _, balance in owners}, user_record_change)
+    
+    records = models.UserRecord.__table__
+    inserted = db.connection().execute(
+        insert(records).returning(*records.c, sort_by_parameter_order=True), fill_missing_columns(records, rows)
+    ).all()
+    if backdated:
+        # Counting back only holds for records after all others; earlier ones move every later balance
+        inserted = rebuild_backdated_balances(
+            db, models.UserRecord, models.UserRecord.user_id, USER_RECORD_CHANGE, backdated, inserted
+        )
+    rollups.add_user_records(db, {user_id: admin_id for user_id, admin_id, _ in owners}, inserted)
+    return inserted
+
+def add_user_record(db: Session, user_id: int, admin_id: int, record_data: schemas.UserRecordCreate):
+    """Add a transaction record for a user"""
+    record, = insert_user_records(db, [build_user_record_values(user_id, record_data)])
+    version = bump_data_version(db, admin_id)
     db.commit()
-    db.refresh(db_record)
-    return db_record
+    cache.invalidate_user_results(admin_id, [user_id])
+    publish_change(db, admin_id, version, "user_record", {
+        'record': schemas.UserRecordResponse.model_validate(record).model_dump(mode="json")
+    })
+    return record
 
-def get_user_records(db: Session, user_id: int) -> List[models.UserRecord]:
-    """Get all records for a user"""
-    return db.query(models.UserRecord).filter(models.UserRecord.user_id == user_id).all()
+def bulk_add_user_records(db: Session, admin_id: int, rows: List[dict]) -> int:
+    """Insert a batch of user record values and update totals in one transaction"""
+    if not rows:
+        return 0
+    
+    insert_user_records(db, rows)
+    version = bump_data_version(db, admin_id)
+    db.commit()
+    cache.invalidate_user_results(admin_id, {row['user_id'] for row in rows})
+    publish_change(db, admin_id, version, "refresh")
+    return len(rows)
+
+# Columns of a user's record details; whether a record is listed as a credit is decided in SQL
+USER_RECORD_DETAIL_COLUMNS = [
+    models.UserRecord.id,
+    models.UserRecord.created_date,
+    (models.UserRecord.transaction_type == models.TransactionType.CREDIT).label("is_credit"),
+    models.UserRecord.credit_amount,
+    models.UserRecord.round_off,
+    models.UserRecord.bags,
+    models.UserRecord.product_type,
+    models.UserRecord.kg,
+    models.UserRecord.cut_weight,
+    models.UserRecord.net_weight,
+    models.UserRecord.amount_per_kg,
+    models.UserRecord.rough_amount,
+    models.UserRecord.tax,
+    models.UserRecord.levi,
+    models.UserRecord.net_amount,
+]
+
+def get_user_records(
+    db: Session,
+    user_id: int,
+    transaction_type: Optional[schemas.TransactionTypeEnum] = None,
+    product_type: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    columns: Optional[list] = None
+) -> list:
+    """Get records for a user, optionally filtered and paginated
+    
+    With columns, plain rows of just those columns are returned instead of UserRecord objects.
+    """
+    stmt = select(*(columns or [models.UserRecord])).where(models.UserRecord.user_id == user_id)
+    if transaction_type is not None:
+        stmt = stmt.where(
+            models.UserRecord.transaction_type == models.TransactionType[transaction_type.value.upper()]
+        )
+    if product_type is not None:
+        stmt = stmt.where(models.UserRecord.product_type == product_type)
+    stmt = filter_date_range(stmt, models.UserRecord.created_date, date_from, date_to)
+    return read_all(db, paginate(stmt, models.UserRecord, cursor, limit), columns)
+
+def get_user_statement(db: Session, user: models.User, date_from: Optional[date] = None, date_to: Optional[date] = None) -> dict:
+    """Get a user's records over a period with the balance before and after it
+    
+    The opening balance is one index seek and the records one range scan, so
+    the cost follows the records in the period, not the user's whole history.
+    """
+    opening = 0.0
+    if date_from is not None:
+        opening = get_balance_before(
+            db, models.UserRecord, models.UserRecord.user_id, user.id, datetime.combine(date_from, time.min)
+        )
+    records = get_user_records(
+        db, user.id, date_from=date_from, date_to=date_to,
+        columns=schema_columns(models.UserRecord, schemas.UserRecordResponse)
+    )
+    
+    return {
+        'user_id': user.id,
+        'user_name': f"{user.first_name} {user.last_name}",
+        'date_from': date_from,
+        'date_to': date_to,
+        'opening_balance': opening,
+        'closing_balance': records[-1].balance_after if records else opening,
+        'total_debit': money.sum_amounts(
+            record.net_amount or 0 for record in records if record.transaction_type == models.TransactionType.DEBIT
+        ),
+        'total_credit': money.sum_amounts(
+            record.credit_amount or 0 for record in records if record.transaction_type == models.TransactionType.CREDIT
+        ),
+        'records': validate_rows(schemas.UserRecordResponse, records)
+    }
+
+def get_user_balance_as_of(db: Session, user_id: int, as_of: date) -> float:
+    """Get a user's balance at the end of a day"""
+    return get_balance_before(
+        db, models.UserRecord, models.UserRecord.user_id, user_id, datetime.combine(as_of + timedelta(days=1), time.min)
+    )
 
 # Client CRUD
 def create_client(db: Session, admin_id: int, client_data: schemas.ClientCreate) -> models.Client:
@@ -259,13 +771,71 @@ def create_client(db: Session, admin_id: int, client_data: schemas.ClientCreate)
         phone_number=client_data.phone_number
     )
     db.add(db_client)
+    version = bump_data_version(db, admin_id)
     db.commit()
+    cache.invalidate_client_results(admin_id)
     db.refresh(db_client)
+    publish_change(db, admin_id, version, "client_created", {
+        'client': schemas.ClientResponse.model_validate(db_client).model_dump(mode="json")
+    })
     return db_client
 
-def get_clients_by_admin(db: Session, admin_id: int) -> List[models.Client]:
-    """Get all clients for an admin"""
-    return db.query(models.Client).filter(models.Client.admin_id == admin_id).all()
+def bulk_create_clients(db: Session, admin_id: int, clients: List[schemas.ClientCreate]) -> int:
+    """Insert a batch of clients in one transaction"""
+    if not clients:
+        return 0
+    
+    db.execute(insert(models.Client), [
+        {'admin_id': admin_id, **client_data.model_dump()}
+        for client_data in clients
+    ])
+    version = bump_data_version(db, admin_id)
+    db.commit()
+    cache.invalidate_client_results(admin_id)
+    publish_change(db, admin_id, version, "refresh")
+    return len(clients)
+
+def get_existing_client_usernames(db: Session, usernames: List[str]) -> set:
+    """Get which of the given client usernames are already taken"""
+    if not usernames:
+        return set()
+    rows = db.query(models.Client.username).filter(models.Client.username.in_(usernames)).all()
+    return {username for (username,) in rows}
+
+def get_clients_by_admin(
+    db: Session,
+    admin_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    columns: Optional[list] = None
+) -> list:
+    """Get clients for an admin, optionally filtered and paginated
+    
+    With columns, plain rows of just those columns are returned instead of Client objects.
+    """
+    stmt = select(*(columns or [models.Client])).where(models.Client.admin_id == admin_id)
+    stmt = filter_date_range(stmt, models.Client.created_date, date_from, date_to)
+    return read_all(db, paginate(stmt, models.Client, cursor, limit), columns)
+
+def get_clients_page(db: Session, admin_id: int) -> dict:
+    """Get all clients for an admin with their balances and the pending total"""
+    clients = get_clients_by_admin(db, admin_id, columns=schema_columns(models.Client, schemas.ClientResponse))
+    entries = [
+        {'client': client, 'calc': calculate_client_pending(client)}
+        for client in clients
+    ]
+    
+    return {
+        'total_pending': money.sum_amounts(entry['calc']['pending_amount'] for entry in entries),
+        'clients': entries
+    }
+
+def get_client_ids_by_admin(db: Session, admin_id: int) -> set:
+    """Get the ids of all clients of an admin"""
+    rows = db.query(models.Client.id).filter(models.Client.admin_id == admin_id).all()
+    return {client_id for (client_id,) in rows}
 
 def get_client_by_id(db: Session, client_id: int, admin_id: int) -> Optional[models.Client]:
     """Get client by ID for specific admin"""
@@ -286,29 +856,186 @@ def update_client(db: Session, client_id: int, admin_id: int, client_data: schem
             client.phone_number = client_data.phone_number
         
         client.updated_date = datetime.utcnow()
+        version = bump_data_version(db, admin_id)
         db.commit()
+        cache.invalidate_client_results(admin_id, [client_id])
         db.refresh(client)
+        publish_change(db, admin_id, version, "client_updated", {
+            'client': schemas.ClientResponse.model_validate(client).model_dump(mode="json")
+        })
     return client
 
-def add_client_record(db: Session, client_id: int, record_data: schemas.ClientRecordCreate) -> models.ClientRecord:
-    """Add a transaction record for a client"""
-    db_record = models.ClientRecord(
-        client_id=client_id,
-        transaction_type=models.TransactionType[record_data.transaction_type.value.upper()],
-        credit_amount=record_data.credit_amount,
-        debit_amount=record_data.debit_amount,
-        profit_loss=record_data.profit_loss
+def get_client_record_error(record_data: schemas.ClientRecordCreate) -> Optional[str]:
+    """Check that a client record has the amount its transaction type requires"""
+    if record_data.transaction_type == schemas.TransactionTypeEnum.CREDIT:
+        if not record_data.credit_amount:
+            return "Credit amount is required for credit transaction"
+    elif record_data.transaction_type == schemas.TransactionTypeEnum.DEBIT:
+        if not record_data.debit_amount:
+            return "Debit amount is required for debit transaction"
+    return None
+
+def build_client_record_values(client_id: int, record_data: schemas.ClientRecordCreate) -> dict:
+    """Build the column values of a client record"""
+    return {
+        'client_id': client_id,
+        'transaction_type': models.TransactionType[record_data.transaction_type.value.upper()],
+        'credit_amount': money.round_amount(record_data.credit_amount),
+        'debit_amount': money.round_amount(record_data.debit_amount),
+        'profit_loss': money.round_amount(record_data.profit_loss)
+    }
+
+def apply_client_totals(db: Session, rows: List[dict]):
+    """Add the amounts of new client records to their clients' running totals"""
+    deltas = {}
+    for row in rows:
+        debit, credit, profit_loss = deltas.get(row['client_id'], (0, 0, 0))
+        deltas[row['client_id']] = (
+            debit + (row.get('debit_amount') or 0),
+            credit + (row.get('credit_amount') or 0),
+            profit_loss + (row.get('profit_loss') or 0)
+        )
+    
+    clients = models.Client.__table__
+    db.execute(
+        update(clients).where(clients.c.id == bindparam('b_id')).values(
+            debit_total=clients.c.debit_total + bindparam('b_debit'),
+            credit_total=clients.c.credit_total + bindparam('b_credit'),
+            profit_loss_total=clients.c.profit_loss_total + bindparam('b_profit_loss'),
+            # A new record is not an edit of the client
+            updated_date=clients.c.updated_date
+        ),
+        [
+            {'b_id': client_id, 'b_debit': debit, 'b_credit': credit, 'b_profit_loss': profit_loss}
+            for client_id, (debit, credit, profit_loss) in deltas.items()
+        ]
     )
+
+def client_record_change(row: dict) -> float:
+    """Get how much a new client record moves its client's pending amount"""
+    return money.sum_amounts([row.get('debit_amount') or 0, -(row.get('credit_amount') or 0), row.get('profit_loss') or 0])
+
+# The same change in SQL, for rebuilding balances from stored records
+CLIENT_RECORD_CHANGE = (
+    func.coalesce(models.ClientRecord.debit_amount, 0)
+    - func.coalesce(models.ClientRecord.credit_amount, 0)
+    + func.coalesce(models.ClientRecord.profit_loss, 0)
+)
+
+def rebuild_client_balances(db: Session, client_ids: Optional[list] = None):
+    """Recompute the pending amount stored on each client record, without committing"""
+    rebuild_balances(db, models.ClientRecord, models.ClientRecord.client_id, CLIENT_RECORD_CHANGE, client_ids)
+
+def insert_client_records(db: Session, rows: List[dict]) -> list:
+    """Insert client record values and add them to their clients' running totals, without committing
     
-    db.add(db_record)
+    Each record stores its client's pending amount once it is applied and is
+    added into the daily rollups. The new records are read back with RETURNING,
+    as rows in the order of the values.
+    """
+    apply_client_totals(db, rows)
+    backdated = find_backdated_owners(db, models.ClientRecord, models.ClientRecord.client_id, 'client_id', rows)
+    clients = models.Client.__table__
+    owners = db.execute(
+        select(clients.c.id, clients.c.admin_id, clients.c.debit_total - clients.c.credit_total + clients.c.profit_loss_total)
+        .where(clients.c.id.in_({row['client_id'] for row in rows}))
+    ).all()
+    rows = set_balances_after(rows, 'client_id', {client_id: balance for client_id, _, balance in owners}, client_record_change)
+    
+    records = models.ClientRecord.__table__
+    inserted = db.connection().execute(
+        insert(records).returning(*records.c, sort_by_parameter_order=True), fill_missing_columns(records, rows)
+    ).all()
+    if backdated:
+        inserted = rebuild_backdated_balances(
+            db, models.ClientRecord, models.ClientRecord.client_id, CLIENT_RECORD_CHANGE, backdated, inserted
+        )
+    rollups.add_client_records(db, {client_id: admin_id for client_id, admin_id, _ in owners}, inserted)
+    return inserted
+
+def add_client_record(db: Session, client_id: int, admin_id: int, record_data: schemas.ClientRecordCreate):
+    """Add a transaction record for a client"""
+    record, = insert_client_records(db, [build_client_record_values(client_id, record_data)])
+    version = bump_data_version(db, admin_id)
     db.commit()
-    db.refresh(db_record)
+    cache.invalidate_client_results(admin_id, [client_id])
+    publish_change(db, admin_id, version, "client_record", {
+        'record': schemas.ClientRecordResponse.model_validate(record).model_dump(mode="json")
+    })
+    return record
+
+def bulk_add_client_records(db: Session, admin_id: int, rows: List[dict]) -> int:
+    """Insert a batch of client record values and update totals in one transaction"""
+    if not rows:
+        return 0
     
-    # Update client totals
-    update_client_totals(db, client_id)
+    insert_client_records(db, rows)
+    version = bump_data_version(db, admin_id)
+    db.commit()
+    cache.invalidate_client_results(admin_id, {row['client_id'] for row in rows})
+    publish_change(db, admin_id, version, "refresh")
+    return len(rows)
+
+# Columns of a client's record details; each amount is only selected for the list it belongs in
+CLIENT_RECORD_DETAIL_COLUMNS = [
+    models.ClientRecord.id,
+    models.ClientRecord.created_date,
+    models.ClientRecord.transaction_type,
+    case((models.ClientRecord.credit_amount != 0, models.ClientRecord.credit_amount)).label("credit"),
+    case((models.ClientRecord.debit_amount != 0, models.ClientRecord.debit_amount)).label("debit"),
+    models.ClientRecord.profit_loss,
+    case((models.ClientRecord.profit_loss > 0, "Profit"), else_="Loss").label("profit_loss_type"),
+]
+
+def get_client_records(
+    db: Session,
+    client_id: int,
+    transaction_type: Optional[schemas.TransactionTypeEnum] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    columns: Optional[list] = None
+) -> list:
+    """Get records for a client, optionally filtered and paginated
+    
+    With columns, plain rows of just those columns are returned instead of ClientRecord objects.
+    """
+    stmt = select(*(columns or [models.ClientRecord])).where(models.ClientRecord.client_id == client_id)
+    if transaction_type is not None:
+        stmt = stmt.where(
+            models.ClientRecord.transaction_type == models.TransactionType[transaction_type.value.upper()]
+        )
+    stmt = filter_date_range(stmt, models.ClientRecord.created_date, date_from, date_to)
+    return read_all(db, paginate(stmt, models.ClientRecord, cursor, limit), columns)
+
+def get_client_statement(db: Session, client: models.Client, date_from: Optional[date] = None, date_to: Optional[date] = None) -> dict:
+    """Get a client's records over a period with the pending amount before and after it"""
+    opening = 0.0
+    if date_from is not None:
+        opening = get_balance_before(
+            db, models.ClientRecord, models.ClientRecord.client_id, client.id, datetime.combine(date_from, time.min)
+        )
+    records = get_client_records(
+        db, client.id, date_from=date_from, date_to=date_to,
+        columns=schema_columns(models.ClientRecord, schemas.ClientRecordResponse)
+    )
     
-    return db_record
+    return {
+        'client_id': client.id,
+        'client_name': client.name,
+        'date_from': date_from,
+        'date_to': date_to,
+        'opening_balance': opening,
+        'closing_balance': records[-1].balance_after if records else opening,
+        'total_debit': money.sum_amounts(record.debit_amount or 0 for record in records),
+        'total_credit': money.sum_amounts(record.credit_amount or 0 for record in records),
+        'profit_loss_total': money.sum_amounts(record.profit_loss or 0 for record in records),
+        'records': validate_rows(schemas.ClientRecordResponse, records)
+    }
 
-def get_client_records(db: Session, client_id: int) -> List[models.ClientRecord]:
-    """Get all records for a client"""
-    return db.query(models.ClientRecord).filter(models.ClientRecord.client_id == client_id).all()
\ No newline at end of file
+def get_client_balance_as_of(db: Session, client_id: int, as_of: date) -> float:
+    """Get a client's pending amount at the end of a day"""
+    return get_balance_before(
+        db, models.ClientRecord, models.ClientRecord.client_id, client_id, datetime.combine(as_of + timedelta(days=1), time.min)
+    )
\ No newline at end of file
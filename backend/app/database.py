@@ -1,9 +1,11 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from dotenv import load_dotenv
 
@@ -12,15 +14,118 @@ load_dotenv()
 # SQLite database URL
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./vms_database.db")
 
+# Engine profiles, selected with DB_PROFILE:
+#   engine   - create_engine pool arguments
+#   pragmas  - PRAGMAs run on every new SQLite connection
+#   settings - SET statements run on every new PostgreSQL connection
+ENGINE_PROFILES = {
+    "dev": {
+        "dialect": None,
+        "engine": {},
+        "pragmas": {},
+        "settings": {},
+    },
+    "sqlite-prod": {
+        "dialect": "sqlite",
+        "engine": {"pool_size": 8, "max_overflow": 8, "pool_timeout": 30},
+        "pragmas": {
+            "journal_mode": "WAL",  # Readers no longer block the writer
+            "synchronous": "NORMAL",  # Durable across crashes of the app, fsync only at checkpoints
+            "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+            "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+            "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024))),
+            "temp_store": "MEMORY",
+        },
+        "settings": {},
+    },
+    "postgres-prod": {
+        "dialect": "postgresql",
+        "engine": {
+            "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+            "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            "pool_timeout": 30,
+            "pool_recycle": 1800,
+            "pool_pre_ping": True,
+        },
+        "pragmas": {},
+        "settings": {
+            "statement_timeout": int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000")),
+            "lock_timeout": int(os.getenv("DB_LOCK_TIMEOUT_MS", "5000")),
+            "idle_in_transaction_session_timeout": 60000,
+        },
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+if DB_PROFILE not in ENGINE_PROFILES:
+    raise ValueError(f"Unknown DB_PROFILE {DB_PROFILE!r}, expected one of {', '.join(ENGINE_PROFILES)}")
+engine_profile = ENGINE_PROFILES[DB_PROFILE]
+
+DATABASE_DIALECT = "sqlite" if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else "postgresql"
+if engine_profile["dialect"] not in (None, DATABASE_DIALECT):
+    raise ValueError(f"DB_PROFILE {DB_PROFILE!r} needs a {engine_profile['dialect']} DATABASE_URL")
+
+# Threads serving sync endpoints; by default as many as the pool has connections
+pool_options = engine_profile["engine"]
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "0")) or (
+    pool_options["pool_size"] + pool_options["max_overflow"] if "pool_size" in pool_options else None
+)
+
+def apply_connection_settings(dbapi_connection, profile: dict):
+    """Run a profile's PRAGMAs and SET statements on a DBAPI connection"""
+    settings = profile["settings"]
+    if settings:
+        # psycopg2 and asyncpg would run the SETs in a transaction of their own, which
+        # the pool's reset-on-return rollback undoes; in autocommit they outlive it
+        autocommit = dbapi_connection.autocommit
+        dbapi_connection.autocommit = True
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in profile["pragmas"].items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        for name, value in settings.items():
+            cursor.execute(f"SET {name} = {int(value)}")
+    finally:
+        cursor.close()
+        if settings:
+            dbapi_connection.autocommit = autocommit
+
+def configure_connection(dbapi_connection, connection_record):
+    """Apply the profile's per-connection settings to a new DBAPI connection"""
+    apply_connection_settings(dbapi_connection, engine_profile)
+
 # Create engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
+    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {},
+    **engine_profile["engine"]
 )
+event.listen(engine, "connect", configure_connection)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def get_async_database_url(url: str) -> str:
+    """Map a sync database URL to its asyncio driver (aiosqlite / asyncpg)"""
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    for prefix in ("postgresql://", "postgres://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", get_async_database_url(SQLALCHEMY_DATABASE_URL))
+
+# Async engine for code running on the event loop
+# aiosqlite defaults to NullPool, which would ignore the profile's pool sizing
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **({"poolclass": AsyncAdaptedQueuePool, **pool_options} if "pool_size" in pool_options else {})
+)
+event.listen(async_engine.sync_engine, "connect", configure_connection)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 # Create Base class
 Base = declarative_base()
 
@@ -32,4 +137,11 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    """
+    Dependency to get an async database session
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
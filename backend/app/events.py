@@ -0,0 +1,147 @@
+"""
+Per-admin live event channel
+
+Write paths publish each committed change here, from whichever thread ran
+them; the server-sent event streams of the admin's open dashboards receive
+it on their event loop. Event ids are the admin's data version, so a
+client reconnecting with Last-Event-ID is replayed what it missed from the
+recent history, or told to refresh when that history has a gap. The history
+outlives the admin's last stream by EVENT_HISTORY_TTL_SECONDS, so a single
+tab that reconnects still finds the events written while it was away.
+"""
+from collections import deque
+from typing import Optional
+import asyncio
+import json
+import os
+import threading
+import time
+
+# Recent events kept per admin for reconnecting clients
+EVENT_HISTORY_SIZE = int(os.getenv("EVENT_HISTORY_SIZE", "100"))
+
+# How long an admin's history is kept after its last stream closes
+EVENT_HISTORY_TTL_SECONDS = float(os.getenv("EVENT_HISTORY_TTL_SECONDS", "300"))
+
+# Events buffered per subscriber before it is told to refresh instead
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "256"))
+
+class Event:
+    """A published change, encoded once for every subscriber"""
+    
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.message = f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n"
+
+class Subscription:
+    """An event stream's queue on the event loop that serves it"""
+    
+    def __init__(self, broker: "EventBroker", admin_id: int):
+        self.broker = broker
+        self.admin_id = admin_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=EVENT_QUEUE_SIZE)
+    
+    def offer(self, event: Event):
+        """Queue an event; a subscriber too slow to keep up is sent a refresh instead"""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = Event(event.id, "refresh", {})
+        self.queue.put_nowait(event)
+    
+    def close(self):
+        self.broker.unsubscribe(self)
+
+class EventBroker:
+    """Fans published events out to the subscriptions of each admin"""
+    
+    def __init__(self, history_size: int = EVENT_HISTORY_SIZE, history_ttl: float = EVENT_HISTORY_TTL_SECONDS):
+        self.history_size = history_size
+        self.history_ttl = history_ttl
+        self.published = 0
+        self._history = {}
+        self._idle_since = {}
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+    
+    def subscribe(self, admin_id: int) -> Subscription:
+        """Start receiving an admin's events on the running event loop"""
+        subscription = Subscription(self, admin_id)
+        with self._lock:
+            self._subscriptions.setdefault(admin_id, set()).add(subscription)
+            self._idle_since.pop(admin_id, None)
+            self._history.setdefault(admin_id, deque(maxlen=self.history_size))
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.admin_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions and self._subscriptions.pop(subscription.admin_id, None) is not None:
+                # Keep the history for a reconnect; it expires after history_ttl
+                self._idle_since[subscription.admin_id] = time.monotonic()
+    
+    def _expire_history(self):
+        """Drop the history of admins whose last stream closed over history_ttl ago; call with the lock held"""
+        cutoff = time.monotonic() - self.history_ttl
+        for admin_id, since in list(self._idle_since.items()):
+            if since < cutoff:
+                del self._idle_since[admin_id]
+                self._history.pop(admin_id, None)
+    
+    def wants_events(self, admin_id: int) -> bool:
+        """Whether an admin's events are still delivered or kept for a reconnecting stream"""
+        with self._lock:
+            self._expire_history()
+            return admin_id in self._history
+    
+    def publish(self, admin_id: int, event_id: int, event_type: str, data: dict):
+        """Record an event and hand it to every subscription of the admin"""
+        event = Event(event_id, event_type, data)
+        with self._lock:
+            self._expire_history()
+            history = self._history.get(admin_id)
+            if history is None:
+                # No stream has followed this admin recently, so none can resume
+                return
+            history.append(event)
+            self.published += 1
+            subscriptions = list(self._subscriptions.get(admin_id, ()))
+        
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # The stream's event loop has already shut down
+                subscription.close()
+    
+    def replay(self, admin_id: int, last_event_id: int, current_id: int) -> Optional[list]:
+        """Get the events after last_event_id up to current_id, or None if any are missing"""
+        if last_event_id >= current_id:
+            return []
+        
+        with self._lock:
+            # Writes on different threads can publish slightly out of order
+            missed = sorted(
+                (event for event in self._history.get(admin_id, ()) if event.id > last_event_id),
+                key=lambda event: event.id
+            )
+        
+        expected = list(range(last_event_id + 1, current_id + 1))
+        if [event.id for event in missed][:len(expected)] != expected:
+            return None
+        return missed
+    
+    def stats(self) -> dict:
+        """Get subscriber and event counters"""
+        with self._lock:
+            return {
+                "admins": len(self._subscriptions),
+                "subscribers": sum(len(subscriptions) for subscriptions in self._subscriptions.values()),
+                "histories": len(self._history),
+                "published": self.published
+            }
+
+broker = EventBroker()
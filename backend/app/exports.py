@@ -0,0 +1,211 @@
+"""
+Streaming ledger exports
+
+Rows are read through a server-side cursor and written out as they arrive,
+so an export holds only one batch of rows in memory regardless of its size.
+"""
+from datetime import date, datetime
+from enum import Enum
+from sqlalchemy import select
+from typing import Iterable, Iterator, Optional
+from xml.sax.saxutils import escape
+import csv
+import io
+import re
+import zipfile
+from . import crud, models
+from .database import SessionLocal
+
+# Rows fetched from the cursor at a time
+EXPORT_BATCH_SIZE = 1000
+
+USER_RECORD_COLUMNS = [
+    models.UserRecord.id,
+    models.UserRecord.created_date,
+    models.UserRecord.transaction_type,
+    models.UserRecord.bags,
+    models.UserRecord.product_type,
+    models.UserRecord.kg,
+    models.UserRecord.cut_weight,
+    models.UserRecord.net_weight,
+    models.UserRecord.amount_per_kg,
+    models.UserRecord.rough_amount,
+    models.UserRecord.tax,
+    models.UserRecord.levi,
+    models.UserRecord.net_amount,
+    models.UserRecord.credit_amount,
+    models.UserRecord.round_off,
+]
+
+CLIENT_RECORD_COLUMNS = [
+    models.ClientRecord.id,
+    models.ClientRecord.created_date,
+    models.ClientRecord.transaction_type,
+    models.ClientRecord.credit_amount,
+    models.ClientRecord.debit_amount,
+    models.ClientRecord.profit_loss,
+]
+
+def user_ledger_query(admin_id: int, user_id: Optional[int] = None, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Build the select of user records for one user or for every user of an admin"""
+    columns = list(USER_RECORD_COLUMNS)
+    if user_id is None:
+        columns[1:1] = [models.User.id.label("user_id"), models.User.first_name, models.User.last_name]
+    
+    stmt = select(*columns).join(models.User, models.User.id == models.UserRecord.user_id).where(
+        models.User.admin_id == admin_id
+    )
+    if user_id is not None:
+        stmt = stmt.where(models.UserRecord.user_id == user_id)
+    stmt = crud.filter_date_range(stmt, models.UserRecord.created_date, date_from, date_to)
+    return stmt.order_by(models.UserRecord.created_date, models.UserRecord.id)
+
+def client_ledger_query(admin_id: int, client_id: Optional[int] = None, date_from: Optional[date] = None, date_to: Optional[date] = None):
+    """Build the select of client records for one client or for every client of an admin"""
+    columns = list(CLIENT_RECORD_COLUMNS)
+    if client_id is None:
+        columns[1:1] = [models.Client.id.label("client_id"), models.Client.name.label("client_name")]
+    
+    stmt = select(*columns).join(models.Client, models.Client.id == models.ClientRecord.client_id).where(
+        models.Client.admin_id == admin_id
+    )
+    if client_id is not None:
+        stmt = stmt.where(models.ClientRecord.client_id == client_id)
+    stmt = crud.filter_date_range(stmt, models.ClientRecord.created_date, date_from, date_to)
+    return stmt.order_by(models.ClientRecord.created_date, models.ClientRecord.id)
+
+def iter_rows(stmt) -> Iterator[tuple]:
+    """Stream the rows of a select on a session owned by the export"""
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for row in result:
+            yield tuple(row)
+    finally:
+        db.close()
+
+def format_cell(value) -> str:
+    """Render a value the way it should appear in an export cell"""
+    if value is None:
+        return ""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def stream_csv(header: list, rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Encode rows as CSV, yielding one chunk per batch of rows"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    
+    count = 0
+    for row in rows:
+        writer.writerow([format_cell(value) for value in row])
+        count += 1
+        if count % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+class _ZipOutput(io.RawIOBase):
+    """Unseekable sink that zipfile writes into and the export drains"""
+    
+    def __init__(self):
+        self.chunks = []
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+    
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Ledger" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+# Characters XML 1.0 does not allow in text
+_INVALID_XML_CHARS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+def xlsx_cell(value) -> str:
+    """Render a value as an inline worksheet cell"""
+    if isinstance(value, bool) or value is None or not isinstance(value, (int, float)):
+        text = escape(_INVALID_XML_CHARS.sub("", format_cell(value)))
+        return f'<c t="inlineStr"><is><t>{text}</t></is></c>'
+    return f"<c><v>{value}</v></c>"
+
+def xlsx_row(values) -> str:
+    """Render a worksheet row"""
+    return "<row>" + "".join(xlsx_cell(value) for value in values) + "</row>"
+
+def stream_xlsx(header: list, rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Encode rows as a single-sheet XLSX workbook, yielding zip output as it is produced"""
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, mode="w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr("[Content_Types].xml", XLSX_CONTENT_TYPES)
+        workbook.writestr("_rels/.rels", XLSX_ROOT_RELS)
+        workbook.writestr("xl/workbook.xml", XLSX_WORKBOOK)
+        workbook.writestr("xl/_rels/workbook.xml.rels", XLSX_WORKBOOK_RELS)
+        yield output.drain()
+        
+        with workbook.open("xl/worksheets/sheet1.xml", mode="w", force_zip64=True) as sheet:
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + xlsx_row(header)
+            ).encode())
+            
+            pending = []
+            for row in rows:
+                pending.append(xlsx_row(row))
+                if len(pending) >= EXPORT_BATCH_SIZE:
+                    sheet.write("".join(pending).encode())
+                    pending.clear()
+                    chunk = output.drain()
+                    if chunk:
+                        yield chunk
+            
+            sheet.write(("".join(pending) + "</sheetData></worksheet>").encode())
+    
+    yield output.drain()
@@ -0,0 +1,240 @@
+"""
+Group commit for record inserts
+
+Each add_record request normally commits its own transaction, and SQLite
+writes one transaction at a time, each ending in an fsync, so concurrent
+inserts queue on the write lock and throughput is capped by the fsync rate.
+With GROUP_COMMIT enabled, those requests hand their record to one writer
+thread instead. It collects records until GROUP_COMMIT_MAX_ROWS are waiting
+or GROUP_COMMIT_MAX_DELAY_MS has passed since the first arrived, inserts
+them with the crud bulk functions in a single transaction, reads the new
+records back with RETURNING, and only releases each request once that
+transaction has committed.
+
+Every record still gets its own data version and live event, so clients
+see the same stream as without batching. Whatever goes wrong in a batch,
+each of its requests gets its record or an error, and a request that waits
+longer than GROUP_COMMIT_TIMEOUT_SECONDS answers 503 instead of hanging.
+"""
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Optional
+import logging
+import os
+import queue
+import threading
+import time
+from fastapi import HTTPException, status
+from . import cache, crud, events, schemas
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+GROUP_COMMIT = os.getenv("GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+
+# A batch commits once it holds this many records...
+GROUP_COMMIT_MAX_ROWS = int(os.getenv("GROUP_COMMIT_MAX_ROWS", "256"))
+
+# ...or this long after its first record arrived
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", "2"))
+
+# Longest a request waits for its batch to commit
+GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("GROUP_COMMIT_TIMEOUT_SECONDS", "30"))
+
+class RecordKind:
+    """How one kind of record is inserted, cached and announced"""
+    
+    def __init__(self, event_type: str, owner_column: str, insert, invalidate, response_schema):
+        self.event_type = event_type
+        self.owner_column = owner_column
+        self.insert = insert
+        self.invalidate = invalidate
+        self.response_schema = response_schema
+
+USER_RECORD = RecordKind(
+    "user_record", "user_id",
+    crud.insert_user_records, cache.invalidate_user_results, schemas.UserRecordResponse
+)
+
+CLIENT_RECORD = RecordKind(
+    "client_record", "client_id",
+    crud.insert_client_records, cache.invalidate_client_results, schemas.ClientRecordResponse
+)
+
+class _Write:
+    """A record waiting for its batch to commit"""
+    __slots__ = ("kind", "admin_id", "values", "future", "version")
+    
+    def __init__(self, kind: RecordKind, admin_id: int, values: dict):
+        self.kind = kind
+        self.admin_id = admin_id
+        self.values = values
+        self.future = Future()
+        self.version = None
+
+class GroupCommitPipeline:
+    """Queues record inserts from concurrent requests and commits them in batches"""
+    
+    def __init__(
+        self,
+        max_rows: int = GROUP_COMMIT_MAX_ROWS,
+        max_delay_ms: float = GROUP_COMMIT_MAX_DELAY_MS,
+        timeout_seconds: float = GROUP_COMMIT_TIMEOUT_SECONDS
+    ):
+        self.max_rows = max_rows
+        self.max_delay = max_delay_ms / 1000
+        self.timeout = timeout_seconds
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def submit(self, kind: RecordKind, admin_id: int, values: dict):
+        """Insert record values, returning the new record once its batch has committed"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+        
+        write = _Write(kind, admin_id, values)
+        self._queue.put(write)
+        try:
+            return write.future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="The record is taking too long to commit and may still be saved; check before retrying",
+            )
+    
+    def stop(self):
+        """Commit whatever is queued and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+    
+    def _run(self):
+        try:
+            while True:
+                write = self._queue.get()
+                if write is None:
+                    return
+                
+                batch = [write]
+                deadline = time.monotonic() + self.max_delay
+                while len(batch) < self.max_rows:
+                    try:
+                        write = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if write is None:
+                        # Stop after this batch
+                        self._queue.put(None)
+                        break
+                    batch.append(write)
+                
+                self._flush(batch)
+        finally:
+            # Should the writer ever die, the next submit starts a new one
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+    
+    def _flush(self, batch: list):
+        """Commit a batch and release its requests, failing any still waiting if something breaks"""
+        try:
+            self._flush_batch(batch)
+        except Exception as e:
+            logger.exception("Group commit batch failed")
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_exception(e)
+    
+    def _flush_batch(self, batch: list):
+        """Commit a batch and release its requests, then announce the new records"""
+        db = SessionLocal()
+        try:
+            try:
+                records, by_admin = self._commit(db, batch)
+            except Exception as e:
+                db.rollback()
+                if len(batch) == 1:
+                    batch[0].future.set_exception(e)
+                else:
+                    # Retry one at a time, so a bad record fails only its own request
+                    for write in batch:
+                        self._flush([write])
+                return
+            
+            # The records are committed now, so a cache failure must not fail their requests
+            try:
+                for admin_id, writes in by_admin.items():
+                    for kind in (USER_RECORD, CLIENT_RECORD):
+                        owners = {write.values[kind.owner_column] for write in writes if write.kind is kind}
+                        if owners:
+                            kind.invalidate(admin_id, owners)
+            except Exception:
+                logger.exception("Could not invalidate group-committed results")
+                cache.results_cache.clear()
+            
+            with self._lock:
+                self.batches += 1
+                self.rows += len(batch)
+                self.largest_batch = max(self.largest_batch, len(batch))
+            
+            for write, record in zip(batch, records):
+                write.future.set_result(record)
+            
+            try:
+                self._publish(db, batch, records)
+            except Exception:
+                logger.exception("Could not publish group-committed records")
+        finally:
+            db.close()
+    
+    def _commit(self, db, batch: list) -> tuple:
+        """Insert a batch in one transaction, returning its records in batch order and its writes by admin"""
+        records = {}
+        for kind in (USER_RECORD, CLIENT_RECORD):
+            writes = [write for write in batch if write.kind is kind]
+            if writes:
+                records.update(zip(map(id, writes), kind.insert(db, [write.values for write in writes])))
+        
+        # One version per record, numbered in the order the records were queued
+        by_admin = {}
+        for write in batch:
+            by_admin.setdefault(write.admin_id, []).append(write)
+        for admin_id, writes in by_admin.items():
+            first = crud.bump_data_version(db, admin_id, step=len(writes)) - len(writes) + 1
+            for offset, write in enumerate(writes):
+                write.version = first + offset
+        
+        db.commit()
+        return [records[id(write)] for write in batch], by_admin
+    
+    def _publish(self, db, batch: list, records: list):
+        # Every record's event carries the totals as of the whole batch
+        totals = {}
+        for write, record in zip(batch, records):
+            if not events.broker.wants_events(write.admin_id):
+                continue
+            if write.admin_id not in totals:
+                totals[write.admin_id] = crud.get_dashboard_totals(db, write.admin_id)
+            crud.publish_change(db, write.admin_id, write.version, write.kind.event_type, {
+                'record': write.kind.response_schema.model_validate(record).model_dump(mode="json")
+            }, totals=totals[write.admin_id])
+    
+    def stats(self) -> dict:
+        """Get batch counters"""
+        with self._lock:
+            return {
+                "enabled": True,
+                "batches": self.batches,
+                "rows": self.rows,
+                "largest_batch": self.largest_batch,
+                "queued": self._queue.qsize()
+            }
+
+pipeline: Optional[GroupCommitPipeline] = GroupCommitPipeline() if GROUP_COMMIT else None
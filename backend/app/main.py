@@ -2,18 +2,24 @@
 Main FastAPI application
 """
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+import anyio.to_thread
 from fastapi.middleware.cors import CORSMiddleware
-from .database import engine, Base
-from .routers import admin_router, users_router, clients_router
+from . import auth, cache, events, group_commit, metrics
+from .database import engine, async_engine, Base, DB_PROFILE, WORKER_THREADS
+from .routers import admin_router, users_router, clients_router, imports_router, exports_router, events_router, repricing_router, reports_router
+from .migrations import run_migrations
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+run_migrations()
 
 # Create FastAPI app
 app = FastAPI(
     title="Vendor Management System",
     description="Multi-Admin Platform for Managing Vendors, Buyers, and Transaction Records",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -23,12 +29,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+# Outermost, so request timings include the other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
+
 # Include routers
 app.include_router(admin_router)
 app.include_router(users_router)
 app.include_router(clients_router)
+app.include_router(imports_router)
+app.include_router(exports_router)
+app.include_router(events_router)
+app.include_router(repricing_router)
+app.include_router(reports_router)
+
+@app.on_event("startup")
+async def configure_worker_threads():
+    """Size the threadpool that runs sync endpoints to match the connection pool"""
+    if WORKER_THREADS:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = WORKER_THREADS
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    """Close pooled async connections"""
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+def stop_group_commit():
+    """Commit the records still queued for group commit"""
+    if group_commit.pipeline:
+        group_commit.pipeline.stop()
 
 @app.get("/")
 def root():
@@ -41,9 +75,26 @@ def root():
     }
 
 @app.get("/health")
-def health_check():
+async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy"}
+    return {
+        "status": "healthy",
+        "auth_cache": auth.get_cache_stats(),
+        "results_cache": cache.results_cache.stats(),
+        "events": events.broker.stats(),
+        "password_hashing": auth.get_password_stats(),
+        "group_commit": group_commit.pipeline.stats() if group_commit.pipeline else {"enabled": False},
+        "database": {
+            "profile": DB_PROFILE,
+            "pool": engine.pool.status(),
+            "worker_threads": anyio.to_thread.current_default_thread_limiter().total_tokens
+        }
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Request, database and cache metrics in the Prometheus text format"""
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,242 @@
+"""
+Request and database metrics
+
+MetricsMiddleware times every request and counts it by route template,
+method and status, and tracks how many requests are in flight. Streaming
+responses - the live event streams and the exports - are counted but not
+timed: once their body starts they move from the in-flight gauge to a
+gauge of open streams, as their lifetime is no request latency. SQLAlchemy
+cursor events on both engines add every statement and its duration to the
+request that issued it, found through a context variable that follows the
+request into the threadpool and the async engine's greenlets.
+
+The totals are served in the Prometheus text format on /metrics, along
+with the authentication and result cache counters. Each response also
+carries a Server-Timing header with its own total and database time, so a
+slow endpoint or an N+1 query pattern shows up in the browser's network
+panel as well as in the statements-per-request histogram.
+"""
+from contextvars import ContextVar
+from typing import Optional
+import threading
+import time
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from . import auth, cache
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Upper bounds of the statements-per-request histogram buckets
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# Route label of requests that matched no route, so stray paths add no series
+UNMATCHED_ROUTE = "unmatched"
+
+class DatabaseUsage:
+    """SQL statements a request has run so far and the time they took"""
+    __slots__ = ("statements", "seconds")
+    
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+_request_usage: ContextVar[Optional[DatabaseUsage]] = ContextVar("request_usage", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["statement_started"].pop()
+    usage = _request_usage.get()
+    if usage is not None:
+        usage.statements += 1
+        usage.seconds += elapsed
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("statement_started"):
+        connection.info["statement_started"].pop()
+
+def instrument_engine(engine):
+    """Count the statements a (sync) engine runs toward the current request"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+class Histogram:
+    """Observations counted into cumulative buckets, the way Prometheus expects them"""
+    __slots__ = ("bounds", "counts", "count", "sum")
+    
+    def __init__(self, bounds: tuple):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.sum = 0.0
+    
+    def observe(self, value: float):
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class RequestMetrics:
+    """Per-route request counts, latencies and database usage"""
+    
+    def __init__(self):
+        self.in_flight = 0
+        self.streams_open = 0
+        self.requests = {}
+        self.latency = {}
+        self.statements = {}
+        self.database_seconds = {}
+        self._lock = threading.Lock()
+    
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+    
+    def streaming(self):
+        """Move a request whose response streams from in flight to the open streams"""
+        with self._lock:
+            self.in_flight -= 1
+            self.streams_open += 1
+    
+    def finished(self, route: str, method: str, status: int, seconds: float, usage: DatabaseUsage, streamed: bool = False):
+        """Record a completed request, leaving a streamed one out of the histograms"""
+        key = (route, method)
+        with self._lock:
+            self.requests[(route, method, status)] = self.requests.get((route, method, status), 0) + 1
+            if streamed:
+                self.streams_open -= 1
+                return
+            self.in_flight -= 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.statements[key] = Histogram(STATEMENT_BUCKETS)
+                self.database_seconds[key] = 0.0
+            self.latency[key].observe(seconds)
+            self.statements[key].observe(usage.statements)
+            self.database_seconds[key] += usage.seconds
+    
+    def render(self) -> list:
+        """Get the metric lines in the Prometheus text format"""
+        with self._lock:
+            lines = [
+                "# HELP http_requests_in_flight Requests being served",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}",
+                "# HELP http_streams_open Streaming responses still sending, such as event streams and exports",
+                "# TYPE http_streams_open gauge",
+                f"http_streams_open {self.streams_open}",
+                "# HELP http_requests_total Requests served by route, method and status",
+                "# TYPE http_requests_total counter",
+            ]
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(route=route, method=method, status=status)} {count}")
+            
+            for name, help_text, histograms in (
+                ("http_request_duration_seconds", "Request latency by route and method", self.latency),
+                ("db_statements_per_request", "SQL statements run per request by route and method", self.statements),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (route, method), histogram in sorted(histograms.items()):
+                    for bound, count in zip(histogram.bounds, histogram.counts):
+                        lines.append(f"{name}_bucket{_labels(route=route, method=method, le=float(bound))} {count}")
+                    lines.append(f"{name}_bucket{_labels(route=route, method=method, le='+Inf')} {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(route=route, method=method)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(route=route, method=method)} {histogram.count}")
+            
+            lines += [
+                "# HELP db_statement_seconds_total Time spent in SQL statements by route and method",
+                "# TYPE db_statement_seconds_total counter",
+            ]
+            for (route, method), seconds in sorted(self.database_seconds.items()):
+                lines.append(f"db_statement_seconds_total{_labels(route=route, method=method)} {seconds}")
+        return lines
+
+request_metrics = RequestMetrics()
+
+def server_timing(seconds: float, usage: DatabaseUsage) -> str:
+    """Get the Server-Timing header value of a request so far"""
+    return f'app;dur={seconds * 1000:.1f}, db;dur={usage.seconds * 1000:.1f};desc="{usage.statements} statements"'
+
+class MetricsMiddleware:
+    """ASGI middleware recording every HTTP request in request_metrics"""
+    
+    def __init__(self, app, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        usage = DatabaseUsage()
+        token = _request_usage.set(usage)
+        started = time.perf_counter()
+        status = 500
+        streamed = False
+        
+        async def send_with_timing(message):
+            nonlocal status, streamed
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", server_timing(time.perf_counter() - started, usage))
+            elif message["type"] == "http.response.body" and message.get("more_body") and not streamed:
+                # Only streaming responses send their body in parts
+                streamed = True
+                self.metrics.streaming()
+            await send(message)
+        
+        self.metrics.started()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_usage.reset(token)
+            # The router leaves the matched route in the scope
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.metrics.finished(route, scope["method"], status, time.perf_counter() - started, usage, streamed)
+
+def render_metrics() -> str:
+    """Get every metric in the Prometheus text format"""
+    lines = request_metrics.render()
+    
+    caches = {
+        "auth_tokens": auth.token_cache.stats(),
+        "auth_admins": auth.admin_cache.stats(),
+        "results": cache.results_cache.stats(),
+    }
+    for name, kind, key, help_text in (
+        ("cache_hits_total", "counter", "hits", "Cache lookups answered from the cache"),
+        ("cache_misses_total", "counter", "misses", "Cache lookups that had to compute the value"),
+        ("cache_entries", "gauge", "size", "Entries held by the cache"),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        for cache_name, stats in caches.items():
+            lines.append(f"{name}{_labels(cache=cache_name)} {stats[key]}")
+    
+    password = auth.get_password_stats()
+    lines += [
+        "# HELP password_hashes_pending Password hashes queued or running",
+        "# TYPE password_hashes_pending gauge",
+        f"password_hashes_pending {password['pending']}",
+        "# HELP password_hashes_total Password hashes completed",
+        "# TYPE password_hashes_total counter",
+        f"password_hashes_total {password['completed']}",
+        "# HELP password_hashes_rejected_total Password hashes refused because the queue was full",
+        "# TYPE password_hashes_rejected_total counter",
+        f"password_hashes_rejected_total {password['rejected']}",
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,194 @@
+"""
+Versioned schema migrations
+
+Fresh databases get their tables from Base.metadata.create_all. Migrations
+bring databases created by older releases up to the current models, and
+each one is recorded in the schema_version table so it runs only once.
+
+Usage: python -m app.migrations [--explain]
+"""
+import sys
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text, update
+from sqlalchemy.orm import Session
+from . import crud, models, rollups, search
+from .database import Base, engine
+
+version_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    version_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_date", DateTime, default=datetime.utcnow),
+)
+
+def _add_missing_columns(conn, table_name: str, columns: dict) -> list:
+    """Add columns that are missing from an existing table"""
+    existing = {column["name"] for column in inspect(conn).get_columns(table_name)}
+    missing = [name for name in columns if name not in existing]
+    for name in missing:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {name} {columns[name]}"))
+    return missing
+
+def add_user_running_totals(conn):
+    """Add users.debit_total/credit_total and fill them from user_records"""
+    added = _add_missing_columns(conn, "users", {
+        "debit_total": "FLOAT DEFAULT 0",
+        "credit_total": "FLOAT DEFAULT 0",
+    })
+    if added:
+        crud.reconcile_user_totals(Session(bind=conn))
+
+def create_model_indexes(conn):
+    """Create every index declared on the models"""
+    existing = set(inspect(conn).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing:
+            # Created later along with its indexes
+            continue
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+def add_admin_data_version(conn):
+    """Add admins.data_version"""
+    _add_missing_columns(conn, "admins", {"data_version": "INTEGER NOT NULL DEFAULT 0"})
+
+# Amount columns as they were when migration 4 changed them to whole paise
+MONEY_COLUMNS = {
+    "users": ["debit_total", "credit_total"],
+    "user_records": ["rough_amount", "tax", "levi", "net_amount", "credit_amount", "round_off"],
+    "clients": ["debit_total", "credit_total", "profit_loss_total"],
+    "client_records": ["credit_amount", "debit_amount", "profit_loss"],
+}
+
+def store_money_as_paise(conn):
+    """Convert rupee amounts stored as floats to whole paise, then rebuild the running totals"""
+    converted = set()
+    for table_name, columns in MONEY_COLUMNS.items():
+        types = {column["name"]: column["type"] for column in inspect(conn).get_columns(table_name)}
+        for name in columns:
+            if isinstance(types[name], Integer):
+                # Created from the current models, so already in paise
+                continue
+            converted.add(table_name)
+            if conn.dialect.name == "postgresql":
+                conn.execute(text(
+                    f"ALTER TABLE {table_name} ALTER COLUMN {name} TYPE BIGINT "
+                    f"USING ROUND({name}::numeric * 100)::bigint"
+                ))
+            else:
+                # SQLite cannot change a column's type; its REAL affinity keeps
+                # whole numbers exact, so only the stored values change
+                conn.execute(text(
+                    f"UPDATE {table_name} SET {name} = CAST(ROUND(ROUND({name} * 100, 6)) AS INTEGER)"
+                ))
+    
+    if "user_records" in converted:
+        # Each part was rounded on its own, so a net rounded from their float sum
+        # can be a paisa off; make it the sum of the parts, as new records are
+        records = models.UserRecord.__table__
+        conn.execute(
+            update(records)
+            .where(records.c.transaction_type == models.TransactionType.DEBIT)
+            .values(net_amount=records.c.rough_amount + records.c.tax + records.c.levi)
+        )
+    
+    # Totals summed from unrounded floats may be off by a fraction of a paisa
+    db = Session(bind=conn)
+    crud.reconcile_user_totals(db)
+    crud.reconcile_client_totals(db)
+
+def add_record_balances(conn):
+    """Add balance_after to user and client records and fill it with running sums"""
+    db = Session(bind=conn)
+    if _add_missing_columns(conn, "user_records", {"balance_after": "BIGINT"}):
+        crud.rebuild_user_balances(db)
+    if _add_missing_columns(conn, "client_records", {"balance_after": "BIGINT"}):
+        crud.rebuild_client_balances(db)
+
+def add_record_rollups(conn):
+    """Create the daily rollup tables and fill them from the records"""
+    for model in (models.UserRecordRollup, models.ClientRecordRollup):
+        model.__table__.create(conn, checkfirst=True)
+    db = Session(bind=conn)
+    rollups.rebuild_user_rollups(db)
+    rollups.rebuild_client_rollups(db)
+
+def add_search_indexes(conn):
+    """Create the user and client search indexes"""
+    search.create_search_indexes(conn)
+
+def search_client_locations(conn):
+    """Rebuild the client search index over the client location too"""
+    search.drop_search_index(conn, "clients")
+    search.create_search_index(conn, "clients")
+
+def search_within_admin(conn):
+    """Rebuild the search indexes with each row's admin_id, so a search matches only its admin's rows"""
+    for table_name in search.SEARCH_COLUMNS:
+        search.drop_search_index(conn, table_name)
+        search.create_search_index(conn, table_name)
+
+# (version, description, upgrade function) in the order they must apply
+MIGRATIONS = [
+    (1, "Add running totals to users", add_user_running_totals),
+    (2, "Add owner/created_date indexes", create_model_indexes),
+    (3, "Add data version to admins", add_admin_data_version),
+    (4, "Store money as integer paise", store_money_as_paise),
+    (5, "Add running balances to records", add_record_balances),
+    (6, "Add daily record rollups", add_record_rollups),
+    (7, "Add user and client search indexes", add_search_indexes),
+    (8, "Search client locations", search_client_locations),
+    (9, "Scope search indexes to admins", search_within_admin),
+]
+
+def get_applied_versions(conn) -> set:
+    """Get the migration versions already recorded for a database"""
+    return set(conn.execute(select(schema_version.c.version)).scalars())
+
+def run_migrations(bind=engine) -> list:
+    """Apply pending migrations and return the versions applied"""
+    version_metadata.create_all(bind=bind)
+    
+    applied = []
+    for version, description, upgrade in MIGRATIONS:
+        with bind.begin() as conn:
+            if version in get_applied_versions(conn):
+                continue
+            upgrade(conn)
+            conn.execute(schema_version.insert().values(version=version, description=description))
+        applied.append(version)
+    
+    return applied
+
+# Hot queries whose plans should be index searches rather than table scans
+HOT_QUERIES = {
+    "users by admin": "SELECT * FROM users WHERE admin_id = 1 ORDER BY created_date DESC LIMIT 5",
+    "clients by admin": "SELECT * FROM clients WHERE admin_id = 1 ORDER BY created_date DESC LIMIT 5",
+    "user records": "SELECT * FROM user_records WHERE user_id = 1 ORDER BY created_date",
+    "client records": "SELECT * FROM client_records WHERE client_id = 1 ORDER BY created_date",
+    "user balance as of": (
+        "SELECT balance_after FROM user_records WHERE user_id = 1 AND created_date < '2024-01-01' "
+        "ORDER BY created_date DESC, id DESC LIMIT 1"
+    ),
+}
+
+def explain_hot_queries(bind=engine) -> dict:
+    """Get the SQLite query plan of each hot query"""
+    plans = {}
+    with bind.connect() as conn:
+        for name, sql in HOT_QUERIES.items():
+            rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+            plans[name] = [row[-1] for row in rows]
+    return plans
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations()
+    print(f"Applied migrations: {applied or 'none'}")
+    
+    if "--explain" in sys.argv:
+        for name, plan in explain_hot_queries().items():
+            print(f"{name}: {'; '.join(plan)}")
@@ -1,12 +1,13 @@
 """
 SQLAlchemy database models for VMS
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Boolean, Date, DateTime, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
 import enum
 from .database import Base
+from .money import Money
 
 class TransactionType(enum.Enum):
     """Transaction type enumeration"""
@@ -21,6 +22,7 @@ class Admin(Base):
     name = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)  # Hashed password
     uuid = Column(String, unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    data_version = Column(Integer, default=0, nullable=False)  # Bumped by every write to the admin's data
     created_date = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -30,6 +32,9 @@ class Admin(Base):
 class User(Base):
     """User (Buyer) model"""
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_admin_id_created_date", "admin_id", "created_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=False)
@@ -41,6 +46,8 @@ class User(Base):
     created_date = Column(DateTime, default=datetime.utcnow)
     updated_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    debit_total = Column(Money, default=0.0)
+    credit_total = Column(Money, default=0.0)
     
     # Relationships
     admin = relationship("Admin", back_populates="users")
@@ -49,6 +56,9 @@ class User(Base):
 class UserRecord(Base):
     """User transaction records"""
     __tablename__ = "user_records"
+    __table_args__ = (
+        Index("ix_user_records_user_id_created_date", "user_id", "created_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -62,14 +72,17 @@ class UserRecord(Base):
     cut_weight = Column(Float, nullable=True)
     net_weight = Column(Float, nullable=True)
     amount_per_kg = Column(Float, nullable=True)
-    rough_amount = Column(Float, nullable=True)
-    tax = Column(Float, nullable=True)
-    levi = Column(Float, nullable=True)
-    net_amount = Column(Float, nullable=True)
+    rough_amount = Column(Money, nullable=True)
+    tax = Column(Money, nullable=True)
+    levi = Column(Money, nullable=True)
+    net_amount = Column(Money, nullable=True)
     
     # Credit transaction fields
-    credit_amount = Column(Float, nullable=True)
-    round_off = Column(Float, nullable=True)
+    credit_amount = Column(Money, nullable=True)
+    round_off = Column(Money, nullable=True)
+    
+    # The user's debit minus credit once this record is applied
+    balance_after = Column(Money, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="records")
@@ -77,6 +90,9 @@ class UserRecord(Base):
 class Client(Base):
     """Client (Vendor/Seller) model"""
     __tablename__ = "clients"
+    __table_args__ = (
+        Index("ix_clients_admin_id_created_date", "admin_id", "created_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=False)
@@ -87,9 +103,9 @@ class Client(Base):
     phone_number = Column(String)
     created_date = Column(DateTime, default=datetime.utcnow)
     updated_date = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    debit_total = Column(Float, default=0.0)
-    credit_total = Column(Float, default=0.0)
-    profit_loss_total = Column(Float, default=0.0)
+    debit_total = Column(Money, default=0.0)
+    credit_total = Column(Money, default=0.0)
+    profit_loss_total = Column(Money, default=0.0)
     
     # Relationships
     admin = relationship("Admin", back_populates="clients")
@@ -98,14 +114,58 @@ class Client(Base):
 class ClientRecord(Base):
     """Client transaction records"""
     __tablename__ = "client_records"
+    __table_args__ = (
+        Index("ix_client_records_client_id_created_date", "client_id", "created_date"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"), nullable=False)
     transaction_type = Column(SQLEnum(TransactionType), nullable=False)
     created_date = Column(DateTime, default=datetime.utcnow)
-    credit_amount = Column(Float, nullable=True)
-    debit_amount = Column(Float, nullable=True)
-    profit_loss = Column(Float, nullable=True)
+    credit_amount = Column(Money, nullable=True)
+    debit_amount = Column(Money, nullable=True)
+    profit_loss = Column(Money, nullable=True)
+    
+    # The client's pending amount once this record is applied
+    balance_after = Column(Money, nullable=True)
     
     # Relationships
-    client = relationship("Client", back_populates="records")
\ No newline at end of file
+    client = relationship("Client", back_populates="records")
+
+class UserRecordRollup(Base):
+    """Daily sums of a user's records per product type, kept up to date by every record write"""
+    __tablename__ = "user_record_rollups"
+    __table_args__ = (
+        Index("ix_user_record_rollups_user_id_day", "user_id", "day"),
+    )
+    
+    # Primary key in this order so an admin's date range is one index range
+    admin_id = Column(Integer, ForeignKey("admins.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    product_type = Column(String, primary_key=True)  # "" for credit records
+    
+    records = Column(Integer, nullable=False, default=0)
+    bags = Column(Integer, nullable=False, default=0)
+    kg = Column(Float, nullable=False, default=0.0)
+    net_weight = Column(Float, nullable=False, default=0.0)
+    net_amount = Column(Money, nullable=False, default=0.0)
+    tax = Column(Money, nullable=False, default=0.0)
+    levi = Column(Money, nullable=False, default=0.0)
+    credit_amount = Column(Money, nullable=False, default=0.0)
+
+class ClientRecordRollup(Base):
+    """Daily sums of a client's records, kept up to date by every record write"""
+    __tablename__ = "client_record_rollups"
+    __table_args__ = (
+        Index("ix_client_record_rollups_client_id_day", "client_id", "day"),
+    )
+    
+    admin_id = Column(Integer, ForeignKey("admins.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id"), primary_key=True)
+    
+    records = Column(Integer, nullable=False, default=0)
+    debit_amount = Column(Money, nullable=False, default=0.0)
+    credit_amount = Column(Money, nullable=False, default=0.0)
+    profit_loss = Column(Money, nullable=False, default=0.0)
\ No newline at end of file
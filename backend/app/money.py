@@ -0,0 +1,61 @@
+"""
+Exact money storage
+
+Amounts are kept in the database as whole paise, so sums computed in SQL
+or in Python are exact and match the per-row values. The API still works
+in rupees: Money columns convert on the way in and out.
+
+Rounding policy: an amount is rounded to the nearest paisa, halves away
+from zero, as soon as it is calculated. Derived amounts are computed from
+already-rounded components, so a record's parts always add up to its total.
+"""
+from sqlalchemy import BigInteger
+from sqlalchemy.sql import operators
+from sqlalchemy.types import TypeDecorator
+from typing import Iterable, Optional
+import math
+
+PAISE_PER_RUPEE = 100
+
+def to_paise(amount: Optional[float]) -> Optional[int]:
+    """Convert rupees to whole paise, rounding halves away from zero"""
+    if amount is None:
+        return None
+    # Drop binary noise first, e.g. 1.005 * 100 == 100.49999999999999
+    scaled = round(float(amount) * PAISE_PER_RUPEE, 6)
+    return int(math.copysign(math.floor(abs(scaled) + 0.5), scaled))
+
+def from_paise(paise: Optional[int]) -> Optional[float]:
+    """Convert whole paise to rupees"""
+    if paise is None:
+        return None
+    return round(paise) / PAISE_PER_RUPEE
+
+def round_amount(amount: Optional[float]) -> Optional[float]:
+    """Round rupees to the nearest paisa under the rounding policy"""
+    return from_paise(to_paise(amount))
+
+def sum_amounts(amounts: Iterable[float]) -> float:
+    """Add rupee amounts exactly"""
+    return from_paise(sum(to_paise(amount) for amount in amounts))
+
+class Money(TypeDecorator):
+    """Rupee amount stored as an integer number of paise"""
+    impl = BigInteger
+    cache_ok = True
+    
+    class Comparator(TypeDecorator.Comparator, BigInteger.Comparator):
+        """Keep sums and differences of amounts in SQL typed as Money, so they convert too"""
+        
+        def _adapt_expression(self, op, other_comparator):
+            if op in (operators.add, operators.sub):
+                return op, self.type
+            return super()._adapt_expression(op, other_comparator)
+    
+    comparator_factory = Comparator
+    
+    def process_bind_param(self, value, dialect):
+        return to_paise(value)
+    
+    def process_result_value(self, value, dialect):
+        return from_paise(value)
@@ -0,0 +1,32 @@
+"""
+Rebuild maintained running totals, record balances and rollups from the transaction records
+
+Usage: python -m app.reconcile
+"""
+from . import crud, cache, rollups
+from .database import SessionLocal
+
+def reconcile():
+    """Rebuild all running totals, balances and rollups"""
+    db = SessionLocal()
+    try:
+        crud.reconcile_user_totals(db)
+        crud.reconcile_client_totals(db)
+        crud.rebuild_user_balances(db)
+        crud.rebuild_client_balances(db)
+        rollups.rebuild_user_rollups(db)
+        rollups.rebuild_client_rollups(db)
+        
+        # Responses computed from the old totals are stale now
+        crud.bump_data_version(db)
+        db.commit()
+        cache.results_cache.clear()
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    from .migrations import run_migrations
+    
+    run_migrations()
+    reconcile()
+    print("Running totals reconciled")
@@ -0,0 +1,185 @@
+"""
+Vectorized repricing of debit records
+
+Debit records store amounts derived from bags, kg, cut_weight and
+amount_per_kg at the tax rate and levi in force when they were added.
+Repricing recomputes those amounts for many records at once: records are
+read in chunks of whole users as plain column values and the pricing formula
+is applied to whole NumPy columns per chunk. A dry run only reports the
+effect on each user; otherwise changed records and user totals are
+written back with bulk updates in a single transaction.
+"""
+from datetime import date
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+from typing import Optional
+import numpy as np
+from . import cache, crud, models, money, rollups, schemas
+
+# Debit records read and repriced at a time; a chunk holds whole users,
+# so the records of each user come from one index range and need no sorting
+REPRICE_CHUNK_SIZE = 50000
+REPRICE_USERS_PER_CHUNK = 500
+
+# Stored amounts the formula recomputes, in the order price_debits returns them
+PRICED_COLUMNS = ["amount_per_kg", "net_weight", "rough_amount", "tax", "levi", "net_amount"]
+
+def round_amounts(amounts):
+    """Round a column of rupee amounts to the paisa, the way money.round_amount does"""
+    scaled = np.round(amounts * money.PAISE_PER_RUPEE, 6)
+    return np.copysign(np.floor(np.abs(scaled) + 0.5), scaled) / money.PAISE_PER_RUPEE
+
+def price_debits(bags, kg, cut_weight, amount_per_kg, tax_rate: float = crud.TAX_RATE, levi_per_bag: float = crud.LEVI_PER_BAG) -> dict:
+    """Apply crud.calculate_user_record_debit's formula to whole columns"""
+    net_weight = kg - bags * cut_weight
+    rough_amount = round_amounts(net_weight * amount_per_kg)
+    tax = round_amounts(rough_amount * tax_rate)
+    levi = round_amounts(levi_per_bag * bags)
+    net_amount = round_amounts(rough_amount + tax + levi)
+    
+    return {
+        'amount_per_kg': amount_per_kg,
+        'net_weight': net_weight,
+        'rough_amount': rough_amount,
+        'tax': tax,
+        'levi': levi,
+        'net_amount': net_amount
+    }
+
+def debit_records_query(
+    columns: list,
+    admin_id: int,
+    product_type: Optional[str] = None,
+    user_id: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None
+):
+    """Build a select of columns over an admin's debit records matching the filters"""
+    record = models.UserRecord
+    stmt = select(*columns).join(models.User, models.User.id == record.user_id).where(
+        models.User.admin_id == admin_id,
+        record.transaction_type == models.TransactionType.DEBIT
+    )
+    if product_type is not None:
+        stmt = stmt.where(record.product_type == product_type)
+    if user_id is not None:
+        stmt = stmt.where(record.user_id == user_id)
+    return crud.filter_date_range(stmt, record.created_date, date_from, date_to)
+
+def plan_chunks(counts: list) -> list:
+    """Group (user id, record count) pairs into lists of user ids of about REPRICE_CHUNK_SIZE records"""
+    chunks = [[]]
+    size = 0
+    for user_id, count in counts:
+        if chunks[-1] and (size + count > REPRICE_CHUNK_SIZE or len(chunks[-1]) >= REPRICE_USERS_PER_CHUNK):
+            chunks.append([])
+            size = 0
+        chunks[-1].append(user_id)
+        size += count
+    return [chunk for chunk in chunks if chunk]
+
+def reprice_user_records(db: Session, admin_id: int, request: schemas.RepriceRequest) -> dict:
+    """Reprice an admin's debit records, reporting per-user deltas and writing them unless dry_run"""
+    tax_rate = crud.TAX_RATE if request.tax_rate is None else request.tax_rate
+    levi_per_bag = crud.LEVI_PER_BAG if request.levi_per_bag is None else request.levi_per_bag
+    filters = (admin_id, request.product_type, request.user_id, request.date_from, request.date_to)
+    record = models.UserRecord
+    counts = db.execute(
+        debit_records_query([record.user_id, func.count()], *filters).group_by(record.user_id).order_by(record.user_id)
+    ).all()
+    stmt = debit_records_query([
+        record.id,
+        record.user_id,
+        func.coalesce(record.bags, 0),
+        func.coalesce(record.kg, 0),
+        func.coalesce(record.cut_weight, 0),
+        *(func.coalesce(getattr(record, name), 0) for name in PRICED_COLUMNS)
+    ], *filters).where(record.user_id.in_(bindparam('user_ids', expanding=True)))
+    
+    records = models.UserRecord.__table__
+    write_back = update(records).where(records.c.id == bindparam('b_id')).values(
+        **{name: bindparam(f'b_{name}') for name in PRICED_COLUMNS}
+    )
+    
+    rows_matched = 0
+    rows_changed = {}
+    deltas = {}
+    for user_ids in plan_chunks(counts):
+        # Plain Core rows; the ORM loading layer would double the read time
+        rows = db.connection().execute(stmt, {'user_ids': user_ids}).all()
+        if not rows:
+            continue
+        rows_matched += len(rows)
+        
+        columns = np.array([tuple(row) for row in rows], dtype=np.float64).T
+        ids, owner_ids, bags, kg, cut_weight = columns[:5]
+        stored = dict(zip(PRICED_COLUMNS, columns[5:]))
+        amount_per_kg = stored['amount_per_kg'] if request.amount_per_kg is None else np.full(len(rows), request.amount_per_kg)
+        
+        priced = price_debits(bags, kg, cut_weight, amount_per_kg, tax_rate, levi_per_bag)
+        changed = np.zeros(len(rows), dtype=bool)
+        for name in PRICED_COLUMNS:
+            changed |= ~np.isclose(priced[name], stored[name], rtol=0, atol=1e-9)
+        if not changed.any():
+            continue
+        
+        # Sum the net amount change of each user in the chunk
+        delta = np.where(changed, priced['net_amount'] - stored['net_amount'], 0.0)
+        chunk_users, position = np.unique(owner_ids, return_inverse=True)
+        repriced_users = []
+        for user, user_delta, user_changed in zip(
+            chunk_users.astype(np.int64).tolist(),
+            np.bincount(position, weights=delta).tolist(),
+            np.bincount(position, weights=changed).astype(np.int64).tolist()
+        ):
+            if user_changed:
+                deltas[user] = deltas.get(user, 0.0) + user_delta
+                rows_changed[user] = rows_changed.get(user, 0) + user_changed
+                repriced_users.append(user)
+        
+        if not request.dry_run:
+            values = [ids[changed].astype(np.int64).tolist()] + [priced[name][changed].tolist() for name in PRICED_COLUMNS]
+            db.execute(write_back, [
+                dict(zip(['b_id'] + [f'b_{name}' for name in PRICED_COLUMNS], row))
+                for row in zip(*values)
+            ])
+            # Every balance from a repriced record onwards moves with it, as do its days' rollups
+            crud.rebuild_user_balances(db, repriced_users)
+            rollups.rebuild_user_rollups(db, repriced_users)
+    
+    users = {
+        user.id: user
+        for user in db.query(models.User).filter(models.User.id.in_(deltas)).all()
+    } if deltas else {}
+    report = {
+        'dry_run': request.dry_run,
+        'rows_matched': rows_matched,
+        'rows_changed': sum(rows_changed.values()),
+        'total_delta': money.round_amount(sum(deltas.values())),
+        'users': [
+            {
+                'user_id': user_id,
+                'user_name': f"{users[user_id].first_name} {users[user_id].last_name}",
+                'rows_changed': rows_changed[user_id],
+                'debit_delta': money.round_amount(delta),
+                'pending_before': money.sum_amounts([users[user_id].debit_total, -users[user_id].credit_total]),
+                'pending_after': money.sum_amounts([users[user_id].debit_total, delta, -users[user_id].credit_total])
+            }
+            for user_id, delta in sorted(deltas.items())
+        ]
+    }
+    
+    if request.dry_run or not deltas:
+        db.rollback()
+        return report
+    
+    # Move each user's running total by the change in its debits
+    crud.apply_user_totals(db, [
+        {'user_id': user_id, 'transaction_type': models.TransactionType.DEBIT, 'net_amount': delta}
+        for user_id, delta in deltas.items()
+    ])
+    version = crud.bump_data_version(db, admin_id)
+    db.commit()
+    cache.invalidate_user_results(admin_id, deltas)
+    crud.publish_change(db, admin_id, version, "refresh")
+    return report
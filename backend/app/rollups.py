@@ -0,0 +1,192 @@
+"""
+Daily rollups of user and client records
+
+Reports over months of records would otherwise sum every raw record in
+range. Instead every record insert also adds the record into one row per
+(admin, owner, product type, day) with an upsert in the same transaction,
+so a report reads at most one row per owner, product type and day however
+many records were written. Weeks and months are folded from the days.
+python -m app.reconcile rebuilds the rollups from the records.
+"""
+from datetime import date, timedelta
+from typing import List, Optional
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import models, money
+
+# Summed columns of each rollup, in the order they are selected
+USER_ROLLUP_SUMS = ["records", "bags", "kg", "net_weight", "net_amount", "tax", "levi", "credit_amount"]
+CLIENT_ROLLUP_SUMS = ["records", "debit_amount", "credit_amount", "profit_loss"]
+
+# Summed columns holding money, added up in paise
+MONEY_SUMS = {"net_amount", "tax", "levi", "credit_amount", "debit_amount", "profit_loss"}
+
+def upsert_rollups(db: Session, model, sums: List[str], rows: List[dict]):
+    """Add rows of sums onto the rollup rows with the same key, creating missing ones"""
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    stmt = (postgresql.insert if dialect == "postgresql" else sqlite.insert)(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={name: table.c[name] + stmt.excluded[name] for name in sums}
+    )
+    db.connection().execute(stmt, rows)
+
+def group_by_key(records: list, key) -> dict:
+    """Group new records by the rollup row they add into"""
+    buckets = {}
+    for record in records:
+        buckets.setdefault(key(record), []).append(record)
+    return buckets
+
+def sum_column(records: list, name: str):
+    """Sum one column of some records, treating missing values as zero"""
+    if name in MONEY_SUMS:
+        return money.sum_amounts(getattr(record, name) or 0 for record in records)
+    return sum(getattr(record, name) or 0 for record in records)
+
+def add_user_records(db: Session, admin_ids: dict, records: list):
+    """Add new user records, as read back from their insert, into the daily rollups without committing"""
+    buckets = group_by_key(
+        records, lambda record: (admin_ids[record.user_id], record.created_date.date(), record.user_id, record.product_type or "")
+    )
+    upsert_rollups(db, models.UserRecordRollup, USER_ROLLUP_SUMS, [
+        {
+            'admin_id': admin_id, 'day': day, 'user_id': user_id, 'product_type': product_type,
+            'records': len(bucket),
+            **{name: sum_column(bucket, name) for name in USER_ROLLUP_SUMS[1:]}
+        }
+        for (admin_id, day, user_id, product_type), bucket in buckets.items()
+    ])
+
+def add_client_records(db: Session, admin_ids: dict, records: list):
+    """Add new client records, as read back from their insert, into the daily rollups without committing"""
+    buckets = group_by_key(records, lambda record: (admin_ids[record.client_id], record.created_date.date(), record.client_id))
+    upsert_rollups(db, models.ClientRecordRollup, CLIENT_ROLLUP_SUMS, [
+        {
+            'admin_id': admin_id, 'day': day, 'client_id': client_id,
+            'records': len(bucket),
+            **{name: sum_column(bucket, name) for name in CLIENT_ROLLUP_SUMS[1:]}
+        }
+        for (admin_id, day, client_id), bucket in buckets.items()
+    ])
+
+def rebuild_user_rollups(db: Session, user_ids: Optional[list] = None):
+    """Recompute the user rollups from user_records, without committing"""
+    rollups = models.UserRecordRollup.__table__
+    record = models.UserRecord
+    cleared = delete(rollups)
+    if user_ids is not None:
+        cleared = cleared.where(rollups.c.user_id.in_(user_ids))
+    db.execute(cleared)
+    
+    day = func.date(record.created_date)
+    product_type = func.coalesce(record.product_type, "")
+    sums = select(
+        models.User.admin_id, day, record.user_id, product_type, func.count(),
+        *(func.coalesce(func.sum(getattr(record, name)), 0) for name in USER_ROLLUP_SUMS[1:])
+    ).join(models.User, models.User.id == record.user_id).group_by(models.User.admin_id, day, record.user_id, product_type)
+    if user_ids is not None:
+        sums = sums.where(record.user_id.in_(user_ids))
+    db.execute(insert(rollups).from_select(["admin_id", "day", "user_id", "product_type", *USER_ROLLUP_SUMS], sums))
+
+def rebuild_client_rollups(db: Session, client_ids: Optional[list] = None):
+    """Recompute the client rollups from client_records, without committing"""
+    rollups = models.ClientRecordRollup.__table__
+    record = models.ClientRecord
+    cleared = delete(rollups)
+    if client_ids is not None:
+        cleared = cleared.where(rollups.c.client_id.in_(client_ids))
+    db.execute(cleared)
+    
+    day = func.date(record.created_date)
+    sums = select(
+        models.Client.admin_id, day, record.client_id, func.count(),
+        *(func.coalesce(func.sum(getattr(record, name)), 0) for name in CLIENT_ROLLUP_SUMS[1:])
+    ).join(models.Client, models.Client.id == record.client_id).group_by(models.Client.admin_id, day, record.client_id)
+    if client_ids is not None:
+        sums = sums.where(record.client_id.in_(client_ids))
+    db.execute(insert(rollups).from_select(["admin_id", "day", "client_id", *CLIENT_ROLLUP_SUMS], sums))
+
+def period_start(day: date, period: str) -> date:
+    """Get the first day of the day, week (from Monday) or month a day falls in"""
+    if period == "week":
+        return day - timedelta(days=day.weekday())
+    if period == "month":
+        return day.replace(day=1)
+    return day
+
+def fold_periods(rows: list, keys: List[str], sums: List[str], period: str) -> List[dict]:
+    """Sum daily rows of (day, *keys, *sums) into one row per period and key"""
+    periods = {}
+    for row in rows:
+        key = (period_start(row[0], period), *row[1:len(keys) + 1])
+        values = [
+            money.to_paise(value) if name in MONEY_SUMS else value
+            for name, value in zip(sums, row[len(keys) + 1:])
+        ]
+        totals = periods.get(key)
+        periods[key] = values if totals is None else [total + value for total, value in zip(totals, values)]
+    
+    return [
+        {
+            'period_start': key[0],
+            **dict(zip(keys, key[1:])),
+            **{
+                name: money.from_paise(total) if name in MONEY_SUMS else total
+                for name, total in zip(sums, totals)
+            }
+        }
+        for key, totals in sorted(periods.items())
+    ]
+
+def report_user_records(
+    db: Session,
+    admin_id: int,
+    period: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_id: Optional[int] = None,
+    product_type: Optional[str] = None,
+    by_user: bool = False,
+    by_product: bool = False
+) -> List[dict]:
+    """Sum an admin's user records per period, optionally per user and product type"""
+    rollup = models.UserRecordRollup
+    keys = (["user_id"] if by_user else []) + (["product_type"] if by_product else [])
+    group = [rollup.day, *(getattr(rollup, key) for key in keys)]
+    stmt = select(*group, *(func.sum(getattr(rollup, name)) for name in USER_ROLLUP_SUMS)).where(rollup.admin_id == admin_id)
+    if date_from is not None:
+        stmt = stmt.where(rollup.day >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(rollup.day <= date_to)
+    if user_id is not None:
+        stmt = stmt.where(rollup.user_id == user_id)
+    if product_type is not None:
+        stmt = stmt.where(rollup.product_type == product_type)
+    rows = db.connection().execute(stmt.group_by(*group)).all()
+    return fold_periods(rows, keys, USER_ROLLUP_SUMS, period)
+
+def report_client_records(
+    db: Session,
+    admin_id: int,
+    period: str = "day",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    client_id: Optional[int] = None,
+    by_client: bool = False
+) -> List[dict]:
+    """Sum an admin's client records per period, optionally per client"""
+    rollup = models.ClientRecordRollup
+    keys = ["client_id"] if by_client else []
+    group = [rollup.day, *(getattr(rollup, key) for key in keys)]
+    stmt = select(*group, *(func.sum(getattr(rollup, name)) for name in CLIENT_ROLLUP_SUMS)).where(rollup.admin_id == admin_id)
+    if date_from is not None:
+        stmt = stmt.where(rollup.day >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(rollup.day <= date_to)
+    if client_id is not None:
+        stmt = stmt.where(rollup.client_id == client_id)
+    rows = db.connection().execute(stmt.group_by(*group)).all()
+    return fold_periods(rows, keys, CLIENT_ROLLUP_SUMS, period)
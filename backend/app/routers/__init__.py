@@ -4,5 +4,10 @@ API Routers Package
 from .admin import router as admin_router
 from .users import router as users_router
 from .clients import router as clients_router
+from .imports import router as imports_router
+from .exports import router as exports_router
+from .events import router as events_router
+from .repricing import router as repricing_router
+from .reports import router as reports_router
 
-__all__ = ['admin_router', 'users_router', 'clients_router']
\ No newline at end of file
+__all__ = ['admin_router', 'users_router', 'clients_router', 'imports_router', 'exports_router', 'events_router', 'repricing_router', 'reports_router']
\ No newline at end of file
@@ -1,33 +1,36 @@
 """
 Admin API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import timedelta
-from .. import crud, models, schemas, auth, database
+from .. import crud, models, schemas, auth, database, cache
+from .common import check_not_modified
 
 router = APIRouter(prefix="/api", tags=["Admin"])
 
 @router.post("/register_admin", response_model=schemas.AdminResponse)
-def register_admin(
+async def register_admin(
     admin_data: schemas.AdminRegister,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Register a new admin"""
+    password_hash = await auth.get_password_hash_async(admin_data.password)
     try:
-        admin = crud.create_admin(db, admin_data)
+        admin = await crud.create_admin_async(db, admin_data, password_hash)
         return admin
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.post("/login_admin")
-def login_admin(
+async def login_admin(
     login_data: schemas.AdminLogin,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     """Login admin with name and password"""
-    admin = auth.authenticate_admin(
+    admin = await auth.authenticate_admin_async(
         db,
         login_data.name,
         login_data.password
@@ -59,6 +62,8 @@ def login_admin(
 @router.get("/dashboard/{admin_uuid}", response_model=schemas.DashboardResponse)
 def get_dashboard(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -66,32 +71,22 @@ def get_dashboard(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Get users and clients
-    users = crud.get_users_by_admin(db, current_admin.id)
-    clients = crud.get_clients_by_admin(db, current_admin.id)
+    check_not_modified(request, response, db, current_admin.id)
     
-    # Calculate pending amounts
-    users_pending = crud.get_all_users_pending_amount(db, current_admin.id)
-    clients_pending = crud.get_all_clients_pending_amount(db, current_admin.id)
-    
-    # Get recent users and clients (last 5)
-    recent_users = sorted(users, key=lambda x: x.created_date, reverse=True)[:5]
-    recent_clients = sorted(clients, key=lambda x: x.created_date, reverse=True)[:5]
+    def summarize():
+        summary = crud.get_dashboard_summary(db, current_admin.id)
+        return schemas.DashboardResponse(
+            admin_name=current_admin.name,
+            **summary
+        )
     
-    return schemas.DashboardResponse(
-        admin_name=current_admin.name,
-        total_users=len(users),
-        active_users=len([u for u in users if u.is_active]),
-        total_clients=len(clients),
-        users_pending_amount=users_pending['total_pending'],
-        clients_pending_amount=clients_pending['total_pending'],
-        recent_users=recent_users,
-        recent_clients=recent_clients
-    )
+    return cache.results_cache.get_or_compute(cache.dashboard_key(current_admin.id), summarize)
 
 @router.get("/admin/{admin_uuid}/final_users_pending_amount", response_model=schemas.PendingAmountResponse)
 def get_final_users_pending_amount(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -99,12 +94,18 @@ def get_final_users_pending_amount(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    result = crud.get_all_users_pending_amount(db, current_admin.id)
-    return schemas.PendingAmountResponse(**result)
+    check_not_modified(request, response, db, current_admin.id)
+    
+    return cache.results_cache.get_or_compute(
+        cache.users_pending_key(current_admin.id),
+        lambda: schemas.PendingAmountResponse(**crud.get_all_users_pending_amount(db, current_admin.id))
+    )
 
 @router.get("/admin/{admin_uuid}/final_clients_pending_amount", response_model=schemas.PendingAmountResponse)
 def get_final_clients_pending_amount(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -112,5 +113,9 @@ def get_final_clients_pending_amount(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    result = crud.get_all_clients_pending_amount(db, current_admin.id)
-    return schemas.PendingAmountResponse(**result)
\ No newline at end of file
+    check_not_modified(request, response, db, current_admin.id)
+    
+    return cache.results_cache.get_or_compute(
+        cache.clients_pending_key(current_admin.id),
+        lambda: schemas.PendingAmountResponse(**crud.get_all_clients_pending_amount(db, current_admin.id))
+    )
\ No newline at end of file
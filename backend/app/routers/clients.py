@@ -1,10 +1,14 @@
 """
 Client management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas, auth, database
+from typing import List, Optional
+from datetime import date
+from .. import crud, models, schemas, auth, database, cache, group_commit, search
+from ..serialization import RowsResponse, schema_columns
+from .common import check_not_modified, set_next_cursor
 
 router = APIRouter(prefix="/api/admin", tags=["Clients"])
 
@@ -28,15 +32,48 @@ def add_client(
 @router.get("/{admin_uuid}/clients", response_model=List[schemas.ClientResponse])
 def get_clients(
     admin_uuid: str,
+    request: Request,
+    response: Response,
+    page: schemas.PageParams = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
-    """Get all clients for the admin"""
+    """Get clients for the admin, one page at a time when a limit is given"""
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    clients = crud.get_clients_by_admin(db, current_admin.id)
-    return clients
+    check_not_modified(request, response, db, current_admin.id)
+    
+    try:
+        clients = crud.get_clients_by_admin(
+            db, current_admin.id,
+            date_from=page.date_from,
+            date_to=page.date_to,
+            cursor=page.cursor,
+            limit=page.limit,
+            columns=schema_columns(models.Client, schemas.ClientResponse)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    set_next_cursor(response, clients, page.limit)
+    return RowsResponse(schemas.ClientResponse, clients, headers=response.headers)
+
+@router.get("/{admin_uuid}/clients_page", response_model=schemas.ClientsPageResponse)
+def get_clients_page(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Get clients, their balances and the pending total in one request"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    return crud.get_clients_page(db, current_admin.id)
 
 @router.post("/{admin_uuid}/client/{client_id}/add_record", response_model=schemas.ClientRecordResponse)
 def add_client_record(
@@ -55,20 +92,18 @@ def add_client_record(
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Validate required fields based on transaction type
-    if record_data.transaction_type == schemas.TransactionTypeEnum.CREDIT:
-        if not record_data.credit_amount:
-            raise HTTPException(
-                status_code=400,
-                detail="Credit amount is required for credit transaction"
-            )
-    elif record_data.transaction_type == schemas.TransactionTypeEnum.DEBIT:
-        if not record_data.debit_amount:
-            raise HTTPException(
-                status_code=400,
-                detail="Debit amount is required for debit transaction"
-            )
-    
-    record = crud.add_client_record(db, client_id, record_data)
+    error = crud.get_client_record_error(record_data)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    if group_commit.pipeline:
+        admin_id = current_admin.id
+        values = crud.build_client_record_values(client_id, record_data)
+        # Hand the connection back to the pool while the batch commits
+        db.close()
+        return group_commit.pipeline.submit(group_commit.CLIENT_RECORD, admin_id, values)
+    
+    record = crud.add_client_record(db, client_id, current_admin.id, record_data)
     return record
 
 @router.put("/{admin_uuid}/client/{client_id}/update", response_model=schemas.ClientResponse)
@@ -91,7 +126,11 @@ def update_client(
 @router.get("/{admin_uuid}/client/{client_id}/record_details")
 def get_client_record_details(
     admin_uuid: str,
+    request: Request,
     client_id: int,
+    response: Response,
+    transaction_type: Optional[schemas.TransactionTypeEnum] = None,
+    page: schemas.PageParams = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -99,40 +138,58 @@ def get_client_record_details(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    check_not_modified(request, response, db, current_admin.id)
+    
     client = crud.get_client_by_id(db, client_id, current_admin.id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    records = crud.get_client_records(db, client_id)
+    try:
+        records = crud.get_client_records(
+            db, client_id,
+            transaction_type=transaction_type,
+            date_from=page.date_from,
+            date_to=page.date_to,
+            cursor=page.cursor,
+            limit=page.limit,
+            columns=crud.CLIENT_RECORD_DETAIL_COLUMNS
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    set_next_cursor(response, records, page.limit)
     
     credit_records = []
     debit_records = []
     profit_loss_records = []
     
     for record in records:
-        record_dict = {
-            "id": record.id,
-            "date": record.created_date,
-            "transaction_type": record.transaction_type.value
-        }
-        
-        if record.credit_amount:
-            record_dict["amount"] = record.credit_amount
-            credit_records.append(record_dict)
+        if record.credit is not None:
+            credit_records.append({
+                "id": record.id,
+                "date": record.created_date,
+                "transaction_type": record.transaction_type.value,
+                "amount": record.credit
+            })
         
-        if record.debit_amount:
-            record_dict["amount"] = record.debit_amount
-            debit_records.append(record_dict)
+        if record.debit is not None:
+            debit_records.append({
+                "id": record.id,
+                "date": record.created_date,
+                "transaction_type": record.transaction_type.value,
+                "amount": record.debit
+            })
         
         if record.profit_loss is not None:
             profit_loss_records.append({
                 "id": record.id,
                 "date": record.created_date,
                 "amount": record.profit_loss,
-                "type": "Profit" if record.profit_loss > 0 else "Loss"
+                "type": record.profit_loss_type
             })
     
-    return {
+    # Encoded directly, as a large ledger makes the generic encoder the slowest step
+    return ORJSONResponse({
         "client_id": client_id,
         "client_name": client.name,
         "credit_records": credit_records,
@@ -141,11 +198,13 @@ def get_client_record_details(
         "total_credits": len(credit_records),
         "total_debits": len(debit_records),
         "total_profit_loss_entries": len(profit_loss_records)
-    }
+    }, headers=response.headers)
 
 @router.get("/{admin_uuid}/client/{client_id}/calculate_record_details", response_model=schemas.ClientCalculationResponse)
 def calculate_client_record_details(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     client_id: int,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
@@ -154,16 +213,77 @@ def calculate_client_record_details(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    check_not_modified(request, response, db, current_admin.id)
+    
+    def calculate():
+        client = crud.get_client_by_id(db, client_id, current_admin.id)
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
+        
+        return schemas.ClientCalculationResponse(**crud.calculate_client_pending(client))
+    
+    return cache.results_cache.get_or_compute(cache.client_calculation_key(current_admin.id, client_id), calculate)
+
+# Records are already validated row by row, so the body is documented rather than revalidated
+@router.get(
+    "/{admin_uuid}/client/{client_id}/statement",
+    response_class=ORJSONResponse,
+    responses={200: {"model": schemas.ClientStatementResponse}}
+)
+def get_client_statement(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    client_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Get a client's records over a period with the pending amount before and after it"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
     client = crud.get_client_by_id(db, client_id, current_admin.id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    calc = crud.get_client_pending_amount(db, client_id)
-    return schemas.ClientCalculationResponse(**calc)
+    return ORJSONResponse(crud.get_client_statement(db, client, date_from, date_to), headers=response.headers)
+
+@router.get("/{admin_uuid}/client/{client_id}/balance_as_of", response_model=schemas.ClientBalanceAsOfResponse)
+def get_client_balance_as_of(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    client_id: int,
+    as_of: date,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Get a client's pending amount at the end of a day"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    client = crud.get_client_by_id(db, client_id, current_admin.id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    return schemas.ClientBalanceAsOfResponse(
+        client_id=client.id,
+        client_name=client.name,
+        as_of=as_of,
+        balance=crud.get_client_balance_as_of(db, client.id, as_of)
+    )
 
 @router.get("/{admin_uuid}/client_panel_names")
 def get_client_panel_names(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -171,14 +291,46 @@ def get_client_panel_names(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    clients = crud.get_clients_by_admin(db, current_admin.id)
+    check_not_modified(request, response, db, current_admin.id)
+    
+    clients = crud.get_clients_by_admin(db, current_admin.id, columns=[
+        models.Client.id,
+        models.Client.uuid,
+        models.Client.name,
+        models.Client.username,
+        models.Client.debit_total,
+        models.Client.credit_total,
+        models.Client.profit_loss_total
+    ])
     return [
         {
             "id": client.id,
             "uuid": client.uuid,
             "name": client.name,
             "username": client.username,
-            "pending_amount": crud.get_client_pending_amount(db, client.id).get('pending_amount', 0)
+            "pending_amount": crud.calculate_client_pending(client)['pending_amount']
         }
         for client in clients
-    ]
\ No newline at end of file
+    ]
+
+@router.get("/{admin_uuid}/search_clients", response_model=List[schemas.ClientSearchResult])
+def search_clients(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(search.SEARCH_LIMIT, ge=1, le=search.SEARCH_MAX_LIMIT),
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Find clients whose name, username, location or phone number has words starting with what was typed, best matches first"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    rows = search.search_rows(
+        db, models.Client, current_admin.id, q,
+        columns=schema_columns(models.Client, schemas.ClientSearchResult), limit=limit
+    )
+    return RowsResponse(schemas.ClientSearchResult, rows, headers=response.headers)
\ No newline at end of file
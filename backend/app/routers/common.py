@@ -0,0 +1,24 @@
+"""
+Helpers shared by the API routers
+"""
+from fastapi import HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from typing import Optional
+from .. import crud
+
+def set_next_cursor(response: Response, rows: list, limit: Optional[int]):
+    """Expose the cursor of the next page, if any, as a response header"""
+    next_cursor = crud.get_next_cursor(rows, limit)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+
+def check_not_modified(request: Request, response: Response, db: Session, admin_id: int):
+    """Tag a response with the admin's data version, answering 304 if the client already has it"""
+    etag = f'W/"{admin_id}-{crud.get_data_version(db, admin_id)}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        raise HTTPException(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
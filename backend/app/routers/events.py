@@ -0,0 +1,109 @@
+"""
+Live event stream API endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from typing import Optional
+import asyncio
+import os
+from .. import crud, auth, database, events, models, schemas
+
+router = APIRouter(prefix="/api/admin", tags=["Events"])
+
+# Seconds between keep-alive comments on an idle stream
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+# Milliseconds a disconnected browser waits before reconnecting
+EVENT_RETRY_MILLISECONDS = 3000
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    """Read a Last-Event-ID value; anything unreadable means the client must refresh"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+@router.post("/{admin_uuid}/events/ticket", response_model=schemas.StreamTicketResponse)
+async def create_events_ticket(
+    admin_uuid: str,
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Issue a short-lived ticket for opening the admin's event stream"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    return {
+        "ticket": auth.create_stream_ticket(current_admin.uuid),
+        "expires_in": auth.STREAM_TICKET_EXPIRE_SECONDS
+    }
+
+@router.get("/{admin_uuid}/events")
+async def stream_events(
+    admin_uuid: str,
+    request: Request,
+    ticket: str,
+    last_event_id: Optional[str] = None
+):
+    """Stream the admin's changes as server-sent events
+    
+    EventSource cannot send an Authorization header, so the stream is opened
+    with a ticket from POST .../events/ticket in the query string rather than
+    the access token. The ticket only opens streams and expires within a
+    minute, so a browser whose ticket expired gets a 401 on reconnect and
+    opens a new stream with a new ticket. The Last-Event-ID header sent on
+    reconnect, or the last_event_id parameter, resumes the stream after that event.
+    """
+    # A short-lived session, so the stream does not hold a connection while idle
+    async with database.AsyncSessionLocal() as db:
+        current_admin = await auth.get_admin_for_token(ticket, db, purpose=auth.STREAM_TICKET_PURPOSE)
+        if current_admin.uuid != admin_uuid:
+            raise HTTPException(status_code=403, detail="Access denied")
+        
+        # Subscribe before reading the version so no change falls in between
+        subscription = events.broker.subscribe(current_admin.id)
+        try:
+            version = await crud.get_data_version_async(db, current_admin.id)
+        except BaseException:
+            subscription.close()
+            raise
+    
+    resume_from = parse_event_id(request.headers.get("last-event-id", last_event_id))
+    
+    async def generate():
+        try:
+            yield f"retry: {EVENT_RETRY_MILLISECONDS}\n\n"
+            
+            # Events up to the floor were replayed or are covered by a refresh
+            floor = version
+            if resume_from is not None:
+                missed = None
+                if resume_from <= version:
+                    missed = events.broker.replay(current_admin.id, resume_from, version)
+                if missed is None:
+                    yield events.Event(version, "refresh", {}).message
+                else:
+                    for event in missed:
+                        yield event.message
+                        floor = max(floor, event.id)
+            
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": heartbeat\n\n"
+                    continue
+                if event.id > floor:
+                    yield event.message
+        finally:
+            subscription.close()
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also closes the subscription when the client leaves before the stream starts
+        background=BackgroundTask(subscription.close)
+    )
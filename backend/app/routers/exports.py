@@ -0,0 +1,103 @@
+"""
+Ledger export API endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import date
+from .. import crud, models, schemas, auth, database, exports
+
+router = APIRouter(prefix="/api/admin", tags=["Export"])
+
+MEDIA_TYPES = {
+    schemas.ExportFormat.CSV: "text/csv",
+    schemas.ExportFormat.XLSX: "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+def export_response(stmt, export_format: schemas.ExportFormat, filename: str) -> StreamingResponse:
+    """Stream the rows of a ledger query in the requested format"""
+    header = [column.name for column in stmt.selected_columns]
+    rows = exports.iter_rows(stmt)
+    if export_format == schemas.ExportFormat.XLSX:
+        body = exports.stream_xlsx(header, rows)
+    else:
+        body = exports.stream_csv(header, rows)
+    
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'}
+    )
+
+@router.get("/{admin_uuid}/user/{user_id}/export")
+def export_user_ledger(
+    admin_uuid: str,
+    user_id: int,
+    format: schemas.ExportFormat = schemas.ExportFormat.CSV,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Export a user's ledger"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    user = crud.get_user_by_id(db, user_id, current_admin.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    stmt = exports.user_ledger_query(current_admin.id, user_id, date_from, date_to)
+    return export_response(stmt, format, f"user_{user_id}_ledger")
+
+@router.get("/{admin_uuid}/client/{client_id}/export")
+def export_client_ledger(
+    admin_uuid: str,
+    client_id: int,
+    format: schemas.ExportFormat = schemas.ExportFormat.CSV,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Export a client's ledger"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    client = crud.get_client_by_id(db, client_id, current_admin.id)
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+    
+    stmt = exports.client_ledger_query(current_admin.id, client_id, date_from, date_to)
+    return export_response(stmt, format, f"client_{client_id}_ledger")
+
+@router.get("/{admin_uuid}/export/user_records")
+def export_users_ledger(
+    admin_uuid: str,
+    format: schemas.ExportFormat = schemas.ExportFormat.CSV,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Export the records of every user of the admin"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    stmt = exports.user_ledger_query(current_admin.id, None, date_from, date_to)
+    return export_response(stmt, format, "users_ledger")
+
+@router.get("/{admin_uuid}/export/client_records")
+def export_clients_ledger(
+    admin_uuid: str,
+    format: schemas.ExportFormat = schemas.ExportFormat.CSV,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Export the records of every client of the admin"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    stmt = exports.client_ledger_query(current_admin.id, None, date_from, date_to)
+    return export_response(stmt, format, "clients_ledger")
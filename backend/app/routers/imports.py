@@ -0,0 +1,298 @@
+"""
+Bulk import API endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from typing import Optional
+from abc import ABC, abstractmethod
+import csv
+import json
+import logging
+from .. import crud, models, schemas, auth, database
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin", tags=["Import"])
+
+# Rows inserted per transaction
+IMPORT_BATCH_SIZE = 1000
+
+# Row errors listed in the report; the failed count still covers every row
+MAX_REPORTED_ERRORS = 1000
+
+# Longest CSV record, so an unclosed quote cannot swallow the rest of the file
+MAX_CSV_RECORD_CHARS = 64 * 1024
+
+def format_validation_error(error: ValidationError) -> list:
+    """Flatten a pydantic validation error into readable messages"""
+    return [
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" if detail['loc'] else detail['msg']
+        for detail in error.errors()
+    ]
+
+def detect_format(request: Request, import_format: Optional[schemas.ImportFormat]) -> schemas.ImportFormat:
+    """Pick the stream format from the query parameter or the content type"""
+    if import_format:
+        return import_format
+    
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        return schemas.ImportFormat.CSV
+    if "ndjson" in content_type or "jsonl" in content_type or "json" in content_type:
+        return schemas.ImportFormat.NDJSON
+    raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass format")
+
+async def read_lines(request: Request):
+    """Yield the decoded lines of the request body as they arrive"""
+    buffer = b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8-sig").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8-sig").rstrip("\r")
+
+async def read_csv_records(lines):
+    """Yield (values, error) for each non-blank CSV record of a line stream
+    
+    A quoted field may hold line breaks, so a record can span several lines:
+    lines are gathered until the csv module parses them as a complete record.
+    """
+    pending = None
+    async for line in lines:
+        if pending is None:
+            if not line.strip():
+                continue
+            pending = line
+        else:
+            pending += "\n" + line
+        
+        try:
+            values = next(csv.reader([pending], strict=True))
+        except csv.Error as e:
+            if "unexpected end of data" in str(e) and len(pending) <= MAX_CSV_RECORD_CHARS:
+                # Inside a quoted field; the record goes on on the next line
+                continue
+            pending = None
+            yield None, f"Malformed CSV: {e}"
+            continue
+        pending = None
+        yield values, None
+    
+    if pending is not None:
+        yield None, "Malformed CSV: unclosed quoted field at the end of the file"
+
+async def read_rows(request: Request, import_format: schemas.ImportFormat):
+    """Yield (row number, row dict or None, error) for each non-blank data row"""
+    header = None
+    row_number = 0
+    
+    if import_format == schemas.ImportFormat.CSV:
+        async for values, error in read_csv_records(read_lines(request)):
+            if header is None:
+                if error:
+                    raise HTTPException(status_code=400, detail=f"Invalid CSV header: {error}")
+                header = [name.strip() for name in values]
+                continue
+            row_number += 1
+            if error:
+                yield row_number, None, error
+                continue
+            if len(values) != len(header):
+                yield row_number, None, f"Expected {len(header)} columns, got {len(values)}"
+                continue
+            # Empty cells are missing values, not empty strings
+            yield row_number, {name: value or None for name, value in zip(header, values)}, None
+        return
+    
+    async for line in read_lines(request):
+        if not line.strip():
+            continue
+        
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield row_number, None, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, row, None
+
+class Importer(ABC):
+    """Validates rows of one kind and inserts them in batches"""
+    
+    def __init__(self, db: Session, admin_id: int):
+        self.db = db
+        self.admin_id = admin_id
+    
+    @abstractmethod
+    def validate(self, row: dict):
+        """Turn a row into insertable data, raising ValueError or ValidationError"""
+    
+    @abstractmethod
+    def flush(self, batch: list) -> list:
+        """Insert a batch of (row number, data) and return (row number, error) for rejected rows"""
+
+class UserImporter(Importer):
+    def validate(self, row):
+        return schemas.UserCreate(**row)
+    
+    def flush(self, batch):
+        crud.bulk_create_users(self.db, self.admin_id, [data for _, data in batch])
+        return []
+
+class ClientImporter(Importer):
+    def __init__(self, db, admin_id):
+        super().__init__(db, admin_id)
+        self.seen_usernames = set()
+    
+    def validate(self, row):
+        client_data = schemas.ClientCreate(**row)
+        if client_data.username in self.seen_usernames:
+            raise ValueError("Duplicate username in import")
+        self.seen_usernames.add(client_data.username)
+        return client_data
+    
+    def flush(self, batch):
+        taken = crud.get_existing_client_usernames(self.db, [data.username for _, data in batch])
+        crud.bulk_create_clients(self.db, self.admin_id, [data for _, data in batch if data.username not in taken])
+        return [
+            (row_number, "Client with this username already exists")
+            for row_number, data in batch if data.username in taken
+        ]
+
+class UserRecordImporter(Importer):
+    def __init__(self, db, admin_id):
+        super().__init__(db, admin_id)
+        self.user_ids = crud.get_user_ids_by_admin(db, admin_id)
+    
+    def validate(self, row):
+        row = dict(row)
+        try:
+            user_id = int(row.pop("user_id"))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("user_id is required")
+        if user_id not in self.user_ids:
+            raise ValueError("User not found")
+        
+        record_data = schemas.UserRecordCreate(**row)
+        error = crud.get_user_record_error(record_data)
+        if error:
+            raise ValueError(error)
+        return crud.build_user_record_values(user_id, record_data)
+    
+    def flush(self, batch):
+        crud.bulk_add_user_records(self.db, self.admin_id, [values for _, values in batch])
+        return []
+
+class ClientRecordImporter(Importer):
+    def __init__(self, db, admin_id):
+        super().__init__(db, admin_id)
+        self.client_ids = crud.get_client_ids_by_admin(db, admin_id)
+    
+    def validate(self, row):
+        row = dict(row)
+        try:
+            client_id = int(row.pop("client_id"))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("client_id is required")
+        if client_id not in self.client_ids:
+            raise ValueError("Client not found")
+        
+        record_data = schemas.ClientRecordCreate(**row)
+        error = crud.get_client_record_error(record_data)
+        if error:
+            raise ValueError(error)
+        return crud.build_client_record_values(client_id, record_data)
+    
+    def flush(self, batch):
+        crud.bulk_add_client_records(self.db, self.admin_id, [values for _, values in batch])
+        return []
+
+IMPORTERS = {
+    schemas.ImportKind.USERS: UserImporter,
+    schemas.ImportKind.CLIENTS: ClientImporter,
+    schemas.ImportKind.USER_RECORDS: UserRecordImporter,
+    schemas.ImportKind.CLIENT_RECORDS: ClientRecordImporter,
+}
+
+@router.post("/{admin_uuid}/import/{kind}", response_model=schemas.ImportResponse)
+async def bulk_import(
+    admin_uuid: str,
+    kind: schemas.ImportKind,
+    request: Request,
+    format: Optional[schemas.ImportFormat] = None,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Import users, clients or records from a CSV or NDJSON stream
+    
+    Batches commit one at a time. If a batch cannot be written, it is rolled
+    back, its rows are reported as failed, and the import goes on with the
+    next batch, so the response lists every row that did not land.
+    """
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    import_format = detect_format(request, format)
+    importer = await run_in_threadpool(IMPORTERS[kind], db, current_admin.id)
+    
+    total_rows = 0
+    inserted = 0
+    errors = {}
+    batch = []
+    
+    def add_error(row_number: int, messages: list):
+        errors.setdefault(row_number, []).extend(messages)
+    
+    async def flush() -> int:
+        try:
+            rejected = await run_in_threadpool(importer.flush, batch)
+        except SQLAlchemyError:
+            logger.exception("Import batch of %s failed", kind.value)
+            await run_in_threadpool(db.rollback)
+            for row_number, _ in batch:
+                add_error(row_number, ["Not saved: the batch holding this row could not be written"])
+            batch.clear()
+            return 0
+        for row_number, message in rejected:
+            add_error(row_number, [message])
+        flushed = len(batch) - len(rejected)
+        batch.clear()
+        return flushed
+    
+    async for row_number, row, error in read_rows(request, import_format):
+        total_rows += 1
+        if error:
+            add_error(row_number, [error])
+            continue
+        
+        try:
+            batch.append((row_number, importer.validate(row)))
+        except ValidationError as e:
+            add_error(row_number, format_validation_error(e))
+        except ValueError as e:
+            add_error(row_number, [str(e)])
+        
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            inserted += await flush()
+    
+    if batch:
+        inserted += await flush()
+    
+    return schemas.ImportResponse(
+        kind=kind,
+        total_rows=total_rows,
+        inserted=inserted,
+        failed=len(errors),
+        errors=[
+            schemas.ImportRowError(row=row_number, errors=messages)
+            for row_number, messages in sorted(errors.items())[:MAX_REPORTED_ERRORS]
+        ]
+    )
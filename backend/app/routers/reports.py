@@ -0,0 +1,61 @@
+"""
+Reporting API endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import date
+from .. import models, schemas, auth, database, rollups
+from .common import check_not_modified
+
+router = APIRouter(prefix="/api/admin", tags=["Reports"])
+
+@router.get("/{admin_uuid}/reports/user_records", response_model=List[schemas.UserRecordReportRow])
+def report_user_records(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    period: schemas.ReportPeriod = schemas.ReportPeriod.DAY,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_id: Optional[int] = None,
+    product_type: Optional[str] = None,
+    by_user: bool = False,
+    by_product: bool = False,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Sum user record volume and revenue per day, week or month from the daily rollups"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    return rollups.report_user_records(
+        db, current_admin.id, period.value, date_from, date_to,
+        user_id=user_id, product_type=product_type, by_user=by_user, by_product=by_product
+    )
+
+@router.get("/{admin_uuid}/reports/client_records", response_model=List[schemas.ClientRecordReportRow])
+def report_client_records(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    period: schemas.ReportPeriod = schemas.ReportPeriod.DAY,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    client_id: Optional[int] = None,
+    by_client: bool = False,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Sum client debits, credits and profit/loss per day, week or month from the daily rollups"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    return rollups.report_client_records(
+        db, current_admin.id, period.value, date_from, date_to,
+        client_id=client_id, by_client=by_client
+    )
\ No newline at end of file
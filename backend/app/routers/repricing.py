@@ -0,0 +1,24 @@
+"""
+Debit repricing API endpoints
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from .. import crud, models, schemas, auth, database, repricing
+
+router = APIRouter(prefix="/api/admin", tags=["Repricing"])
+
+@router.post("/{admin_uuid}/reprice", response_model=schemas.RepriceResponse)
+def reprice_user_records(
+    admin_uuid: str,
+    request: schemas.RepriceRequest,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Recompute debit records at new rates; dry_run (the default) only reports the per-user deltas"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    if request.user_id is not None and not crud.get_user_by_id(db, request.user_id, current_admin.id):
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return repricing.reprice_user_records(db, current_admin.id, request)
@@ -1,13 +1,40 @@
 """
 User management API endpoints
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas, auth, database
+from typing import List, Optional
+from datetime import date
+from .. import crud, models, schemas, auth, database, cache, group_commit, search
+from ..serialization import RowsResponse, schema_columns
+from .common import check_not_modified, set_next_cursor
 
 router = APIRouter(prefix="/api/admin", tags=["Users"])
 
+def get_filtered_user_records(
+    db: Session,
+    user_id: int,
+    transaction_type: Optional[schemas.TransactionTypeEnum],
+    product_type: Optional[str],
+    page: schemas.PageParams,
+    columns: Optional[list] = None
+):
+    """Get one page of a user's records, rejecting malformed cursors"""
+    try:
+        return crud.get_user_records(
+            db, user_id,
+            transaction_type=transaction_type,
+            product_type=product_type,
+            date_from=page.date_from,
+            date_to=page.date_to,
+            cursor=page.cursor,
+            limit=page.limit,
+            columns=columns
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/{admin_uuid}/add_user", response_model=schemas.UserResponse)
 def add_user(
     admin_uuid: str,
@@ -25,15 +52,50 @@ def add_user(
 @router.get("/{admin_uuid}/users", response_model=List[schemas.UserResponse])
 def get_users(
     admin_uuid: str,
+    request: Request,
+    response: Response,
+    is_active: Optional[bool] = None,
+    page: schemas.PageParams = Depends(),
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Get users for the admin, one page at a time when a limit is given"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    try:
+        users = crud.get_users_by_admin(
+            db, current_admin.id,
+            is_active=is_active,
+            date_from=page.date_from,
+            date_to=page.date_to,
+            cursor=page.cursor,
+            limit=page.limit,
+            columns=schema_columns(models.User, schemas.UserResponse)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    set_next_cursor(response, users, page.limit)
+    return RowsResponse(schemas.UserResponse, users, headers=response.headers)
+
+@router.get("/{admin_uuid}/users_page", response_model=schemas.UsersPageResponse)
+def get_users_page(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
-    """Get all users for the admin"""
+    """Get users, their balances and the pending total in one request"""
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    users = crud.get_users_by_admin(db, current_admin.id)
-    return users
+    check_not_modified(request, response, db, current_admin.id)
+    
+    return crud.get_users_page(db, current_admin.id)
 
 @router.put("/{admin_uuid}/user/{user_id}/enable", response_model=schemas.UserResponse)
 def enable_user(
@@ -70,6 +132,8 @@ def disable_user(
 @router.get("/{admin_uuid}/user_panel_names")
 def get_user_panel_names(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -77,7 +141,15 @@ def get_user_panel_names(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
-    users = crud.get_users_by_admin(db, current_admin.id)
+    check_not_modified(request, response, db, current_admin.id)
+    
+    users = crud.get_users_by_admin(db, current_admin.id, columns=[
+        models.User.id,
+        models.User.uuid,
+        models.User.first_name,
+        models.User.last_name,
+        models.User.is_active
+    ])
     return [
         {
             "id": user.id,
@@ -88,10 +160,37 @@ def get_user_panel_names(
         for user in users
     ]
 
+@router.get("/{admin_uuid}/search_users", response_model=List[schemas.UserSearchResult])
+def search_users(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(search.SEARCH_LIMIT, ge=1, le=search.SEARCH_MAX_LIMIT),
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Find users whose name, mobile or location has words starting with what was typed, best matches first"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    rows = search.search_rows(
+        db, models.User, current_admin.id, q,
+        columns=schema_columns(models.User, schemas.UserSearchResult), limit=limit
+    )
+    return RowsResponse(schemas.UserSearchResult, rows, headers=response.headers)
+
 @router.get("/{admin_uuid}/user/{user_uuid}/records", response_model=List[schemas.UserRecordResponse])
 def get_user_records_by_uuid(
     admin_uuid: str,
+    request: Request,
     user_uuid: str,
+    response: Response,
+    transaction_type: Optional[schemas.TransactionTypeEnum] = None,
+    product_type: Optional[str] = None,
+    page: schemas.PageParams = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -99,12 +198,18 @@ def get_user_records_by_uuid(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    check_not_modified(request, response, db, current_admin.id)
+    
     user = crud.get_user_by_uuid(db, user_uuid, current_admin.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    records = crud.get_user_records(db, user.id)
-    return records
+    records = get_filtered_user_records(
+        db, user.id, transaction_type, product_type, page,
+        columns=schema_columns(models.UserRecord, schemas.UserRecordResponse)
+    )
+    set_next_cursor(response, records, page.limit)
+    return RowsResponse(schemas.UserRecordResponse, records, headers=response.headers)
 
 @router.post("/{admin_uuid}/user/{user_id}/add_record", response_model=schemas.UserRecordResponse)
 def add_user_record(
@@ -123,27 +228,29 @@ def add_user_record(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Validate required fields based on transaction type
-    if record_data.transaction_type == schemas.TransactionTypeEnum.DEBIT:
-        if not all([record_data.bags, record_data.product_type, record_data.kg, 
-                    record_data.cut_weight is not None, record_data.amount_per_kg]):
-            raise HTTPException(
-                status_code=400, 
-                detail="All debit fields are required for debit transaction"
-            )
-    elif record_data.transaction_type == schemas.TransactionTypeEnum.CREDIT:
-        if not record_data.credit_amount:
-            raise HTTPException(
-                status_code=400,
-                detail="Credit amount is required for credit transaction"
-            )
-    
-    record = crud.add_user_record(db, user_id, record_data)
+    error = crud.get_user_record_error(record_data)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    
+    if group_commit.pipeline:
+        admin_id = current_admin.id
+        values = crud.build_user_record_values(user_id, record_data)
+        # Hand the connection back to the pool while the batch commits
+        db.close()
+        return group_commit.pipeline.submit(group_commit.USER_RECORD, admin_id, values)
+    
+    record = crud.add_user_record(db, user_id, current_admin.id, record_data)
     return record
 
 @router.get("/{admin_uuid}/user/{user_id}/record_details")
 def get_user_record_details(
     admin_uuid: str,
+    request: Request,
     user_id: int,
+    response: Response,
+    transaction_type: Optional[schemas.TransactionTypeEnum] = None,
+    product_type: Optional[str] = None,
+    page: schemas.PageParams = Depends(),
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
 ):
@@ -151,17 +258,23 @@ def get_user_record_details(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    check_not_modified(request, response, db, current_admin.id)
+    
     user = crud.get_user_by_id(db, user_id, current_admin.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    records = crud.get_user_records(db, user_id)
+    records = get_filtered_user_records(
+        db, user_id, transaction_type, product_type, page,
+        columns=crud.USER_RECORD_DETAIL_COLUMNS
+    )
+    set_next_cursor(response, records, page.limit)
     
     credit_records = []
     debit_records = []
     
     for record in records:
-        if record.transaction_type == models.TransactionType.CREDIT:
+        if record.is_credit:
             credit_records.append({
                 "id": record.id,
                 "date": record.created_date,
@@ -184,18 +297,21 @@ def get_user_record_details(
                 "net_amount": record.net_amount
             })
     
-    return {
+    # Encoded directly, as a large ledger makes the generic encoder the slowest step
+    return ORJSONResponse({
         "user_id": user_id,
         "user_name": f"{user.first_name} {user.last_name}",
         "credit_records": credit_records,
         "debit_records": debit_records,
         "total_credits": len(credit_records),
         "total_debits": len(debit_records)
-    }
+    }, headers=response.headers)
 
 @router.get("/{admin_uuid}/user/{user_id}/calculate_record_details", response_model=schemas.UserCalculationResponse)
 def calculate_user_record_details(
     admin_uuid: str,
+    request: Request,
+    response: Response,
     user_id: int,
     db: Session = Depends(database.get_db),
     current_admin: models.Admin = Depends(auth.get_current_admin)
@@ -204,14 +320,74 @@ def calculate_user_record_details(
     if current_admin.uuid != admin_uuid:
         raise HTTPException(status_code=403, detail="Access denied")
     
+    check_not_modified(request, response, db, current_admin.id)
+    
+    def calculate():
+        user = crud.get_user_by_id(db, user_id, current_admin.id)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        calc = crud.calculate_user_balance(user)
+        
+        return schemas.UserCalculationResponse(
+            user_id=user_id,
+            user_name=f"{user.first_name} {user.last_name}",
+            **calc
+        )
+    
+    return cache.results_cache.get_or_compute(cache.user_calculation_key(current_admin.id, user_id), calculate)
+
+# Records are already validated row by row, so the body is documented rather than revalidated
+@router.get(
+    "/{admin_uuid}/user/{user_id}/statement",
+    response_class=ORJSONResponse,
+    responses={200: {"model": schemas.UserStatementResponse}}
+)
+def get_user_statement(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    user_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Get a user's records over a period with the balance before and after it"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
     user = crud.get_user_by_id(db, user_id, current_admin.id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    calc = crud.get_user_sum_deficit(db, user_id)
+    return ORJSONResponse(crud.get_user_statement(db, user, date_from, date_to), headers=response.headers)
+
+@router.get("/{admin_uuid}/user/{user_id}/balance_as_of", response_model=schemas.UserBalanceAsOfResponse)
+def get_user_balance_as_of(
+    admin_uuid: str,
+    request: Request,
+    response: Response,
+    user_id: int,
+    as_of: date,
+    db: Session = Depends(database.get_db),
+    current_admin: models.Admin = Depends(auth.get_current_admin)
+):
+    """Get a user's balance at the end of a day"""
+    if current_admin.uuid != admin_uuid:
+        raise HTTPException(status_code=403, detail="Access denied")
+    
+    check_not_modified(request, response, db, current_admin.id)
+    
+    user = crud.get_user_by_id(db, user_id, current_admin.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
     
-    return schemas.UserCalculationResponse(
-        user_id=user_id,
+    return schemas.UserBalanceAsOfResponse(
+        user_id=user.id,
         user_name=f"{user.first_name} {user.last_name}",
-        **calc
+        as_of=as_of,
+        balance=crud.get_user_balance_as_of(db, user.id, as_of)
     )
\ No newline at end of file
@@ -1,9 +1,10 @@
 """
 Pydantic schemas for request/response validation
 """
+from fastapi import Query
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
 class TransactionTypeEnum(str, Enum):
@@ -32,6 +33,11 @@ class AdminResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class StreamTicketResponse(BaseModel):
+    """Ticket opening an admin's event stream"""
+    ticket: str
+    expires_in: int
+
 # User Schemas
 class UserCreate(BaseModel):
     """User creation schema"""
@@ -65,6 +71,8 @@ class UserResponse(BaseModel):
     is_active: bool
     created_date: datetime
     updated_date: datetime
+    debit_total: float
+    credit_total: float
     
     class Config:
         from_attributes = True
@@ -114,10 +122,21 @@ class UserRecordResponse(BaseModel):
     net_amount: Optional[float]
     credit_amount: Optional[float]
     round_off: Optional[float]
+    balance_after: Optional[float]  # debit - credit once this record is applied
     
     class Config:
         from_attributes = True
 
+class UserSearchResult(BaseModel):
+    """User matched by a search"""
+    id: int
+    uuid: str
+    first_name: str
+    last_name: str
+    mobile: str
+    location: str
+    is_active: bool
+
 # Client Schemas
 class ClientCreate(BaseModel):
     """Client creation schema"""
@@ -166,10 +185,20 @@ class ClientRecordResponse(BaseModel):
     credit_amount: Optional[float]
     debit_amount: Optional[float]
     profit_loss: Optional[float]
+    balance_after: Optional[float]  # pending amount once this record is applied
     
     class Config:
         from_attributes = True
 
+class ClientSearchResult(BaseModel):
+    """Client matched by a search"""
+    id: int
+    uuid: str
+    name: str
+    username: str
+    location: str
+    phone_number: str
+
 # Dashboard Schemas
 class DashboardResponse(BaseModel):
     """Dashboard response schema"""
@@ -202,7 +231,190 @@ class ClientCalculationResponse(BaseModel):
     pending_amount: float  # (total_debit - total_credit) ± profit_loss
     status: str  # "Profit" or "Loss"
 
+class UserStatementResponse(BaseModel):
+    """User records over a period with the balance before and after it"""
+    user_id: int
+    user_name: str
+    date_from: Optional[date]
+    date_to: Optional[date]
+    opening_balance: float
+    closing_balance: float
+    total_debit: float
+    total_credit: float
+    records: List[UserRecordResponse]
+
+class ClientStatementResponse(BaseModel):
+    """Client records over a period with the pending amount before and after it"""
+    client_id: int
+    client_name: str
+    date_from: Optional[date]
+    date_to: Optional[date]
+    opening_balance: float
+    closing_balance: float
+    total_debit: float
+    total_credit: float
+    profit_loss_total: float
+    records: List[ClientRecordResponse]
+
+class UserBalanceAsOfResponse(BaseModel):
+    """A user's balance at the end of a day"""
+    user_id: int
+    user_name: str
+    as_of: date
+    balance: float  # debit - credit of every record up to that day
+
+class ClientBalanceAsOfResponse(BaseModel):
+    """A client's pending amount at the end of a day"""
+    client_id: int
+    client_name: str
+    as_of: date
+    balance: float  # pending amount of every record up to that day
+
 class PendingAmountResponse(BaseModel):
     """Pending amount response"""
     total_pending: float
-    details: List[dict]
\ No newline at end of file
+    details: List[dict]
+
+# Pagination Schemas
+class PageParams:
+    """Keyset pagination and date range query parameters"""
+    def __init__(
+        self,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = Query(None, ge=1, le=1000),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.date_from = date_from
+        self.date_to = date_to
+
+# Page Bootstrap Schemas
+class UserBalanceSummary(BaseModel):
+    """User balance summary"""
+    total_debit: float
+    total_credit: float
+    sum_deficit: float
+    status: str
+
+class UserPageEntry(BaseModel):
+    """User with balance summary"""
+    user: UserResponse
+    calc: UserBalanceSummary
+
+class UsersPageResponse(BaseModel):
+    """Users page bootstrap response"""
+    total_pending: float
+    users: List[UserPageEntry]
+
+class ClientBalanceSummary(BaseModel):
+    """Client balance summary"""
+    client_id: int
+    client_name: str
+    total_debit: float
+    total_credit: float
+    profit_loss_total: float
+    pending_amount: float
+    status: str
+
+class ClientPageEntry(BaseModel):
+    """Client with balance summary"""
+    client: ClientResponse
+    calc: ClientBalanceSummary
+
+class ClientsPageResponse(BaseModel):
+    """Clients page bootstrap response"""
+    total_pending: float
+    clients: List[ClientPageEntry]
+
+# Bulk Import Schemas
+class ImportKind(str, Enum):
+    """Kind of rows in a bulk import"""
+    USERS = "users"
+    CLIENTS = "clients"
+    USER_RECORDS = "user_records"
+    CLIENT_RECORDS = "client_records"
+
+class ImportFormat(str, Enum):
+    """Bulk import stream format"""
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class ImportRowError(BaseModel):
+    """Validation errors of one imported row"""
+    row: int
+    errors: List[str]
+
+class ImportResponse(BaseModel):
+    """Bulk import report"""
+    kind: ImportKind
+    total_rows: int
+    inserted: int
+    failed: int
+    errors: List[ImportRowError]
+
+# Export Schemas
+class ExportFormat(str, Enum):
+    """Ledger export file format"""
+    CSV = "csv"
+    XLSX = "xlsx"
+
+# Repricing Schemas
+class RepriceRequest(BaseModel):
+    """Debit repricing parameters; omitted rates keep their current values"""
+    tax_rate: Optional[float] = Field(None, ge=0)
+    levi_per_bag: Optional[float] = Field(None, ge=0)
+    amount_per_kg: Optional[float] = Field(None, gt=0)
+    product_type: Optional[str] = None
+    user_id: Optional[int] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    dry_run: bool = True
+
+class RepriceUserDelta(BaseModel):
+    """Effect of a repricing on one user"""
+    user_id: int
+    user_name: str
+    rows_changed: int
+    debit_delta: float
+    pending_before: float
+    pending_after: float
+
+class RepriceResponse(BaseModel):
+    """Repricing report"""
+    dry_run: bool
+    rows_matched: int
+    rows_changed: int
+    total_delta: float
+    users: List[RepriceUserDelta]
+
+# Report Schemas
+class ReportPeriod(str, Enum):
+    """Length of the periods a report sums records over"""
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+class UserRecordReportRow(BaseModel):
+    """User record sums of one period, user and product type"""
+    period_start: date
+    user_id: Optional[int] = None  # only when grouped by user
+    product_type: Optional[str] = None  # only when grouped by product; "" for credits
+    records: int
+    bags: int
+    kg: float
+    net_weight: float
+    net_amount: float
+    tax: float
+    levi: float
+    credit_amount: float
+
+class ClientRecordReportRow(BaseModel):
+    """Client record sums of one period and client"""
+    period_start: date
+    client_id: Optional[int] = None  # only when grouped by client
+    records: int
+    debit_amount: float
+    credit_amount: float
+    profit_loss: float
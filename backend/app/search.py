@@ -0,0 +1,128 @@
+"""
+Indexed search over users and clients
+
+Autocomplete matches what has been typed so far against a party's names,
+phone number and location without reading every party of the admin.
+
+On SQLite each searched table has an FTS5 index that triggers keep in sync
+with the table, so every write path, bulk inserts included, updates it in
+the same transaction. The index holds every admin's rows, so it also holds
+each row's admin_id and a search matches that first: ranking and sorting
+then cost what the admin's own matches cost, not the whole install's.
+Every typed word matches as a word prefix and results are ranked by bm25.
+On Postgres a pg_trgm GIN index over the same columns serves substring
+matches ranked by word similarity, and the index itself follows every
+write. Migration 7 creates both; migration 8 rebuilds the client index to
+add its location, and migration 9 rebuilds both to add the admin_id.
+"""
+import re
+from typing import List
+from sqlalchemy import column, func, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+# Results returned when a search gives no limit, and the most it may ask for
+SEARCH_LIMIT = 10
+SEARCH_MAX_LIMIT = 50
+
+# Searched columns of each table
+SEARCH_COLUMNS = {
+    "users": ["first_name", "last_name", "mobile", "location"],
+    "clients": ["name", "username", "location", "phone_number"],
+}
+
+def search_terms(query: str) -> List[str]:
+    """Split what was typed into the words to match"""
+    return re.findall(r"[^\W_]+", query.lower())
+
+def fts_match(admin_id: int, terms: List[str], columns: List[str]) -> str:
+    """Get the FTS5 query matching an admin's rows with a word in columns starting with every term"""
+    # Terms are plain word characters, so quoting them is enough to keep FTS5 syntax out
+    words = " ".join(f'"{term}"*' for term in terms)
+    return f'admin_id : "{int(admin_id)}" AND {{{" ".join(columns)}}} : ({words})'
+
+def trigram_text(model, columns: List[str]):
+    """Get the text the Postgres trigram index holds for a row, as a SQL expression"""
+    # Literals rather than bound parameters, so the expression matches the index
+    searched = None
+    for name in columns:
+        value = func.coalesce(getattr(model, name), literal_column("''"))
+        searched = value if searched is None else searched + literal_column("' '") + value
+    return searched
+
+def create_search_indexes(conn):
+    """Create the search index of each searched table and fill it from the existing rows"""
+    for table_name in SEARCH_COLUMNS:
+        create_search_index(conn, table_name)
+
+def create_search_index(conn, table_name: str):
+    """Create the search index of one table and fill it from the existing rows"""
+    columns = SEARCH_COLUMNS[table_name]
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        searched = " || ' ' || ".join(f"coalesce({name}, '')" for name in columns)
+        conn.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table_name}_search ON {table_name} "
+            f"USING gin (({searched}) gin_trgm_ops)"
+        ))
+        return
+    
+    index = f"{table_name}_search"
+    # The admin_id column lets a search match only its admin's rows
+    columns = ["admin_id"] + columns
+    listed = ", ".join(columns)
+    new_values = ", ".join(f"new.{name}" for name in columns)
+    old_values = ", ".join(f"old.{name}" for name in columns)
+    # External content: the index stores only tokens and reads rows back from the table
+    conn.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {index} USING fts5("
+        f"{listed}, content='{table_name}', content_rowid='id', prefix='1 2 3')"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {index}_insert AFTER INSERT ON {table_name} BEGIN "
+        f"INSERT INTO {index}(rowid, {listed}) VALUES (new.id, {new_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {index}_delete AFTER DELETE ON {table_name} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {listed}) VALUES ('delete', old.id, {old_values}); END"
+    ))
+    conn.execute(text(
+        f"CREATE TRIGGER IF NOT EXISTS {index}_update AFTER UPDATE OF {listed} ON {table_name} BEGIN "
+        f"INSERT INTO {index}({index}, rowid, {listed}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {index}(rowid, {listed}) VALUES (new.id, {new_values}); END"
+    ))
+    # Every match shares its admin_id, so only the searched columns weigh in the ranking
+    weights = ", ".join(["0.0"] + ["1.0"] * (len(columns) - 1))
+    conn.execute(text(f"INSERT INTO {index}({index}, rank) VALUES ('rank', 'bm25({weights})')"))
+    conn.execute(text(f"INSERT INTO {index}({index}) VALUES ('rebuild')"))
+
+def drop_search_index(conn, table_name: str):
+    """Drop the search index of one table, so it can be created over different columns"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(f"DROP INDEX IF EXISTS ix_{table_name}_search"))
+        return
+    
+    index = f"{table_name}_search"
+    for trigger in ("insert", "delete", "update"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {index}_{trigger}"))
+    conn.execute(text(f"DROP TABLE IF EXISTS {index}"))
+
+def search_rows(db: Session, model, admin_id: int, query: str, columns: list, limit: int = SEARCH_LIMIT) -> list:
+    """Find an admin's users or clients matching what was typed, best first, as rows of the given columns"""
+    terms = search_terms(query)
+    if not terms:
+        return []
+    
+    stmt = select(*columns).where(model.admin_id == admin_id)
+    if db.get_bind().dialect.name == "postgresql":
+        searched = trigram_text(model, SEARCH_COLUMNS[model.__tablename__])
+        for term in terms:
+            stmt = stmt.where(searched.ilike(f"%{term}%"))
+        stmt = stmt.order_by(func.word_similarity(" ".join(terms), searched).desc(), model.id)
+    else:
+        index_name = f"{model.__tablename__}_search"
+        index = table(index_name, column("rowid"), column("rank"))
+        stmt = stmt.join(index, index.c.rowid == model.id).where(
+            text(f"{index_name} MATCH :match").bindparams(match=fts_match(admin_id, terms, SEARCH_COLUMNS[model.__tablename__]))
+        ).order_by(index.c.rank, model.id)
+    
+    return db.connection().execute(stmt.limit(limit)).all()
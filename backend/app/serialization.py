@@ -0,0 +1,38 @@
+"""
+Fast JSON responses
+
+Responses are encoded with orjson rather than the standard json module.
+List endpoints go further: they read plain column rows instead of ORM
+objects, and a TypeAdapter built once per response schema validates the
+whole list inside pydantic-core as dicts, skipping a model instance per
+row. orjson encodes those the same way pydantic does, so the bytes match
+the response_model path for the same rows; only floats that need an
+exponent are written differently from the json module (1e-05 as 0.00001).
+"""
+from functools import lru_cache
+from typing import Iterable, List, Mapping, Optional, Type
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import TypedDict
+
+@lru_cache(maxsize=None)
+def rows_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """Get the adapter that validates a list of rows against a response schema's fields, built on first use"""
+    # The response schemas are plain annotated fields, so a TypedDict of them validates the same way
+    row = TypedDict(f"{schema.__name__}Row", {name: field.annotation for name, field in schema.model_fields.items()})
+    return TypeAdapter(List[row])
+
+def schema_columns(model, schema: Type[BaseModel]) -> list:
+    """Get the model columns a response schema reads, in field order"""
+    return [getattr(model, name) for name in schema.model_fields]
+
+def validate_rows(schema: Type[BaseModel], rows: Iterable[tuple]) -> list:
+    """Turn rows selected with schema_columns into JSON-ready dicts of the schema"""
+    names = list(schema.model_fields)
+    return rows_adapter(schema).validate_python([dict(zip(names, row)) for row in rows])
+
+class RowsResponse(ORJSONResponse):
+    """JSON list of a response schema built straight from column rows"""
+    
+    def __init__(self, schema: Type[BaseModel], rows: Iterable[tuple], headers: Optional[Mapping[str, str]] = None):
+        super().__init__(content=validate_rows(schema, rows), headers=headers)
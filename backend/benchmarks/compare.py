@@ -0,0 +1,91 @@
+"""
+Compare two benchmark result files and flag regressions
+
+A benchmark regresses when both its median and its fastest time grow by
+more than the threshold, or when it runs more statements than before; it
+improves when both shrink by more than the threshold. Exits with status 1 if
+anything regressed, so CI can fail on it.
+
+Usage: python -m benchmarks.compare BASE.json NEW.json [--threshold 0.10] [--min-ms 0.05]
+"""
+import argparse
+import json
+import sys
+
+# Dataset sizes that must roughly match for two runs to be comparable
+DATASET_SIZES = ["admins", "users", "clients", "user_records", "client_records"]
+
+# Relative size difference tolerated, as the write benchmarks grow a reused database
+SIZE_TOLERANCE = 0.01
+
+def comparability_warnings(base: dict, new: dict) -> list:
+    """Get the reasons two result files may not be comparable"""
+    warnings = []
+    if base['meta']['dialect'] != new['meta']['dialect']:
+        warnings.append(f"dialect differs ({base['meta']['dialect']} vs {new['meta']['dialect']})")
+    for name in DATASET_SIZES:
+        before, after = base['dataset'][name], new['dataset'][name]
+        if abs(after - before) > SIZE_TOLERANCE * max(before, 1):
+            warnings.append(f"{name} differs ({before} vs {after})")
+    if base['meta']['repeat'] != new['meta']['repeat']:
+        warnings.append(f"repeat differs ({base['meta']['repeat']} vs {new['meta']['repeat']})")
+    return warnings
+
+def compare(base: dict, new: dict, threshold: float, min_ms: float) -> list:
+    """Get (name, base median, new median, ratio, base statements, new statements, verdict) per benchmark"""
+    rows = []
+    for name in sorted(base.keys() | new.keys()):
+        before, after = base.get(name), new.get(name)
+        if before is None or after is None:
+            rows.append((name, before and before['median_ms'], after and after['median_ms'], None, None, None, "added" if before is None else "removed"))
+            continue
+        
+        ratio = after['median_ms'] / before['median_ms'] if before['median_ms'] else None
+        fastest = after['min_ms'] / before['min_ms'] if before['min_ms'] else None
+        # Differences below min_ms are timer noise whatever their ratio
+        moved = ratio is not None and fastest is not None and abs(after['median_ms'] - before['median_ms']) >= min_ms
+        verdict = "ok"
+        # The fastest run has to move too, so a few slow runs alone flag nothing
+        if moved and ratio > 1 + threshold and fastest > 1 + threshold:
+            verdict = "REGRESSION"
+        elif moved and ratio < 1 - threshold and fastest < 1 - threshold:
+            verdict = "improved"
+        if before['statements'] is not None and after['statements'] is not None and after['statements'] > before['statements']:
+            verdict = "REGRESSION"
+        rows.append((name, before['median_ms'], after['median_ms'], ratio, before['statements'], after['statements'], verdict))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base", help="Result file of the baseline run")
+    parser.add_argument("new", help="Result file of the run to check")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Median change counted as a regression or improvement")
+    parser.add_argument("--min-ms", type=float, default=0.05, help="Smallest median change in ms that counts at all")
+    args = parser.parse_args()
+    
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    
+    for warning in comparability_warnings(base, new):
+        print(f"warning: {warning}, results may not be comparable")
+    print(f"base {base['meta'].get('git_commit')} ({base['meta']['created']}) vs new {new['meta'].get('git_commit')} ({new['meta']['created']})")
+    
+    rows = compare(base['results'], new['results'], args.threshold, args.min_ms)
+    print(f"{'benchmark':<40} {'base ms':>10} {'new ms':>10} {'change':>8} {'statements':>12}  verdict")
+    for name, before, after, ratio, before_statements, after_statements, verdict in rows:
+        change = f"{(ratio - 1) * 100:+.1f}%" if ratio is not None else "-"
+        counts = f"{before_statements}->{after_statements}" if before_statements is not None and after_statements is not None else "-"
+        print(
+            f"{name:<40} {before if before is not None else '-':>10} {after if after is not None else '-':>10} "
+            f"{change:>8} {counts:>12}  {verdict}"
+        )
+    
+    regressions = [row[0] for row in rows if row[-1] == "REGRESSION"]
+    improvements = [row[0] for row in rows if row[-1] == "improved"]
+    print(f"{len(regressions)} regressed, {len(improvements)} improved, threshold {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Macro-benchmarks of the HTTP endpoints
+
+Requests go through the whole app - middleware, authentication, routing,
+serialization - over an in-process ASGI client, so no server or network is
+timed. The flows mirror what the frontend does:
+
+- users.html load: the users page, then the busiest user's record details
+- users.html revisit: the same two requests revalidated with their ETags
+- dashboard load and poll: the dashboard without and with its ETag
+- a burst of concurrent dashboard polls, as from many open tabs
+
+Loads clear the results cache first, so they measure the query path rather
+than a cache hit. Statements come from each response's Server-Timing header.
+"""
+import asyncio
+import re
+from datetime import date, timedelta
+import httpx
+from app import cache
+from app.main import app
+from .seed import ADMIN_PASSWORD
+from .timing import measure_async
+
+# Concurrent polls in the dashboard burst
+POLL_BURST = 20
+
+SERVER_TIMING_STATEMENTS = re.compile(r'desc="(\d+) statements"')
+
+def statements(response: httpx.Response) -> int:
+    """Get the statements a response's request ran, from its Server-Timing header"""
+    match = SERVER_TIMING_STATEMENTS.search(response.headers.get("server-timing", ""))
+    return int(match.group(1)) if match else 0
+
+class Browser:
+    """An authenticated client that revalidates with ETags the way the frontend's fetchWithETag does"""
+    
+    def __init__(self, client: httpx.AsyncClient, token: str):
+        self.client = client
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.etags = {}
+    
+    async def get(self, url: str, params: dict = None, revalidate: bool = False) -> int:
+        """Get a URL and return the statements it ran"""
+        headers = dict(self.headers)
+        if revalidate and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = await self.client.get(url, params=params, headers=headers)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"GET {url} returned {response.status_code}: {response.text[:200]}")
+        if "etag" in response.headers:
+            self.etags[url] = response.headers["etag"]
+        return statements(response)
+    
+    async def post(self, url: str, body: dict) -> int:
+        """Post JSON to a URL and return the statements it ran"""
+        response = await self.client.post(url, json=body, headers=self.headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"POST {url} returned {response.status_code}: {response.text[:200]}")
+        return statements(response)
+
+def flows(browser: Browser, tenant: dict) -> dict:
+    """Get each macro-benchmark by name, as (coroutine function, whether to clear the results cache first)"""
+    admin = f"/api/admin/{tenant['admin_uuid']}"
+    user = f"{admin}/user/{tenant['hot_user_id']}"
+    dashboard = f"/api/dashboard/{tenant['admin_uuid']}"
+    month_ago = (date.today() - timedelta(days=30)).isoformat()
+    year_ago = (date.today() - timedelta(days=365)).isoformat()
+    
+    async def users_load():
+        return await browser.get(f"{admin}/users_page") + await browser.get(f"{user}/record_details")
+    
+    async def users_revisit():
+        return (
+            await browser.get(f"{admin}/users_page", revalidate=True)
+            + await browser.get(f"{user}/record_details", revalidate=True)
+        )
+    
+    async def poll_burst():
+        return sum(await asyncio.gather(*(browser.get(dashboard, revalidate=True) for _ in range(POLL_BURST))))
+    
+    async def add_record():
+        return await browser.post(f"{user}/add_record", {
+            "transaction_type": "debit", "bags": 12, "product_type": "rice",
+            "kg": 600, "cut_weight": 1.5, "amount_per_kg": 32.5
+        })
+    
+    # Writes last, so the reads above see the seeded data only
+    return {
+        "http.users_html.load": (users_load, True),
+        "http.users_html.revisit": (users_revisit, False),
+        "http.clients_page": (lambda: browser.get(f"{admin}/clients_page"), True),
+        "http.dashboard.load": (lambda: browser.get(dashboard), True),
+        "http.dashboard.poll": (lambda: browser.get(dashboard, revalidate=True), False),
+        f"http.dashboard.poll_burst_{POLL_BURST}": (poll_burst, False),
+        "http.user_statement.last_month": (lambda: browser.get(f"{user}/statement", {"date_from": month_ago}), False),
+        "http.reports.user_records.month": (
+            lambda: browser.get(f"{admin}/reports/user_records", {"period": "month", "date_from": year_ago, "by_product": "true"}),
+            False
+        ),
+        "http.search_users": (lambda: browser.get(f"{admin}/search_users", {"q": "ra pu"}), False),
+        "http.user.add_record": (add_record, False),
+    }
+
+async def run_async(tenant: dict, repeat: int, names=None) -> dict:
+    results = {}
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            login = await client.post("/api/login_admin", json={"name": tenant['admin_name'], "password": ADMIN_PASSWORD})
+            login.raise_for_status()
+            browser = Browser(client, login.json()["access_token"])
+            for name, (flow, cold) in flows(browser, tenant).items():
+                if names and name not in names:
+                    continue
+                results[name] = await measure_async(flow, repeat, before=cache.results_cache.clear if cold else None)
+    finally:
+        await app.router.shutdown()
+    return results
+
+def run(tenant: dict, repeat: int, names=None) -> dict:
+    """Run the macro-benchmarks, or those named, and return their results by name"""
+    return asyncio.run(run_async(tenant, repeat, names))
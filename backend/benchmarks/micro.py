@@ -0,0 +1,97 @@
+"""
+Micro-benchmarks of the crud, rollup and search functions
+
+Each benchmark calls one function against the busiest seeded admin and its
+busiest user and client, on a session of its own whose transaction is
+rolled back before every call, so each call starts cold the way a request
+does. Statements are counted by a cursor listener on the engine.
+"""
+from datetime import date, timedelta
+from sqlalchemy import event
+from app import crud, models, rollups, schemas, search
+from app.database import SessionLocal, engine
+from app.serialization import schema_columns
+from .timing import measure
+
+class StatementCounter:
+    """Counts the statements the engine runs"""
+    
+    def __init__(self):
+        self.count = 0
+    
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+    
+    def since(self, start: int) -> int:
+        return self.count - start
+
+def benchmarks(tenant: dict) -> dict:
+    """Get each micro-benchmark by name, as a function of a session"""
+    admin_id = tenant['admin_id']
+    user_id = tenant['hot_user_id']
+    client_id = tenant['hot_client_id']
+    month_ago = date.today() - timedelta(days=30)
+    year_ago = date.today() - timedelta(days=365)
+    record_columns = schema_columns(models.UserRecord, schemas.UserRecordResponse)
+    search_columns = schema_columns(models.User, schemas.UserSearchResult)
+    
+    def user_statement(db):
+        return crud.get_user_statement(db, db.get(models.User, user_id), date_from=month_ago)
+    
+    def add_user_record(db):
+        record_data = schemas.UserRecordCreate(
+            transaction_type="debit", bags=12, product_type="rice", kg=600, cut_weight=1.5, amount_per_kg=32.5
+        )
+        return crud.add_user_record(db, user_id, admin_id, record_data)
+    
+    # Writes last, so the reads above see the seeded data only
+    return {
+        "crud.get_users_page": lambda db: crud.get_users_page(db, admin_id),
+        "crud.get_clients_page": lambda db: crud.get_clients_page(db, admin_id),
+        "crud.get_dashboard_summary": lambda db: crud.get_dashboard_summary(db, admin_id),
+        "crud.get_all_users_pending_amount": lambda db: crud.get_all_users_pending_amount(db, admin_id),
+        "crud.get_all_clients_pending_amount": lambda db: crud.get_all_clients_pending_amount(db, admin_id),
+        "crud.get_user_records": lambda db: crud.get_user_records(db, user_id, columns=record_columns),
+        "crud.get_user_records.last_month": lambda db: crud.get_user_records(
+            db, user_id, date_from=month_ago, columns=record_columns
+        ),
+        "crud.get_client_records": lambda db: crud.get_client_records(db, client_id),
+        "crud.get_user_statement.last_month": user_statement,
+        "crud.get_user_balance_as_of": lambda db: crud.get_user_balance_as_of(db, user_id, month_ago),
+        "rollups.report_user_records.month": lambda db: rollups.report_user_records(
+            db, admin_id, period="month", date_from=year_ago, by_product=True
+        ),
+        "rollups.report_client_records.day": lambda db: rollups.report_client_records(
+            db, admin_id, period="day", date_from=month_ago
+        ),
+        "search.search_rows.users": lambda db: search.search_rows(db, models.User, admin_id, "ra pu", search_columns),
+        "crud.add_user_record": add_user_record,
+    }
+
+def run(tenant: dict, repeat: int, names=None) -> dict:
+    """Run the micro-benchmarks, or those named, and return their results by name"""
+    counter = StatementCounter()
+    event.listen(engine, "after_cursor_execute", counter)
+    results = {}
+    try:
+        for name, benchmark in benchmarks(tenant).items():
+            if names and name not in names:
+                continue
+            db = SessionLocal()
+            start = 0
+            
+            def reset():
+                nonlocal start
+                db.rollback()
+                db.expire_all()
+                start = counter.count
+            
+            try:
+                results[name] = measure(
+                    lambda: benchmark(db), repeat, before=reset, statements=lambda: counter.since(start)
+                )
+            finally:
+                db.close()
+    finally:
+        event.remove(engine, "after_cursor_execute", counter)
+    return results
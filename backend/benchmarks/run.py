@@ -0,0 +1,133 @@
+"""
+Benchmark suite: seed a synthetic dataset, then run the micro and macro benchmarks
+
+Seeds a database (a throwaway SQLite file unless --database-url points
+elsewhere, such as a local Postgres) with a named scale of admins, users,
+clients and records, then times the crud functions directly and the HTTP
+endpoints through an in-process ASGI client. Results are written as JSON;
+compare two result files with python -m benchmarks.compare.
+
+The benchmarks that write add a few records per run, so a reused database
+(--no-seed) drifts slightly from its seeded size.
+
+Usage: python -m benchmarks.run [--scale small|medium|large] [--database-url URL]
+       [--suite all|micro|macro] [--repeat N] [--output FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from typing import Optional
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", help="Database to seed and benchmark, empty unless --no-seed (default: a new SQLite file)")
+    parser.add_argument("--scale", choices=["small", "medium", "large"], default="small")
+    parser.add_argument("--admins", type=int, help="Override the scale's number of admins")
+    parser.add_argument("--users", type=int, help="Override the scale's users per admin")
+    parser.add_argument("--clients", type=int, help="Override the scale's clients per admin")
+    parser.add_argument("--user-records", type=int, help="Override the scale's total user records")
+    parser.add_argument("--client-records", type=int, help="Override the scale's total client records")
+    parser.add_argument("--days", type=int, default=365, help="Days the records are spread over")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of records per user and client")
+    parser.add_argument("--random-seed", type=int, default=1)
+    parser.add_argument("--no-seed", action="store_true", help="Benchmark a database seeded by an earlier run")
+    parser.add_argument("--seed-only", action="store_true", help="Seed the database and stop")
+    parser.add_argument("--suite", choices=["all", "micro", "macro"], default="all")
+    parser.add_argument("--only", help="Comma-separated benchmark names to run")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", default="benchmark-results.json")
+    return parser.parse_args()
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    args = parse_args()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    
+    # Imported only now, so the app creates its engines on DATABASE_URL; importing
+    # the app also creates the tables and runs the migrations
+    import sqlalchemy
+    from app.main import app  # noqa: F401
+    from app.database import DATABASE_DIALECT, SessionLocal
+    from . import macro, micro, seed
+    
+    sizes = dict(seed.SCALES[args.scale])
+    for name in sizes:
+        if getattr(args, name) is not None:
+            sizes[name] = getattr(args, name)
+    
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        if args.no_seed:
+            dataset = seed.describe(db)
+        else:
+            dataset = seed.seed(db, **sizes, days=args.days, skew=args.skew, random_seed=args.random_seed)
+        seed_seconds = time.perf_counter() - started
+    finally:
+        db.close()
+    
+    tenant = dataset['tenants'][0]
+    print(
+        f"{dataset['admins']} admins, {dataset['users']} users, {dataset['clients']} clients, "
+        f"{dataset['user_records']} user and {dataset['client_records']} client records "
+        f"({'described' if args.no_seed else 'seeded'} in {seed_seconds:.1f}s)"
+    )
+    print(f"hot tenant {tenant['admin_name']}: user {tenant['hot_user_id']} with {tenant['hot_user_records']} records")
+    if args.seed_only:
+        print(f"database: {os.environ['DATABASE_URL']}")
+        return
+    
+    names = set(args.only.split(",")) if args.only else None
+    results = {}
+    if args.suite in ("all", "micro"):
+        results.update(micro.run(tenant, args.repeat, names))
+    if args.suite in ("all", "macro"):
+        results.update(macro.run(tenant, args.repeat, names))
+    
+    report = {
+        'meta': {
+            'created': datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'dialect': DATABASE_DIALECT,
+            'repeat': args.repeat,
+            # How this run seeded its database, or None when it reused one
+            'seed': None if args.no_seed else {
+                'scale': args.scale,
+                'sizes': sizes,
+                'days': args.days,
+                'skew': args.skew,
+                'random_seed': args.random_seed,
+                'seconds': round(seed_seconds, 3),
+            },
+        },
+        'dataset': dataset,
+        'results': results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    print(f"{'benchmark':<40} {'median ms':>10} {'min ms':>10} {'p90 ms':>10} {'statements':>11}")
+    for name, result in results.items():
+        print(
+            f"{name:<40} {result['median_ms']:10.2f} {result['min_ms']:10.2f} {result['p90_ms']:10.2f} "
+            f"{result['statements'] if result['statements'] is not None else '-':>11}"
+        )
+    print(f"results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+Synthetic tenant seeder
+
+Fills an empty database with admins, their users and clients, and user
+and client records spread over a span of days. Records go in through the
+crud insert functions in date order, so running totals, record balances,
+rollups and search indexes end up exactly as the app would leave them.
+
+Real ledgers are lopsided: a few buyers and vendors account for most of
+the records. Owners are picked with Zipf weights, so with the default skew
+the busiest user of a run holds hundreds of times the records of the
+quietest, and the admins' record counts differ accordingly.
+"""
+from datetime import datetime, timedelta
+from itertools import accumulate
+import random
+from sqlalchemy import func, insert, select
+from app import auth, crud, models, schemas
+
+# Dataset sizes by name; users and clients are per admin, records are totals
+SCALES = {
+    "small": {"admins": 2, "users": 200, "clients": 50, "user_records": 20000, "client_records": 5000},
+    "medium": {"admins": 5, "users": 1000, "clients": 200, "user_records": 200000, "client_records": 40000},
+    "large": {"admins": 10, "users": 5000, "clients": 1000, "user_records": 1000000, "client_records": 200000},
+}
+
+# Password of every seeded admin
+ADMIN_PASSWORD = "benchmark"
+
+# Records inserted per transaction
+SEED_BATCH_SIZE = 1000
+
+FIRST_NAMES = ["Amit", "Anil", "Deepak", "Ganesh", "Kiran", "Mahesh", "Pooja", "Priya", "Rahul", "Rajesh", "Ramesh", "Sunita", "Suresh", "Vijay"]
+LAST_NAMES = ["Patil", "Kumar", "Sharma", "Deshmukh", "Rao", "Joshi", "Kulkarni", "Reddy", "Shinde", "Yadav"]
+LOCATIONS = ["Pune", "Nashik", "Nagpur", "Mumbai", "Thane", "Satara", "Kolhapur", "Solapur"]
+TRADES = ["Traders", "Agencies", "Enterprises", "Mills", "Suppliers", "& Sons"]
+
+# Product types with their share of debit records and price range per kg
+PRODUCTS = {"rice": (0.4, 28, 60), "wheat": (0.3, 22, 35), "jowar": (0.15, 25, 45), "bajra": (0.1, 20, 32), "tur": (0.05, 80, 120)}
+
+def zipf_weights(count: int, skew: float) -> list:
+    """Get cumulative Zipf weights of count owners, busiest first"""
+    return list(accumulate(1 / (rank + 1) ** skew for rank in range(count)))
+
+def record_dates(rng: random.Random, count: int, start: datetime, days: int) -> list:
+    """Get count random record times between start and start + days, in order"""
+    span = days * 86400
+    return sorted(start + timedelta(seconds=rng.random() * span) for _ in range(count))
+
+def user_record_data(rng: random.Random) -> schemas.UserRecordCreate:
+    """Make one plausible debit (most of the time) or credit user record"""
+    if rng.random() < 0.7:
+        product_type = rng.choices(list(PRODUCTS), weights=[share for share, _, _ in PRODUCTS.values()])[0]
+        _, low, high = PRODUCTS[product_type]
+        return schemas.UserRecordCreate(
+            transaction_type="debit",
+            bags=rng.randint(1, 60),
+            product_type=product_type,
+            kg=round(rng.uniform(50, 3000), 2),
+            cut_weight=round(rng.uniform(0, 5), 2),
+            amount_per_kg=round(rng.uniform(low, high), 2)
+        )
+    return schemas.UserRecordCreate(
+        transaction_type="credit",
+        credit_amount=round(rng.lognormvariate(9, 1), 2),
+        round_off=round(rng.uniform(0, 1), 2)
+    )
+
+def client_record_data(rng: random.Random) -> schemas.ClientRecordCreate:
+    """Make one plausible debit or credit client record"""
+    if rng.random() < 0.55:
+        return schemas.ClientRecordCreate(
+            transaction_type="debit",
+            debit_amount=round(rng.lognormvariate(10, 1), 2),
+            profit_loss=round(rng.gauss(0, 500), 2)
+        )
+    return schemas.ClientRecordCreate(transaction_type="credit", credit_amount=round(rng.lognormvariate(10, 1), 2))
+
+def seed(
+    db,
+    admins: int,
+    users: int,
+    clients: int,
+    user_records: int,
+    client_records: int,
+    days: int = 365,
+    skew: float = 1.1,
+    random_seed: int = 1
+) -> dict:
+    """Seed an empty database and describe what was created"""
+    if db.execute(select(func.count()).select_from(models.Admin)).scalar():
+        raise RuntimeError("The benchmark seeder needs an empty database")
+    
+    rng = random.Random(random_seed)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=days)
+    password = auth.get_password_hash(ADMIN_PASSWORD)
+    
+    user_owners = []
+    client_owners = []
+    for number in range(admins):
+        admin = models.Admin(name=f"bench-admin-{number}", password=password, created_date=start)
+        db.add(admin)
+        db.flush()
+        user_ids = db.execute(insert(models.User).returning(models.User.id, sort_by_parameter_order=True), [
+            {
+                'admin_id': admin.id,
+                'first_name': rng.choice(FIRST_NAMES),
+                'last_name': rng.choice(LAST_NAMES),
+                'mobile': str(rng.randint(7000000000, 9999999999)),
+                'location': rng.choice(LOCATIONS),
+                'created_date': start,
+                'updated_date': start
+            }
+            for _ in range(users)
+        ]).scalars().all()
+        client_ids = db.execute(insert(models.Client).returning(models.Client.id, sort_by_parameter_order=True), [
+            {
+                'admin_id': admin.id,
+                'name': f"{rng.choice(LAST_NAMES)} {rng.choice(TRADES)}",
+                'username': f"bench{number}_{index}",
+                'location': rng.choice(LOCATIONS),
+                'phone_number': str(rng.randint(7000000000, 9999999999)),
+                'created_date': start,
+                'updated_date': start
+            }
+            for index in range(clients)
+        ]).scalars().all()
+        db.commit()
+        user_owners += user_ids
+        client_owners += client_ids
+    
+    # Shuffled, so every admin gets a mix of busy and quiet owners
+    rng.shuffle(user_owners)
+    rng.shuffle(client_owners)
+    seed_records(
+        db, rng, user_owners, user_records, start, days, skew,
+        lambda owner: crud.build_user_record_values(owner, user_record_data(rng)), crud.insert_user_records
+    )
+    seed_records(
+        db, rng, client_owners, client_records, start, days, skew,
+        lambda owner: crud.build_client_record_values(owner, client_record_data(rng)), crud.insert_client_records
+    )
+    return describe(db)
+
+def busiest(db, owner, owner_column, admin_id: int) -> tuple:
+    """Get an admin's user or client with the most records and its record count"""
+    return db.execute(
+        select(owner_column, func.count().label("records"))
+        .join(owner, owner.id == owner_column)
+        .where(owner.admin_id == admin_id)
+        .group_by(owner_column)
+        .order_by(func.count().desc(), owner_column)
+        .limit(1)
+    ).one()
+
+def describe(db) -> dict:
+    """Describe a seeded database: its sizes, and each admin with its busiest user and client
+    
+    The benchmarks use the first admin, which has the most records, as their
+    hot tenant and its busiest user and client as their hot ledgers.
+    """
+    counts = {
+        name: db.execute(select(func.count()).select_from(model)).scalar()
+        for name, model in (
+            ("admins", models.Admin), ("users", models.User), ("clients", models.Client),
+            ("user_records", models.UserRecord), ("client_records", models.ClientRecord),
+        )
+    }
+    tenants = []
+    for admin in db.execute(select(models.Admin).where(models.Admin.name.like("bench-admin-%"))).scalars():
+        hot_user_id, hot_user_records = busiest(db, models.User, models.UserRecord.user_id, admin.id)
+        hot_client_id, hot_client_records = busiest(db, models.Client, models.ClientRecord.client_id, admin.id)
+        tenants.append({
+            'admin_id': admin.id,
+            'admin_uuid': admin.uuid,
+            'admin_name': admin.name,
+            'user_records': db.execute(
+                select(func.count()).select_from(models.UserRecord)
+                .join(models.User, models.User.id == models.UserRecord.user_id)
+                .where(models.User.admin_id == admin.id)
+            ).scalar(),
+            'hot_user_id': hot_user_id,
+            'hot_user_records': hot_user_records,
+            'hot_client_id': hot_client_id,
+            'hot_client_records': hot_client_records,
+        })
+    if not tenants:
+        raise RuntimeError("No seeded admins found; run the seeder first")
+    return {**counts, 'tenants': sorted(tenants, key=lambda tenant: -tenant['user_records'])}
+
+def seed_records(db, rng: random.Random, owners: list, count: int, start: datetime, days: int, skew: float, build, insert_records):
+    """Insert count records for owners picked with Zipf weights, in date order"""
+    weights = zipf_weights(len(owners), skew)
+    batch = []
+    for created_date in record_dates(rng, count, start, days):
+        owner = rng.choices(owners, cum_weights=weights)[0]
+        batch.append({**build(owner), 'created_date': created_date})
+        if len(batch) == SEED_BATCH_SIZE:
+            insert_records(db, batch)
+            db.commit()
+            batch = []
+    if batch:
+        insert_records(db, batch)
+        db.commit()
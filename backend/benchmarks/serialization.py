@@ -0,0 +1,122 @@
+"""
+Records endpoint serialization: response_model path against RowsResponse
+
+Seeds a throwaway SQLite database with one user's records, then times
+reading them and turning them into a response body both ways:
+
+- default: UserRecord objects validated through the endpoint's
+  response_model by FastAPI and encoded with the json module
+- rows: plain column rows validated and encoded by the cached TypeAdapter
+
+and checks that both produce the same bytes.
+
+Usage: python -m benchmarks.serialization [--rows N] [--repeat N]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+# Point the app at a scratch database before it creates its engine
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+
+from typing import List
+from starlette.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from app import crud, models, schemas
+from app.database import Base, SessionLocal, engine
+from app.serialization import RowsResponse, schema_columns
+
+RESPONSE_FIELD = create_response_field(name="Response_records", type_=List[schemas.UserRecordResponse])
+
+def seed(db, rows: int) -> int:
+    """Create an admin with one user holding the given number of records"""
+    admin = models.Admin(name="benchmark", password="-")
+    db.add(admin)
+    db.flush()
+    user = models.User(admin_id=admin.id, first_name="Bench", last_name="Mark", mobile="9999999999", location="Here")
+    db.add(user)
+    db.commit()
+    
+    batch = []
+    for i in range(rows):
+        if i % 4:
+            record_data = schemas.UserRecordCreate(
+                transaction_type="debit", bags=i % 40 + 1, product_type="rice",
+                kg=250 + i % 997 * 0.5, cut_weight=0.75, amount_per_kg=20 + i % 13 * 0.35
+            )
+        else:
+            record_data = schemas.UserRecordCreate(transaction_type="credit", credit_amount=1000 + i % 311 * 1.1, round_off=0.5)
+        batch.append(crud.build_user_record_values(user.id, record_data))
+        if len(batch) == 1000:
+            crud.bulk_add_user_records(db, admin.id, batch)
+            batch = []
+    crud.bulk_add_user_records(db, admin.id, batch)
+    return user.id
+
+def fetch_objects(db, user_id: int) -> list:
+    return crud.get_user_records(db, user_id)
+
+def encode_objects(records: list) -> bytes:
+    content = asyncio.run(serialize_response(field=RESPONSE_FIELD, response_content=records))
+    return JSONResponse(content).body
+
+def fetch_rows(db, user_id: int) -> list:
+    return crud.get_user_records(db, user_id, columns=schema_columns(models.UserRecord, schemas.UserRecordResponse))
+
+def encode_rows(rows: list) -> bytes:
+    return RowsResponse(schemas.UserRecordResponse, rows).body
+
+# name: (read the records, encode them as the response body)
+PATHS = {
+    "default": (fetch_objects, encode_objects),
+    "rows": (fetch_rows, encode_rows),
+}
+
+def best_times(fetch, encode, user_id: int, repeat: int) -> tuple:
+    """Run a path on a fresh session each time and keep the fastest fetch and encode"""
+    fetch_best = encode_best = float("inf")
+    for _ in range(repeat):
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            records = fetch(db, user_id)
+            fetched = time.perf_counter()
+            body = encode(records)
+            encoded = time.perf_counter()
+        finally:
+            db.close()
+        fetch_best = min(fetch_best, fetched - started)
+        encode_best = min(encode_best, encoded - fetched)
+    return fetch_best, encode_best, body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        user_id = seed(db, args.rows)
+    finally:
+        db.close()
+    
+    results = {name: best_times(fetch, encode, user_id, args.repeat) for name, (fetch, encode) in PATHS.items()}
+    bodies = {body for _, _, body in results.values()}
+    
+    print(f"{args.rows} records, best of {args.repeat}")
+    print(f"{'path':>8} {'fetch ms':>10} {'encode ms':>10} {'encode us/row':>14}")
+    for name, (fetch_seconds, encode_seconds, _) in results.items():
+        print(f"{name:>8} {fetch_seconds * 1000:10.1f} {encode_seconds * 1000:10.1f} {encode_seconds / args.rows * 1e6:14.2f}")
+    
+    default_fetch, default_encode, _ = results["default"]
+    rows_fetch, rows_encode, _ = results["rows"]
+    print(f"encode speedup: {default_encode / rows_encode:.1f}x, overall: {(default_fetch + default_encode) / (rows_fetch + rows_encode):.1f}x")
+    print(f"identical bytes: {len(bodies) == 1}")
+
+if __name__ == "__main__":
+    main()
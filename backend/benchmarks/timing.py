@@ -0,0 +1,57 @@
+"""
+Timing helpers shared by the micro and macro benchmarks
+"""
+import statistics
+import time
+
+def summarize(samples: list, statements: list) -> dict:
+    """Get the JSON result of one benchmark from its run times in seconds and statements per run"""
+    ordered = sorted(samples)
+    return {
+        'runs': len(samples),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'median_ms': round(statistics.median(ordered) * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p90_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+        'statements': max(statements) if statements else None,
+    }
+
+def measure(run, repeat: int, warmup: int = 1, before=None, statements=None) -> dict:
+    """Time repeat calls of run after warmup untimed ones
+    
+    before, if given, is called untimed ahead of every call. statements, if
+    given, is called after every call for the statements that call ran.
+    """
+    samples = []
+    counts = []
+    for index in range(warmup + repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        if index >= warmup:
+            samples.append(elapsed)
+            if statements is not None:
+                counts.append(statements())
+    return summarize(samples, counts)
+
+async def measure_async(run, repeat: int, warmup: int = 1, before=None) -> dict:
+    """Time repeat awaits of run after warmup untimed ones
+    
+    run returns the statements it ran, or None when it cannot tell.
+    """
+    samples = []
+    counts = []
+    for index in range(warmup + repeat):
+        if before is not None:
+            before()
+        started = time.perf_counter()
+        count = await run()
+        elapsed = time.perf_counter() - started
+        if index >= warmup:
+            samples.append(elapsed)
+            if count is not None:
+                counts.append(count)
+    return summarize(samples, counts)
@@ -0,0 +1,8 @@
+"""
+Shared test setup
+"""
+import os
+import tempfile
+
+# Keep the app's own engine off the real database file
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
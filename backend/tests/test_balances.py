@@ -0,0 +1,170 @@
+"""
+Stored record balances, statements and balances as of a day must equal a plain running sum
+"""
+from datetime import datetime, time, timedelta
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+from app import crud, models, money, reconcile, schemas
+from app.database import Base
+from app.migrations import run_migrations
+
+START = datetime(2024, 1, 1, 9, 0)
+
+def day(number: int, hour: int = 0) -> datetime:
+    return START + timedelta(days=number, hours=hour)
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'balances.db'}")
+    Base.metadata.create_all(bind=engine)
+    run_migrations(bind=engine)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(reconcile, "SessionLocal", sessions)
+    db = sessions()
+    yield db
+    db.close()
+    engine.dispose()
+
+@pytest.fixture
+def owners(db):
+    admin = models.Admin(name="balances", password="-")
+    db.add(admin)
+    db.flush()
+    user = models.User(admin_id=admin.id, first_name="Ramesh", last_name="Patil", mobile="9000000000", location="Pune")
+    client = models.Client(admin_id=admin.id, name="Rao Mills", username="rao", location="Pune", phone_number="9000000001")
+    db.add_all([user, client])
+    db.commit()
+    return admin, user, client
+
+def debit(bags: int, kg: float, cut_weight: float, amount_per_kg: float) -> schemas.UserRecordCreate:
+    return schemas.UserRecordCreate(
+        transaction_type="debit", bags=bags, product_type="rice", kg=kg, cut_weight=cut_weight, amount_per_kg=amount_per_kg
+    )
+
+def credit(amount: float) -> schemas.UserRecordCreate:
+    return schemas.UserRecordCreate(transaction_type="credit", credit_amount=amount)
+
+def user_rows(user_id: int, dated: list) -> list:
+    return [{**crud.build_user_record_values(user_id, data), 'created_date': created} for created, data in dated]
+
+def client_rows(client_id: int, dated: list) -> list:
+    return [
+        {**crud.build_client_record_values(client_id, schemas.ClientRecordCreate(**data)), 'created_date': created}
+        for created, data in dated
+    ]
+
+def naive_balances(db, model, owner_column, owner_id: int, change) -> list:
+    """Each record with the sum of the changes of it and every record before it"""
+    records = db.execute(
+        select(model).where(owner_column == owner_id).order_by(model.created_date, model.id)
+    ).scalars().all()
+    running = 0
+    balances = []
+    for record in records:
+        running += money.to_paise(change(record))
+        balances.append((record, money.from_paise(running)))
+    return balances
+
+def naive_balance_before(balances: list, before: datetime) -> float:
+    return ([balance for record, balance in balances if record.created_date < before] or [0.0])[-1]
+
+def user_change(record) -> float:
+    if record.transaction_type == models.TransactionType.DEBIT:
+        return record.net_amount or 0
+    return -(record.credit_amount or 0)
+
+def client_change(record) -> float:
+    return money.sum_amounts([record.debit_amount or 0, -(record.credit_amount or 0), record.profit_loss or 0])
+
+def assert_user_balances(db, user):
+    db.expire_all()
+    balances = naive_balances(db, models.UserRecord, models.UserRecord.user_id, user.id, user_change)
+    assert [record.balance_after for record, _ in balances] == [balance for _, balance in balances]
+    
+    db.refresh(user)
+    assert money.sum_amounts([user.debit_total, -user.credit_total]) == balances[-1][1]
+    
+    for number in range(-1, 25):
+        as_of = (START + timedelta(days=number)).date()
+        assert crud.get_user_balance_as_of(db, user.id, as_of) == naive_balance_before(
+            balances, datetime.combine(as_of + timedelta(days=1), time.min)
+        ), as_of
+    
+    date_from, date_to = day(3).date(), day(10).date()
+    statement = crud.get_user_statement(db, user, date_from=date_from, date_to=date_to)
+    assert statement['opening_balance'] == naive_balance_before(balances, datetime.combine(date_from, time.min))
+    assert statement['closing_balance'] == naive_balance_before(
+        balances, datetime.combine(date_to + timedelta(days=1), time.min)
+    )
+    assert money.sum_amounts(
+        [statement['opening_balance'], statement['total_debit'], -statement['total_credit']]
+    ) == statement['closing_balance']
+
+def assert_client_balances(db, client):
+    db.expire_all()
+    balances = naive_balances(db, models.ClientRecord, models.ClientRecord.client_id, client.id, client_change)
+    assert [record.balance_after for record, _ in balances] == [balance for _, balance in balances]
+    
+    for number in range(-1, 25):
+        as_of = (START + timedelta(days=number)).date()
+        assert crud.get_client_balance_as_of(db, client.id, as_of) == naive_balance_before(
+            balances, datetime.combine(as_of + timedelta(days=1), time.min)
+        ), as_of
+    
+    date_from, date_to = day(3).date(), day(10).date()
+    statement = crud.get_client_statement(db, client, date_from=date_from, date_to=date_to)
+    assert statement['opening_balance'] == naive_balance_before(balances, datetime.combine(date_from, time.min))
+    assert statement['closing_balance'] == naive_balance_before(
+        balances, datetime.combine(date_to + timedelta(days=1), time.min)
+    )
+
+def test_user_balances_match_a_running_sum(db, owners):
+    _, user, _ = owners
+    # A batch out of date order, then one reaching back before it, then records stamped now
+    crud.insert_user_records(db, user_rows(user.id, [
+        (day(5), debit(12, 600, 1.5, 32.45)),
+        (day(1), debit(3, 150.5, 0.25, 28.15)),
+        (day(3), credit(1000.10)),
+    ]))
+    db.commit()
+    crud.insert_user_records(db, user_rows(user.id, [
+        (day(2), credit(250.55)),
+        (day(12), debit(40, 2100, 3, 41.05)),
+        (day(12), credit(333.33)),
+    ]))
+    db.commit()
+    crud.insert_user_records(db, [crud.build_user_record_values(user.id, credit(0.01)) for _ in range(2)])
+    db.commit()
+    assert_user_balances(db, user)
+    
+    reconcile.reconcile()
+    assert_user_balances(db, user)
+
+def test_user_record_inserted_before_all_others(db, owners):
+    _, user, _ = owners
+    crud.insert_user_records(db, user_rows(user.id, [(day(8), debit(5, 250, 1, 30)), (day(9), credit(100))]))
+    db.commit()
+    inserted, = crud.insert_user_records(db, user_rows(user.id, [(day(0), debit(1, 50, 0, 20))]))
+    db.commit()
+    
+    assert inserted.balance_after == inserted.net_amount
+    assert_user_balances(db, user)
+
+def test_client_balances_match_a_running_sum(db, owners):
+    _, _, client = owners
+    crud.insert_client_records(db, client_rows(client.id, [
+        (day(7), {"transaction_type": "debit", "debit_amount": 15000.75, "profit_loss": -120.5}),
+        (day(2), {"transaction_type": "credit", "credit_amount": 5000.25}),
+        (day(4, 6), {"transaction_type": "debit", "debit_amount": 800, "profit_loss": 33.33}),
+    ]))
+    db.commit()
+    crud.insert_client_records(db, client_rows(client.id, [
+        (day(4), {"transaction_type": "credit", "credit_amount": 1234.56}),
+        (day(15), {"transaction_type": "credit", "credit_amount": 99.99}),
+    ]))
+    db.commit()
+    assert_client_balances(db, client)
+    
+    reconcile.reconcile()
+    assert_client_balances(db, client)
@@ -0,0 +1,71 @@
+"""
+Profile settings must survive a connection's trip back through the pool
+"""
+import asyncio
+import os
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.database import ENGINE_PROFILES, apply_connection_settings, get_async_database_url
+
+# A PostgreSQL database to check the postgres-prod settings against
+TEST_POSTGRES_URL = os.getenv("TEST_POSTGRES_URL")
+
+needs_postgres = pytest.mark.skipif(not TEST_POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+def profile_engine(url: str, profile: dict):
+    """A one-connection engine configured like the app's engines for a profile"""
+    engine = create_engine(url, pool_size=1, max_overflow=0)
+    event.listen(engine, "connect", lambda dbapi_connection, record: apply_connection_settings(dbapi_connection, profile))
+    return engine
+
+# A setting as its number in the setting's own unit, where SHOW would print 30000ms as 30s
+PG_SETTING = "SELECT setting::int FROM pg_settings WHERE name = '{}'"
+
+def read_after_checkin(engine, statement: str):
+    """Check a connection in and out again and run statement on it"""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    with engine.connect() as conn:
+        return conn.execute(text(statement)).scalar()
+
+def test_sqlite_pragmas_survive_checkin(tmp_path):
+    profile = ENGINE_PROFILES["sqlite-prod"]
+    engine = profile_engine(f"sqlite:///{tmp_path / 'settings.db'}", profile)
+    try:
+        assert read_after_checkin(engine, "PRAGMA busy_timeout") == profile["pragmas"]["busy_timeout"]
+        assert read_after_checkin(engine, "PRAGMA journal_mode") == "wal"
+    finally:
+        engine.dispose()
+
+@needs_postgres
+def test_postgres_settings_survive_checkin():
+    pytest.importorskip("psycopg2")
+    profile = ENGINE_PROFILES["postgres-prod"]
+    engine = profile_engine(TEST_POSTGRES_URL, profile)
+    try:
+        for name, value in profile["settings"].items():
+            assert read_after_checkin(engine, PG_SETTING.format(name)) == value, name
+    finally:
+        engine.dispose()
+
+@needs_postgres
+def test_async_postgres_settings_survive_checkin():
+    pytest.importorskip("asyncpg")
+    profile = ENGINE_PROFILES["postgres-prod"]
+    
+    async def check():
+        engine = create_async_engine(get_async_database_url(TEST_POSTGRES_URL), pool_size=1, max_overflow=0)
+        event.listen(
+            engine.sync_engine, "connect",
+            lambda dbapi_connection, record: apply_connection_settings(dbapi_connection, profile)
+        )
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            async with engine.connect() as conn:
+                return await conn.scalar(text(PG_SETTING.format("statement_timeout")))
+        finally:
+            await engine.dispose()
+    
+    assert asyncio.run(check()) == profile["settings"]["statement_timeout"]
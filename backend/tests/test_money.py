@@ -0,0 +1,145 @@
+"""
+Amounts round to the nearest paisa with halves away from zero, and a debit's net is the sum of its parts
+"""
+import pytest
+from sqlalchemy import Float, MetaData, create_engine, select
+from sqlalchemy.orm import Session
+from app import crud, models, money, schemas
+from app.database import Base
+from app.migrations import MONEY_COLUMNS, store_money_as_paise
+
+@pytest.mark.parametrize("rupees, paise", [
+    (0.005, 1),
+    (-0.005, -1),
+    (0.015, 2),
+    (1.005, 101),
+    (-1.005, -101),
+    (2.675, 268),
+    (0.0049, 0),
+    (-0.0049, 0),
+    (1234.565, 123457),
+])
+def test_to_paise_rounds_halves_away_from_zero(rupees, paise):
+    assert money.to_paise(rupees) == paise
+
+def assert_net_is_sum_of_parts(record):
+    assert money.to_paise(record.net_amount) == sum(
+        money.to_paise(part) for part in (record.rough_amount, record.tax, record.levi)
+    )
+
+# bags, kg, cut weight, rate per kg, and the rough amount, tax and levi they come to
+DEBITS = [
+    # 1.5 kg at 0.01 is 0.015 rupees, half a paisa over 0.01
+    (0, 1.5, 0, 0.01, 0.02, 0.0, 0.0),
+    # A rough amount of 0.5 makes a tax of exactly half a paisa
+    (1, 100, 0, 0.005, 0.5, 0.01, 5.0),
+    # 33.5 kg left after the cut weight at 0.01 is 0.335 rupees, rounded up
+    (2, 40.2, 3.35, 0.01, 0.34, 0.0, 10.0),
+    (12, 600, 1.5, 32.45, 18885.9, 188.86, 60.0),
+]
+
+@pytest.mark.parametrize("bags, kg, cut_weight, amount_per_kg, rough_amount, tax, levi", DEBITS)
+def test_debit_parts_round_and_add_up(bags, kg, cut_weight, amount_per_kg, rough_amount, tax, levi):
+    values = crud.calculate_user_record_debit(
+        {'bags': bags, 'kg': kg, 'cut_weight': cut_weight, 'amount_per_kg': amount_per_kg}
+    )
+    assert (values['rough_amount'], values['tax'], values['levi']) == (rough_amount, tax, levi)
+    assert money.to_paise(values['net_amount']) == money.to_paise(rough_amount) + money.to_paise(tax) + money.to_paise(levi)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'money.db'}")
+    yield engine
+    engine.dispose()
+
+def test_inserted_records_keep_net_the_sum_of_parts(engine):
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as db:
+        admin = models.Admin(name="money", password="-")
+        db.add(admin)
+        db.flush()
+        user = models.User(admin_id=admin.id, first_name="Ramesh", last_name="Patil", mobile="9000000000", location="Pune")
+        db.add(user)
+        db.flush()
+        crud.insert_user_records(db, [
+            crud.build_user_record_values(user.id, schemas.UserRecordCreate(
+                transaction_type="debit", bags=bags, product_type="rice", kg=kg, cut_weight=cut_weight, amount_per_kg=amount_per_kg
+            ))
+            for bags, kg, cut_weight, amount_per_kg, *_ in DEBITS
+        ] + [
+            crud.build_user_record_values(user.id, schemas.UserRecordCreate(transaction_type="credit", credit_amount=0.005))
+        ])
+        db.commit()
+        
+        records = db.execute(select(models.UserRecord).order_by(models.UserRecord.id)).scalars().all()
+        debits, (credit,) = records[:-1], records[-1:]
+        for record, (*_, rough_amount, tax, levi) in zip(debits, DEBITS):
+            assert (record.rough_amount, record.tax, record.levi) == (rough_amount, tax, levi)
+            assert_net_is_sum_of_parts(record)
+        assert credit.credit_amount == 0.01
+        
+        db.refresh(user)
+        assert user.debit_total == money.sum_amounts(record.net_amount for record in debits)
+
+def test_migration_converts_floats_to_paise(engine):
+    # A database from before paise: the same tables with the amounts as floats
+    legacy = MetaData()
+    for table in Base.metadata.sorted_tables:
+        table.to_metadata(legacy)
+    for table_name, columns in MONEY_COLUMNS.items():
+        for name in columns:
+            legacy.tables[table_name].c[name].type = Float()
+    legacy.create_all(bind=engine)
+    
+    tables = legacy.tables
+    debit, credit = models.TransactionType.DEBIT, models.TransactionType.CREDIT
+    with engine.begin() as conn:
+        conn.execute(tables["admins"].insert(), {'id': 1, 'name': "money", 'password': "-"})
+        conn.execute(tables["users"].insert(), {
+            'id': 1, 'admin_id': 1, 'first_name': "Ramesh", 'last_name': "Patil", 'mobile': "9000000000", 'location': "Pune"
+        })
+        conn.execute(tables["clients"].insert(), {
+            'id': 1, 'admin_id': 1, 'name': "Rao Mills", 'username': "rao", 'location': "Pune", 'phone_number': "9000000001"
+        })
+        # Unrounded parts, with nets that are their float sums rather than sums of rounded parts
+        conn.execute(tables["user_records"].insert(), [
+            {'user_id': 1, 'transaction_type': debit, 'bags': 0, 'kg': 1.5, 'cut_weight': 0, 'net_weight': 1.5,
+             'amount_per_kg': 0.01, 'rough_amount': 0.015, 'tax': 0.00015, 'levi': 0, 'net_amount': 0.01515},
+            {'user_id': 1, 'transaction_type': debit, 'bags': 1, 'kg': 100, 'cut_weight': 0, 'net_weight': 100,
+             'amount_per_kg': 0.005, 'rough_amount': 0.5, 'tax': 0.005, 'levi': 5, 'net_amount': 5.505},
+            {'user_id': 1, 'transaction_type': debit, 'bags': 2, 'kg': 10, 'cut_weight': 0, 'net_weight': 10,
+             'amount_per_kg': 1.0005, 'rough_amount': 10.005, 'tax': 0.10005, 'levi': 10, 'net_amount': 20.10505},
+            # 0.51005 rounds to 0.51, while its parts round to 0.51 and 0.01
+            {'user_id': 1, 'transaction_type': debit, 'bags': 0, 'kg': 50.5, 'cut_weight': 0, 'net_weight': 50.5,
+             'amount_per_kg': 0.01, 'rough_amount': 0.505, 'tax': 0.00505, 'levi': 0, 'net_amount': 0.51005},
+        ])
+        conn.execute(tables["user_records"].insert(), {
+            'user_id': 1, 'transaction_type': credit, 'credit_amount': 1.005, 'round_off': -0.005
+        })
+        conn.execute(tables["client_records"].insert(), [
+            {'client_id': 1, 'transaction_type': debit, 'credit_amount': 0, 'debit_amount': 100.005, 'profit_loss': -0.005},
+            {'client_id': 1, 'transaction_type': credit, 'credit_amount': 2.675, 'debit_amount': 0, 'profit_loss': 0},
+        ])
+    
+    with engine.begin() as conn:
+        store_money_as_paise(conn)
+    
+    with Session(bind=engine) as db:
+        records = db.execute(select(models.UserRecord).order_by(models.UserRecord.id)).scalars().all()
+        debits, credit = records[:4], records[4]
+        assert [(record.rough_amount, record.tax, record.levi) for record in debits] == [
+            (0.02, 0.0, 0.0), (0.5, 0.01, 5.0), (10.01, 0.1, 10.0), (0.51, 0.01, 0.0)
+        ]
+        for record in debits:
+            assert_net_is_sum_of_parts(record)
+        assert (credit.credit_amount, credit.round_off) == (1.01, -0.01)
+        
+        user = db.get(models.User, 1)
+        assert user.debit_total == money.sum_amounts(record.net_amount for record in debits)
+        assert user.credit_total == 1.01
+        
+        client_records = db.execute(select(models.ClientRecord).order_by(models.ClientRecord.id)).scalars().all()
+        assert [(record.debit_amount, record.profit_loss) for record in client_records[:1]] == [(100.01, -0.01)]
+        assert client_records[1].credit_amount == 2.68
+        client = db.get(models.Client, 1)
+        assert (client.debit_total, client.credit_total, client.profit_loss_total) == (100.01, 2.68, -0.01)
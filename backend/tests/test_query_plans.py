@@ -0,0 +1,51 @@
+"""
+The hot queries must be answered from the indexes the migrations create
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from app.database import Base
+from app.migrations import HOT_QUERIES, explain_hot_queries, run_migrations
+
+# The index each hot query has to search
+EXPECTED_INDEXES = {
+    "users by admin": "ix_users_admin_id_created_date",
+    "clients by admin": "ix_clients_admin_id_created_date",
+    "user records": "ix_user_records_user_id_created_date",
+    "client records": "ix_client_records_client_id_created_date",
+    "user balance as of": "ix_user_records_user_id_created_date",
+}
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    yield engine
+    engine.dispose()
+
+def assert_plans_use_indexes(engine):
+    plans = explain_hot_queries(bind=engine)
+    assert set(plans) == set(EXPECTED_INDEXES)
+    for name, plan in plans.items():
+        assert any(
+            step.startswith("SEARCH") and f"USING INDEX {EXPECTED_INDEXES[name]}" in step
+            for step in plan
+        ), f"{name} does not search {EXPECTED_INDEXES[name]}: {plan}"
+        assert not any(step.startswith("SCAN") for step in plan), f"{name} scans a table: {plan}"
+
+def test_every_hot_query_has_an_expected_index():
+    assert set(HOT_QUERIES) == set(EXPECTED_INDEXES)
+
+def test_fresh_database_plans(engine):
+    Base.metadata.create_all(bind=engine)
+    run_migrations(bind=engine)
+    assert_plans_use_indexes(engine)
+
+def test_migrations_restore_missing_indexes(engine):
+    # A database from before the indexes: the tables, without their ix_ indexes
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        names = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'ix_%'")).scalars().all()
+        for name in names:
+            conn.execute(text(f"DROP INDEX {name}"))
+    
+    run_migrations(bind=engine)
+    assert_plans_use_indexes(engine)
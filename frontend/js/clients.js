@@ -24,6 +24,35 @@ function logout() {
     window.location.href = 'login.html';
 }
 
+// Responses by URL, reused when the server answers 304 Not Modified
+const responseCache = new Map();
+
+// GET a URL, revalidating any copy already fetched with its ETag
+async function fetchWithETag(url, token) {
+    const cached = responseCache.get(url);
+    const headers = {
+        'Authorization': `Bearer ${token}`
+    };
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+    
+    const response = await fetch(url, { headers });
+    
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+    
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        responseCache.set(url, { etag, body: await response.clone().text() });
+    }
+    return response;
+}
+
 // Format currency
 function formatCurrency(amount) {
     return new Intl.NumberFormat('en-IN', {
@@ -48,46 +77,21 @@ async function loadClients() {
     document.getElementById('adminName').textContent = `Welcome, ${adminInfo.name}`;
     
     try {
-        // Load clients
-        const clientsResponse = await fetch(`${API_URL}/admin/${adminInfo.uuid}/clients`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        // Load clients, balances and pending amount in one request
+        const pageResponse = await fetchWithETag(`${API_URL}/admin/${adminInfo.uuid}/clients_page`, token);
         
-        if (clientsResponse.status === 401) {
+        if (pageResponse.status === 401) {
             logout();
             return;
         }
         
-        const clients = await clientsResponse.json();
-        
-        // Load pending amount
-        const pendingResponse = await fetch(`${API_URL}/admin/${adminInfo.uuid}/final_clients_pending_amount`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
-        
-        const pendingData = await pendingResponse.json();
-        document.getElementById('totalPendingAmount').textContent = formatCurrency(pendingData.total_pending);
+        const pageData = await pageResponse.json();
+        document.getElementById('totalPendingAmount').textContent = formatCurrency(pageData.total_pending);
         
         // Update clients table
         const clientsTableBody = document.getElementById('clientsTable');
-        if (clients && clients.length > 0) {
-            const clientsWithCalc = await Promise.all(clients.map(async (client) => {
-                try {
-                    const calcResponse = await fetch(`${API_URL}/admin/${adminInfo.uuid}/client/${client.id}/calculate_record_details`, {
-                        headers: {
-                            'Authorization': `Bearer ${token}`
-                        }
-                    });
-                    const calc = await calcResponse.json();
-                    return { ...client, calc };
-                } catch {
-                    return { ...client, calc: { pending_amount: 0, profit_loss_total: 0, status: 'N/A' } };
-                }
-            }));
+        if (pageData.clients && pageData.clients.length > 0) {
+            const clientsWithCalc = pageData.clients.map(entry => ({ ...entry.client, calc: entry.calc }));
             
             clientsTableBody.innerHTML = clientsWithCalc.map(client => `
                 <tr>
@@ -283,11 +287,7 @@ async function viewRecords(clientId, clientName) {
     const token = localStorage.getItem('token');
     
     try {
-        const response = await fetch(`${API_URL}/admin/${adminInfo.uuid}/client/${clientId}/record_details`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const response = await fetchWithETag(`${API_URL}/admin/${adminInfo.uuid}/client/${clientId}/record_details`, token);
         
         const data = await response.json();
         
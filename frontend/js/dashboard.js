@@ -34,6 +34,35 @@ function formatDate(dateString) {
     });
 }
 
+// Responses by URL, reused when the server answers 304 Not Modified
+const responseCache = new Map();
+
+// GET a URL, revalidating any copy already fetched with its ETag
+async function fetchWithETag(url, token) {
+    const cached = responseCache.get(url);
+    const headers = {
+        'Authorization': `Bearer ${token}`
+    };
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+    
+    const response = await fetch(url, { headers });
+    
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+    
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        responseCache.set(url, { etag, body: await response.clone().text() });
+    }
+    return response;
+}
+
 // Format currency
 function formatCurrency(amount) {
     return new Intl.NumberFormat('en-IN', {
@@ -42,6 +71,55 @@ function formatCurrency(amount) {
     }).format(amount);
 }
 
+// Latest dashboard data, kept current by the event stream
+let dashboardData = null;
+
+// Render the dashboard from dashboardData
+function renderDashboard() {
+    // Update stats
+    document.getElementById('totalUsers').textContent = dashboardData.total_users;
+    document.getElementById('activeUsers').textContent = dashboardData.active_users;
+    document.getElementById('totalClients').textContent = dashboardData.total_clients;
+    document.getElementById('usersPending').textContent = formatCurrency(dashboardData.users_pending_amount);
+    document.getElementById('clientsPending').textContent = formatCurrency(dashboardData.clients_pending_amount);
+    
+    // Update recent users table
+    const usersTableBody = document.getElementById('recentUsersTable');
+    if (dashboardData.recent_users && dashboardData.recent_users.length > 0) {
+        usersTableBody.innerHTML = dashboardData.recent_users.map(user => `
+            <tr>
+                <td>${user.first_name} ${user.last_name}</td>
+                <td>${user.mobile}</td>
+                <td>${user.location}</td>
+                <td>
+                    <span class="text-${user.is_active ? 'success' : 'danger'}">
+                        ${user.is_active ? 'Active' : 'Inactive'}
+                    </span>
+                </td>
+                <td>${formatDate(user.created_date)}</td>
+            </tr>
+        `).join('');
+    } else {
+        usersTableBody.innerHTML = '<tr><td colspan="5" class="text-center text-muted">No users found</td></tr>';
+    }
+    
+    // Update recent clients table
+    const clientsTableBody = document.getElementById('recentClientsTable');
+    if (dashboardData.recent_clients && dashboardData.recent_clients.length > 0) {
+        clientsTableBody.innerHTML = dashboardData.recent_clients.map(client => `
+            <tr>
+                <td>${client.name}</td>
+                <td>${client.username}</td>
+                <td>${client.location}</td>
+                <td>${client.phone_number}</td>
+                <td>${formatDate(client.created_date)}</td>
+            </tr>
+        `).join('');
+    } else {
+        clientsTableBody.innerHTML = '<tr><td colspan="5" class="text-center text-muted">No clients found</td></tr>';
+    }
+}
+
 // Load dashboard data
 async function loadDashboard() {
     if (!checkAuth()) return;
@@ -58,11 +136,7 @@ async function loadDashboard() {
     document.getElementById('adminName').textContent = `Welcome, ${adminInfo.name}`;
     
     try {
-        const response = await fetch(`${API_URL}/dashboard/${adminInfo.uuid}`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const response = await fetchWithETag(`${API_URL}/dashboard/${adminInfo.uuid}`, token);
         
         if (response.status === 401) {
             logout();
@@ -73,50 +147,8 @@ async function loadDashboard() {
             throw new Error('Failed to load dashboard');
         }
         
-        const data = await response.json();
-        
-        // Update stats
-        document.getElementById('totalUsers').textContent = data.total_users;
-        document.getElementById('activeUsers').textContent = data.active_users;
-        document.getElementById('totalClients').textContent = data.total_clients;
-        document.getElementById('usersPending').textContent = formatCurrency(data.users_pending_amount);
-        document.getElementById('clientsPending').textContent = formatCurrency(data.clients_pending_amount);
-        
-        // Update recent users table
-        const usersTableBody = document.getElementById('recentUsersTable');
-        if (data.recent_users && data.recent_users.length > 0) {
-            usersTableBody.innerHTML = data.recent_users.map(user => `
-                <tr>
-                    <td>${user.first_name} ${user.last_name}</td>
-                    <td>${user.mobile}</td>
-                    <td>${user.location}</td>
-                    <td>
-                        <span class="text-${user.is_active ? 'success' : 'danger'}">
-                            ${user.is_active ? 'Active' : 'Inactive'}
-                        </span>
-                    </td>
-                    <td>${formatDate(user.created_date)}</td>
-                </tr>
-            `).join('');
-        } else {
-            usersTableBody.innerHTML = '<tr><td colspan="5" class="text-center text-muted">No users found</td></tr>';
-        }
-        
-        // Update recent clients table
-        const clientsTableBody = document.getElementById('recentClientsTable');
-        if (data.recent_clients && data.recent_clients.length > 0) {
-            clientsTableBody.innerHTML = data.recent_clients.map(client => `
-                <tr>
-                    <td>${client.name}</td>
-                    <td>${client.username}</td>
-                    <td>${client.location}</td>
-                    <td>${client.phone_number}</td>
-                    <td>${formatDate(client.created_date)}</td>
-                </tr>
-            `).join('');
-        } else {
-            clientsTableBody.innerHTML = '<tr><td colspan="5" class="text-center text-muted">No clients found</td></tr>';
-        }
+        dashboardData = await response.json();
+        renderDashboard();
         
     } catch (error) {
         console.error('Dashboard error:', error);
@@ -124,8 +156,127 @@ async function loadDashboard() {
     }
 }
 
-// Initialize dashboard on page load
-document.addEventListener('DOMContentLoaded', loadDashboard);
+// Put an added or changed row at the top of a recent list, keeping five
+function upsertRecent(list, item) {
+    const rest = (list || []).filter(existing => existing.id !== item.id);
+    return [item, ...rest].slice(0, 5);
+}
+
+// Replace a changed row in place if it is in a recent list
+function replaceRecent(list, item) {
+    return (list || []).map(existing => existing.id === item.id ? item : existing);
+}
+
+// Apply a change pushed by the server; totals are absolute, so replays are harmless
+function applyDashboardEvent(type, change) {
+    if (!dashboardData) return;
+    
+    if (type === 'user_created') {
+        dashboardData.recent_users = upsertRecent(dashboardData.recent_users, change.user);
+    } else if (type === 'user_updated') {
+        dashboardData.recent_users = replaceRecent(dashboardData.recent_users, change.user);
+    } else if (type === 'client_created') {
+        dashboardData.recent_clients = upsertRecent(dashboardData.recent_clients, change.client);
+    } else if (type === 'client_updated') {
+        dashboardData.recent_clients = replaceRecent(dashboardData.recent_clients, change.client);
+    }
+    
+    Object.assign(dashboardData, change.totals);
+    renderDashboard();
+}
+
+// Poll only while the event stream is unavailable
+const POLL_INTERVAL = 30000;
+let pollTimer = null;
+
+function startPolling() {
+    if (!pollTimer) {
+        pollTimer = setInterval(loadDashboard, POLL_INTERVAL);
+    }
+}
+
+function stopPolling() {
+    clearInterval(pollTimer);
+    pollTimer = null;
+}
+
+// Milliseconds to wait before opening a new stream after the browser gave up on one
+const EVENTS_RECONNECT_DELAY = 3000;
+
+// Id of the last event received, so a new stream resumes after it
+let lastEventId = null;
+
+// Get a short-lived ticket for opening the event stream, so the access token stays out of URLs
+async function fetchEventsTicket(adminInfo, token) {
+    const response = await fetch(`${API_URL}/admin/${adminInfo.uuid}/events/ticket`, {
+        method: 'POST',
+        headers: {
+            'Authorization': `Bearer ${token}`
+        }
+    });
+    if (!response.ok) {
+        throw new Error(`Ticket request failed with ${response.status}`);
+    }
+    return (await response.json()).ticket;
+}
 
-// Refresh dashboard every 30 seconds
-setInterval(loadDashboard, 30000);
\ No newline at end of file
+// Subscribe to live dashboard changes, falling back to polling
+async function connectEvents() {
+    const adminInfo = getAdminInfo();
+    const token = localStorage.getItem('token');
+    
+    if (!window.EventSource || !adminInfo || !token) {
+        startPolling();
+        return;
+    }
+    
+    let ticket;
+    try {
+        ticket = await fetchEventsTicket(adminInfo, token);
+    } catch (error) {
+        startPolling();
+        setTimeout(connectEvents, EVENTS_RECONNECT_DELAY);
+        return;
+    }
+    
+    // EventSource cannot send headers, so the ticket goes in the query string
+    const params = new URLSearchParams({ ticket });
+    if (lastEventId !== null) {
+        params.set('last_event_id', lastEventId);
+    }
+    const source = new EventSource(`${API_URL}/admin/${adminInfo.uuid}/events?${params}`);
+    
+    source.addEventListener('open', () => {
+        stopPolling();
+        // Catch up on anything missed while disconnected
+        loadDashboard();
+    });
+    
+    // The browser reconnects by itself, resuming with Last-Event-ID; poll meanwhile.
+    // Once the ticket has expired the reconnect is refused and the stream closes,
+    // so open a new one with a new ticket
+    source.addEventListener('error', () => {
+        startPolling();
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(connectEvents, EVENTS_RECONNECT_DELAY);
+        }
+    });
+    
+    ['user_created', 'user_updated', 'user_record', 'client_created', 'client_updated', 'client_record'].forEach(type => {
+        source.addEventListener(type, (event) => {
+            lastEventId = event.lastEventId;
+            applyDashboardEvent(type, JSON.parse(event.data));
+        });
+    });
+    
+    source.addEventListener('refresh', (event) => {
+        lastEventId = event.lastEventId;
+        loadDashboard();
+    });
+}
+
+// Initialize dashboard on page load
+document.addEventListener('DOMContentLoaded', () => {
+    loadDashboard();
+    connectEvents();
+});
\ No newline at end of file
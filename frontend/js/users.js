@@ -24,6 +24,35 @@ function logout() {
     window.location.href = 'login.html';
 }
 
+// Responses by URL, reused when the server answers 304 Not Modified
+const responseCache = new Map();
+
+// GET a URL, revalidating any copy already fetched with its ETag
+async function fetchWithETag(url, token) {
+    const cached = responseCache.get(url);
+    const headers = {
+        'Authorization': `Bearer ${token}`
+    };
+    if (cached) {
+        headers['If-None-Match'] = cached.etag;
+    }
+    
+    const response = await fetch(url, { headers });
+    
+    if (response.status === 304 && cached) {
+        return new Response(cached.body, {
+            status: 200,
+            headers: { 'Content-Type': 'application/json' }
+        });
+    }
+    
+    const etag = response.headers.get('ETag');
+    if (response.ok && etag) {
+        responseCache.set(url, { etag, body: await response.clone().text() });
+    }
+    return response;
+}
+
 // Format currency
 function formatCurrency(amount) {
     return new Intl.NumberFormat('en-IN', {
@@ -48,46 +77,21 @@ async function loadUsers() {
     document.getElementById('adminName').textContent = `Welcome, ${adminInfo.name}`;
     
     try {
-        // Load users
-        const usersResponse = await fetch(`${API_URL}/admin/${adminInfo.uuid}/users`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        // Load users, balances and pending amount in one request
+        const pageResponse = await fetchWithETag(`${API_URL}/admin/${adminInfo.uuid}/users_page`, token);
         
-        if (usersResponse.status === 401) {
+        if (pageResponse.status === 401) {
             logout();
             return;
         }
         
-        const users = await usersResponse.json();
-        
-        // Load pending amount
-        const pendingResponse = await fetch(`${API_URL}/admin/${adminInfo.uuid}/final_users_pending_amount`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
-        
-        const pendingData = await pendingResponse.json();
-        document.getElementById('totalPendingAmount').textContent = formatCurrency(pendingData.total_pending);
+        const pageData = await pageResponse.json();
+        document.getElementById('totalPendingAmount').textContent = formatCurrency(pageData.total_pending);
         
         // Update users table
         const usersTableBody = document.getElementById('usersTable');
-        if (users && users.length > 0) {
-            const usersWithCalc = await Promise.all(users.map(async (user) => {
-                try {
-                    const calcResponse = await fetch(`${API_URL}/admin/${adminInfo.uuid}/user/${user.id}/calculate_record_details`, {
-                        headers: {
-                            'Authorization': `Bearer ${token}`
-                        }
-                    });
-                    const calc = await calcResponse.json();
-                    return { ...user, calc };
-                } catch {
-                    return { ...user, calc: { sum_deficit: 0, status: 'N/A' } };
-                }
-            }));
+        if (pageData.users && pageData.users.length > 0) {
+            const usersWithCalc = pageData.users.map(entry => ({ ...entry.user, calc: entry.calc }));
             
             usersTableBody.innerHTML = usersWithCalc.map(user => `
                 <tr>
@@ -276,11 +280,7 @@ async function viewRecords(userId, userName) {
     const token = localStorage.getItem('token');
     
     try {
-        const response = await fetch(`${API_URL}/admin/${adminInfo.uuid}/user/${userId}/record_details`, {
-            headers: {
-                'Authorization': `Bearer ${token}`
-            }
-        });
+        const response = await fetchWithETag(`${API_URL}/admin/${adminInfo.uuid}/user/${userId}/record_details`, token);
         
         const data = await response.json();
         